@@ -0,0 +1,885 @@
+"""
+Matching of rules with an automaton whose alphabet is whole instructions.
+
+The typed rule tree is compiled into an NFA where every transition consumes one instruction, instead
+of a regex that steps between the stringified instructions with `SKIP_TO_END_OF_PATTERN_NODE`. The
+NFA is simulated over the instructions keeping its threads in priority order (a Pike VM), so every
+instruction is visited once per active state and nothing is backtracked. The priorities follow the
+regex ones, so the findings are the same as matching the regex at the start of every stringified
+instruction.
+
+The condition of a transition is evaluated once per distinct instruction. `$not` is a transition
+guarded by a lookahead automaton, memoized by position. `$and_any_order` keeps the children it
+already matched as bits of every thread, instead of an alternation of every permutation. Register
+captures, as `&genreg-1`, are bound to register families in every thread, instead of backreferences.
+"""
+from abc import ABC, abstractmethod
+from functools import partial
+from itertools import permutations, product
+from math import factorial
+from typing import Callable, Dict, Final, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, TypeAlias
+
+import regex
+
+from jasm.consumer import RegexMatchingConsumer
+from jasm.global_definitions import (
+    Instruction,
+    MatchingSearchMode,
+    RegisterCapturePrefix,
+    UnsupportedRuleError,
+    remove_access_suffix,
+)
+from jasm.jasm_regex.capture_expansion import CaptureExpander
+from jasm.jasm_regex.tree_analysis.any_order import FixedLengthAnalyzer
+from jasm.jasm_regex.tree_analysis.max_span import is_single_field_name
+from jasm.jasm_regex.tree_generators.capture_group_index import CaptureGroupIndexRegisterCall
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.capture_group.capture_group_register import (
+    PatternNodeCaptureGroupRegisterCall,
+    PatternNodeCaptureGroupSpecialRegisterReference,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.deref import (
+    PatternNodeDeref,
+    PatternNodeDerefProperty,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.mnemonic_and_operand.mnemonic_and_operand import (
+    PatternNodeMnemonic,
+    PatternNodeOperand,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.node_branch_root import (
+    NodeAnd,
+    NodeAndAnyOrder,
+    NodeNot,
+    NodeOr,
+    PatternNodeTimes,
+)
+from jasm.logging_config import logger
+from jasm.registers import CAPTURED_VALUES, RegisterFamily, RegisterIndex, get_capture_prefix
+from jasm.stringify_asm.abstracts.abs_observer import IMatchedObserver
+
+# Kinds of automaton states
+CONSUME: Final = 0
+SPLIT: Final = 1
+MATCH: Final = 2
+CHOOSE: Final = 3
+
+# Maximum number of states of an automaton, as `times` are unrolled
+MAX_AUTOMATON_STATES: Final = 100_000
+
+# Register family bound to every register capture of a thread, by capture number - 1, -1 if unbound
+Bindings: TypeAlias = Tuple[int, ...]
+
+
+class InstructionCondition(ABC):
+    """Condition an instruction must satisfy for being consumed by a transition"""
+
+    # Conditions binding captures are consumed with `get_bindings` instead of `is_satisfied`
+    binds_captures: bool = False
+
+    @abstractmethod
+    def is_satisfied(self, run: "AutomatonRun", position: int) -> bool:
+        """Check the instruction at `position`"""
+
+
+class AnyInstruction(InstructionCondition):
+    """Any instruction, as the skip of every repetition of a `$and`"""
+
+    def is_satisfied(self, run: "AutomatonRun", position: int) -> bool:
+        return True
+
+
+class MnemonicCondition(InstructionCondition):
+    """Instructions fully matching the regex of a single instruction of a mnemonic node"""
+
+    def __init__(self, pattern: regex.Pattern[str]) -> None:
+        self.pattern = pattern
+
+    def is_satisfied(self, run: "AutomatonRun", position: int) -> bool:
+        return run.is_mnemonic_satisfied(self, position)
+
+
+class RegisterCaptureCondition(InstructionCondition):
+    """
+    Instructions fully matching the regex of a mnemonic node with register captures.
+
+    The references, as `&genreg-1`, bind their capture to a register family, and the calls, as
+    `&genreg-1.32`, use the family bound to it. Only the families of the register operands of the
+    instruction are tried, and every assignment is checked with the node regex matching the captured
+    names of its registers, so the instructions consumed are the ones the regex consumes.
+    """
+
+    binds_captures = True
+
+    def __init__(
+        self,
+        node_regex: str,
+        references: Sequence[Tuple[int, RegisterCapturePrefix]],
+        calls: Sequence[Tuple[int, RegisterCapturePrefix]],
+        number_of_captures: int,
+    ) -> None:
+        self.node_regex = node_regex
+        # Numbers and registers of the captures referenced by the node, in the order of their groups
+        self.references = tuple(references)
+        # Numbers and registers of the captures called by the node and referenced by previous ones
+        self.calls = tuple(calls)
+        self.empty_bindings: Bindings = (-1,) * number_of_captures
+
+        # Families every reference can capture, as a bit mask
+        self._domain_masks = [
+            sum(1 << family for family in CAPTURED_VALUES[prefix]) for _, prefix in self.references
+        ]
+        self._patterns: Dict[Tuple[int, ...], regex.Pattern[str]] = {}
+
+    def is_satisfied(self, run: "AutomatonRun", position: int) -> bool:
+        """Check if the instruction can be consumed by a thread without captures, as the first one"""
+        return bool(self.get_bindings(run, position, self.empty_bindings))
+
+    def get_bindings(self, run: "AutomatonRun", position: int, bindings: Bindings) -> List[Bindings]:
+        """Get the bindings of the threads consuming the instruction, by priority"""
+
+        call_families = tuple(bindings[number - 1] for number, _ in self.calls)
+        reference_families = run.get_register_families(self, position, call_families)
+        if not self.references:
+            return [bindings] if reference_families else []
+
+        next_bindings: List[Bindings] = []
+        for families in reference_families:
+            reached_bindings = list(bindings)
+            for (number, _), family in zip(self.references, families):
+                reached_bindings[number - 1] = family
+            next_bindings.append(tuple(reached_bindings))
+        return next_bindings
+
+    def match_registers(
+        self, run: "AutomatonRun", position: int, call_families: Tuple[int, ...]
+    ) -> List[Tuple[int, ...]]:
+        """
+        Get the families the references of the node can capture in the instruction, by priority,
+        given the families of its calls
+        """
+
+        families_mask = run.register_index.family_masks[position]
+        if any(family < 0 or not families_mask >> family & 1 for family in call_families):
+            return []
+        if any(not families_mask & domain_mask for domain_mask in self._domain_masks):
+            return []
+
+        # By the regex priority: every capture group tries its values in order, the last group first
+        candidates = [
+            [family for family in CAPTURED_VALUES[prefix] if families_mask >> family & 1]
+            for _, prefix in self.references
+        ]
+        stringified_instruction = run.get_stringified_instruction(position)
+        return [
+            families
+            for families in product(*candidates)
+            if self._get_pattern(call_families + families).fullmatch(stringified_instruction)
+        ]
+
+    def _get_pattern(self, families: Tuple[int, ...]) -> regex.Pattern[str]:
+        """Get the node regex matching the families of the calls and the references"""
+
+        pattern = self._patterns.get(families)
+        if pattern is None:
+            values = {
+                number: CAPTURED_VALUES[prefix][RegisterFamily(family)]
+                for (number, prefix), family in zip(self.calls + self.references, families)
+            }
+            pattern = regex.compile(
+                CaptureExpander().instantiate(
+                    self.node_regex, [number for number, _ in self.references], values
+                )
+            )
+            self._patterns[families] = pattern
+        return pattern
+
+
+class NotCondition(InstructionCondition):
+    """Instructions where the lookahead automaton does not match, as a `$not`"""
+
+    def __init__(self, lookahead: "InstructionAutomaton") -> None:
+        self.lookahead = lookahead
+
+    def is_satisfied(self, run: "AutomatonRun", position: int) -> bool:
+        return not run.lookahead_matches(self.lookahead, position)
+
+
+class InstructionAutomaton:
+    """
+    NFA whose transitions consume whole instructions.
+
+    CONSUME states go to `targets[state]` consuming an instruction that satisfies
+    `conditions[state]`. SPLIT states go to `targets[state]` or, with less priority, to
+    `alternatives[state]`. MATCH states end a match.
+
+    CHOOSE states match every one of `choices[state]` once, in any order, and then go to
+    `targets[state]`. The choices end back in the CHOOSE state, and the ones already matched are
+    kept as bits of the used mask of the thread, starting at bit `choice_offsets[state]`.
+    """
+
+    def __init__(self) -> None:
+        self.kinds: List[int] = []
+        self.targets: List[int] = []
+        self.alternatives: List[int] = []
+        self.conditions: List[Optional[InstructionCondition]] = []
+        self.choices: List[Tuple[int, ...]] = []
+        self.choice_offsets: List[int] = []
+        self.start: int = -1
+        self.number_of_captures = 0
+
+        self._used_bits = 0
+
+        # States reached from every state and used mask without consuming instructions, by priority
+        self._closures: Dict[Tuple[int, int], Tuple[Tuple[int, int], ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def add_state(
+        self,
+        kind: int,
+        target: int = -1,
+        alternative: int = -1,
+        condition: Optional[InstructionCondition] = None,
+    ) -> int:
+        if len(self.kinds) >= MAX_AUTOMATON_STATES:
+            raise UnsupportedRuleError(f"the automaton has more than {MAX_AUTOMATON_STATES} states")
+
+        self.kinds.append(kind)
+        self.targets.append(target)
+        self.alternatives.append(alternative)
+        self.conditions.append(condition)
+        self.choices.append(())
+        self.choice_offsets.append(-1)
+        return len(self.kinds) - 1
+
+    def add_choose_state(self, target: int, number_of_choices: int) -> int:
+        """Add a CHOOSE state, its `choices` must be set once they are built"""
+
+        state = self.add_state(CHOOSE, target=target)
+        self.choice_offsets[state] = self._used_bits
+        self._used_bits += number_of_choices
+        return state
+
+    def get_closure(self, state: int, used: int = 0) -> Tuple[Tuple[int, int], ...]:
+        """
+        Get the CONSUME and MATCH states reached from the state without consuming instructions, by
+        priority, with their used mask
+        """
+
+        closure = self._closures.get((state, used))
+        if closure is not None:
+            return closure
+
+        reached: List[Tuple[int, int]] = []
+        visited: Set[Tuple[int, int]] = set()
+        pending = [(state, used)]
+        while pending:
+            current = pending.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+
+            current_state, current_used = current
+            kind = self.kinds[current_state]
+            if kind == SPLIT:
+                pending.append((self.alternatives[current_state], current_used))
+                pending.append((self.targets[current_state], current_used))
+
+            elif kind == CHOOSE:
+                choices = self.choices[current_state]
+                offset = self.choice_offsets[current_state]
+                all_used = ((1 << len(choices)) - 1) << offset
+                if current_used & all_used == all_used:
+                    pending.append((self.targets[current_state], current_used & ~all_used))
+                    continue
+
+                # The first choices have more priority, so they are the last ones pushed
+                for index in reversed(range(len(choices))):
+                    bit = 1 << (offset + index)
+                    if not current_used & bit:
+                        pending.append((choices[index], current_used | bit))
+
+            else:
+                reached.append(current)
+
+        closure = tuple(reached)
+        self._closures[(state, used)] = closure
+        return closure
+
+    def starts_with_mnemonics(self) -> bool:
+        """True if the first instruction of a match must satisfy a mnemonic condition"""
+        return all(
+            isinstance(self.conditions[state], (MnemonicCondition, RegisterCaptureCondition))
+            for state, _ in self.get_closure(self.start)
+        )
+
+    def get_empty_bindings(self) -> Bindings:
+        return (-1,) * self.number_of_captures
+
+
+class AutomatonCompiler:
+    """
+    Compile a typed rule tree into an InstructionAutomaton.
+
+    Nodes are compiled backwards, every node is built in front of the state that follows it. The
+    priorities of the states are the ones of the regex of the node: `$or` and `$and_any_order` try
+    their alternatives in order, and `times` are greedy.
+    """
+
+    def __init__(self, mnemonic_conditions: Optional[Dict[str, MnemonicCondition]] = None) -> None:
+        self.automaton = InstructionAutomaton()
+        self.fixed_length_analyzer = FixedLengthAnalyzer()
+
+        # Conditions by regex, shared by the permutations of `$and_any_order` and the lookaheads
+        self.mnemonic_conditions: Dict[str, MnemonicCondition] = (
+            mnemonic_conditions if mnemonic_conditions is not None else {}
+        )
+        # Registers of the register captures by number, None where captures are not supported
+        self.capture_prefixes: Optional[Dict[int, RegisterCapturePrefix]] = None
+
+    def compile(self, rule_tree: PatternNode) -> InstructionAutomaton:
+        """Compile the rule, raises UnsupportedRuleError if it can not be matched by an automaton"""
+
+        self.capture_prefixes = self._get_capture_prefixes(rule_tree)
+        self.automaton.number_of_captures = max(self.capture_prefixes, default=0)
+        match_state = self.automaton.add_state(MATCH)
+        self.automaton.start = self._compile_node(rule_tree, match_state)
+        return self.automaton
+
+    def compile_sequence(self, nodes: Sequence[PatternNode]) -> InstructionAutomaton:
+        match_state = self.automaton.add_state(MATCH)
+        self.automaton.start = self._compile_sequence(nodes, match_state)
+        return self.automaton
+
+    def _compile_node(self, node: PatternNode, next_state: int) -> int:
+        match node:
+            case PatternNodeTimes():
+                return next_state
+
+            # NodeAndAnyOrder is a NodeAnd, so it must be checked first
+            case NodeAndAnyOrder():
+                # Times children are empty, their permutations only repeat the other ones
+                children = [
+                    child
+                    for child in self._get_children(node)
+                    if not isinstance(child, PatternNodeTimes)
+                ]
+
+                # All the orders of fixed length children end at the same instruction, so the
+                # order they are tried in does not change the matches
+                if children and all(
+                    self.fixed_length_analyzer.get_fixed_length(child) is not None for child in children
+                ):
+                    return self._repeat(
+                        node, lambda following: self._choose(children, following), next_state
+                    )
+
+                if factorial(len(children)) > MAX_AUTOMATON_STATES:
+                    raise UnsupportedRuleError(f"{len(children)} children in any order are not supported")
+
+                orders = list(permutations(children))
+                return self._repeat(
+                    node,
+                    lambda following: self._alternate(
+                        [partial(self._compile_sequence, order) for order in orders],
+                        following,
+                    ),
+                    next_state,
+                )
+
+            case NodeAnd():
+                children = self._get_children(node)
+                if self._is_single_time(node):
+                    return self._compile_sequence(children, next_state)
+
+                # When repeated, every repetition skips to the end of the following instruction
+                return self._repeat(
+                    node,
+                    lambda following: self._compile_sequence(
+                        children, self._consume(AnyInstruction(), following)
+                    ),
+                    next_state,
+                )
+
+            case NodeOr():
+                children = self._get_children(node)
+                return self._repeat(
+                    node,
+                    lambda following: self._alternate(
+                        [partial(self._compile_node, child) for child in children],
+                        following,
+                    ),
+                    next_state,
+                )
+
+            case NodeNot():
+                lookahead = AutomatonCompiler(self.mnemonic_conditions).compile_sequence(
+                    self._get_children(node)
+                )
+                condition = NotCondition(lookahead)
+                return self._repeat(
+                    node, lambda following: self._consume(condition, following), next_state
+                )
+
+            case PatternNodeMnemonic():
+                mnemonic_condition = self._get_mnemonic_condition(node)
+                return self._repeat(
+                    node, lambda following: self._consume(mnemonic_condition, following), next_state
+                )
+
+        raise UnsupportedRuleError(f"{type(node).__name__} is not supported")
+
+    def _compile_sequence(self, nodes: Sequence[PatternNode], next_state: int) -> int:
+        state = next_state
+        for node in reversed(nodes):
+            state = self._compile_node(node, state)
+        return state
+
+    def _consume(self, condition: InstructionCondition, next_state: int) -> int:
+        return self.automaton.add_state(CONSUME, target=next_state, condition=condition)
+
+    def _choose(self, children: List[PatternNode], next_state: int) -> int:
+        """Match every child once, in any order, trying first the first child"""
+
+        choose_state = self.automaton.add_choose_state(next_state, len(children))
+        self.automaton.choices[choose_state] = tuple(
+            self._compile_node(child, choose_state) for child in children
+        )
+        return choose_state
+
+    def _alternate(self, alternatives: List[Callable[[int], int]], next_state: int) -> int:
+        """Try every alternative in order, all of them followed by `next_state`"""
+
+        state = alternatives[-1](next_state)
+        for alternative in reversed(alternatives[:-1]):
+            state = self.automaton.add_state(
+                SPLIT, target=alternative(next_state), alternative=state
+            )
+        return state
+
+    def _repeat(self, node: PatternNode, build: Callable[[int], int], next_state: int) -> int:
+        """
+        Repeat the node between its minimum and maximum times, greedily.
+
+        `build` builds a single repetition in front of the given state.
+        """
+
+        state = next_state
+        for _ in range(node.times.max_times - node.times.min_times):
+            state = self.automaton.add_state(SPLIT, target=build(state), alternative=next_state)
+        for _ in range(node.times.min_times):
+            state = build(state)
+        return state
+
+    def _get_capture_prefixes(self, rule_tree: PatternNode) -> Dict[int, RegisterCapturePrefix]:
+        """Get the registers of the register captures of the rule by number"""
+
+        capture_prefixes: Dict[int, RegisterCapturePrefix] = {}
+        has_any_order = False
+        for node in iter_nodes(rule_tree):
+            if isinstance(node, NodeAndAnyOrder):
+                has_any_order = True
+            elif isinstance(node, PatternNodeCaptureGroupSpecialRegisterReference):
+                capture_prefixes[get_capture_number(node)] = get_capture_prefix(str(node.name))
+
+        # The regex of the orders numbers their capture groups in other ways
+        if capture_prefixes and has_any_order:
+            raise UnsupportedRuleError("register captures with $and_any_order are not supported")
+        return capture_prefixes
+
+    def _get_mnemonic_condition(self, node: PatternNodeMnemonic) -> InstructionCondition:
+        mnemonic_regex = self._get_mnemonic_regex(node)
+        captures = [
+            child
+            for child in node.children or []
+            if isinstance(
+                child, (PatternNodeCaptureGroupSpecialRegisterReference, PatternNodeCaptureGroupRegisterCall)
+            )
+        ]
+        if captures:
+            return self._get_register_capture_condition(mnemonic_regex, captures)
+
+        condition = self.mnemonic_conditions.get(mnemonic_regex)
+        if condition is None:
+            condition = MnemonicCondition(regex.compile(mnemonic_regex))
+            self.mnemonic_conditions[mnemonic_regex] = condition
+        return condition
+
+    def _get_register_capture_condition(
+        self, mnemonic_regex: str, captures: Sequence[PatternNode]
+    ) -> RegisterCaptureCondition:
+        # Lookaheads are checked without the captures of the threads
+        if self.capture_prefixes is None:
+            raise UnsupportedRuleError("register captures inside $not are not supported")
+
+        references: List[Tuple[int, RegisterCapturePrefix]] = []
+        calls: List[Tuple[int, RegisterCapturePrefix]] = []
+        for capture in captures:
+            if isinstance(capture, PatternNodeCaptureGroupSpecialRegisterReference):
+                number = get_capture_number(capture)
+                references.append((number, self.capture_prefixes[number]))
+                continue
+
+            number = CaptureGroupIndexRegisterCall(pattern_node=capture).index
+            if number not in self.capture_prefixes:
+                raise UnsupportedRuleError(f"register capture call {capture.name} is not supported")
+            # Calls after the reference of the same node match the value it captures
+            if all(number != reference_number for reference_number, _ in references):
+                calls.append((number, self.capture_prefixes[number]))
+
+        return RegisterCaptureCondition(mnemonic_regex, references, calls, self.automaton.number_of_captures)
+
+    def _get_mnemonic_regex(self, node: PatternNodeMnemonic) -> str:
+        """
+        Get the regex of a single instruction of the mnemonic.
+
+        It is matched against every stringified instruction alone, so it must not reach into the
+        next instruction nor refer to other instructions.
+        """
+
+        self._check_single_field_name(node.name)
+        self._check_operands(node, captures_allowed=True)
+        return node.get_regex_without_times()
+
+    def _check_operands(self, node: PatternNode, captures_allowed: bool = False) -> None:
+        """Register captures are only supported as operands of the mnemonic, so they are always matched"""
+
+        for child in node.children or []:
+            match child:
+                case PatternNodeTimes():
+                    continue
+                case PatternNodeCaptureGroupSpecialRegisterReference() | PatternNodeCaptureGroupRegisterCall() if (
+                    captures_allowed and self._is_single_time(child)
+                ):
+                    continue
+                case NodeOr() if self._is_single_time(child):
+                    self._check_operands(child)
+                case PatternNodeOperand():
+                    self._check_single_field_name(child.name)
+                    self._check_operands(child)
+                case PatternNodeDeref():
+                    self._check_operands(child)
+                # Deref values are a property without children, capture groups are other nodes
+                case PatternNodeDerefProperty() if child.children:
+                    self._check_operands(child)
+                case PatternNodeDerefProperty():
+                    self._check_single_field_name(child.name)
+                case _:
+                    raise UnsupportedRuleError(f"operand {type(child).__name__} is not supported")
+
+    @staticmethod
+    def _check_single_field_name(name: str | int) -> None:
+        """Raw regex names must not match across the comma that ends their field"""
+        if not is_single_field_name(name):
+            raise UnsupportedRuleError(f"regex name {name} is not supported")
+
+    @staticmethod
+    def _get_children(node: PatternNode) -> List[PatternNode]:
+        if not node.children:
+            raise UnsupportedRuleError(f"{type(node).__name__} without children is not supported")
+        return node.children
+
+    @staticmethod
+    def _is_single_time(node: PatternNode) -> bool:
+        return node.times.min_times == 1 and node.times.max_times == 1
+
+
+def iter_nodes(node: PatternNode) -> Iterator[PatternNode]:
+    """Iterate over the node and all its descendants, in the order of the rule"""
+    yield node
+    for child in node.children or []:
+        yield from iter_nodes(child)
+
+
+def get_capture_number(reference: PatternNodeCaptureGroupSpecialRegisterReference) -> int:
+    """Get the number of the capture group of a register capture reference"""
+    return reference.shared_context.capture_manager.get_capture_index(remove_access_suffix(str(reference.name)))
+
+
+class MatchSpan(NamedTuple):
+    """Instructions from index `start` to `end` (not included) of a match"""
+
+    start: int
+    end: int
+
+
+class AutomatonRun:
+    """Simulation of an automaton over the instructions of an input"""
+
+    def __init__(
+        self, instructions: Sequence[Instruction], register_index: Optional[RegisterIndex] = None
+    ) -> None:
+        self.instructions = instructions
+        self._register_index = register_index
+
+        # Identical instructions share their mnemonic conditions results
+        instruction_ids: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+        self.instruction_ids = [
+            instruction_ids.setdefault((inst.mnemonic, inst.operands), len(instruction_ids))
+            for inst in instructions
+        ]
+        # Position of an instruction of every id
+        self.id_positions = [0] * len(instruction_ids)
+        for position, instruction_id in enumerate(self.instruction_ids):
+            self.id_positions[instruction_id] = position
+
+        self._stringified_instructions: Dict[int, str] = {}
+        self._mnemonic_results: Dict[MnemonicCondition, Dict[int, bool]] = {}
+        self._register_results: Dict[
+            RegisterCaptureCondition, Dict[Tuple[int, Tuple[int, ...]], List[Tuple[int, ...]]]
+        ] = {}
+        self._lookahead_results: Dict[Tuple[int, int], bool] = {}
+        self._possible_starts: Dict[int, bytes] = {}
+
+    @property
+    def register_index(self) -> RegisterIndex:
+        """Families of the registers of the instructions, built the first time they are needed"""
+        if self._register_index is None:
+            self._register_index = RegisterIndex(self.instructions)
+        return self._register_index
+
+    def get_stringified_instruction(self, position: int) -> str:
+        instruction_id = self.instruction_ids[position]
+        stringified_instruction = self._stringified_instructions.get(instruction_id)
+        if stringified_instruction is None:
+            stringified_instruction = self.instructions[position].stringify() + ",|"
+            self._stringified_instructions[instruction_id] = stringified_instruction
+        return stringified_instruction
+
+    def is_mnemonic_satisfied(self, condition: MnemonicCondition, position: int) -> bool:
+        results = self._mnemonic_results.setdefault(condition, {})
+        instruction_id = self.instruction_ids[position]
+        result = results.get(instruction_id)
+        if result is None:
+            result = condition.pattern.fullmatch(self.get_stringified_instruction(position)) is not None
+            results[instruction_id] = result
+        return result
+
+    def get_register_families(
+        self, condition: RegisterCaptureCondition, position: int, call_families: Tuple[int, ...]
+    ) -> List[Tuple[int, ...]]:
+        """Get the families the references of the condition capture, once per instruction id and calls"""
+
+        results = self._register_results.setdefault(condition, {})
+        key = (self.instruction_ids[position], call_families)
+        result = results.get(key)
+        if result is None:
+            result = condition.match_registers(self, position, call_families)
+            results[key] = result
+        return result
+
+    def lookahead_matches(self, automaton: InstructionAutomaton, position: int) -> bool:
+        """Check if the automaton matches starting at the position, as a regex lookahead"""
+
+        key = (id(automaton), position)
+        result = self._lookahead_results.get(key)
+        if result is None:
+            result = self._lookahead_matches(automaton, position)
+            self._lookahead_results[key] = result
+        return result
+
+    def _lookahead_matches(self, automaton: InstructionAutomaton, position: int) -> bool:
+        states = list(automaton.get_closure(automaton.start))
+        while states:
+            if any(automaton.kinds[state] == MATCH for state, _ in states):
+                return True
+            if position >= len(self.instructions):
+                return False
+
+            next_states: List[Tuple[int, int]] = []
+            visited: Set[Tuple[int, int]] = set()
+            for state, used in states:
+                condition = automaton.conditions[state]
+                assert condition is not None
+                if condition.is_satisfied(self, position):
+                    for reached in automaton.get_closure(automaton.targets[state], used):
+                        if reached not in visited:
+                            visited.add(reached)
+                            next_states.append(reached)
+
+            states = next_states
+            position += 1
+
+        return False
+
+    def search(self, automaton: InstructionAutomaton, position: int) -> Optional[MatchSpan]:
+        """
+        Get the first match starting from the position.
+
+        The threads are kept by priority, as the regex search order: a thread that started earlier
+        goes first, and every new thread goes last. Once a thread matches, the threads with less
+        priority are dropped and no new thread is started.
+        """
+
+        number_of_instructions = len(self.instructions)
+        start_states = automaton.get_closure(automaton.start)
+        starts_with_mnemonics = automaton.starts_with_mnemonics()
+        empty_bindings = automaton.get_empty_bindings()
+
+        # Threads as (state, used mask, capture bindings, match start) by priority
+        threads: List[Tuple[int, int, Bindings, MatchSpan]] = []
+        found: Optional[MatchSpan] = None
+
+        while position <= number_of_instructions:
+            if found is None:
+                if not threads and starts_with_mnemonics:
+                    position = self._get_possible_starts(automaton, start_states).find(1, position)
+                    if position == -1:
+                        return None
+
+                visited = {(state, used, bindings) for state, used, bindings, _ in threads}
+                start = MatchSpan(position, position)
+                for state, used in start_states:
+                    if (state, used, empty_bindings) not in visited:
+                        visited.add((state, used, empty_bindings))
+                        threads.append((state, used, empty_bindings, start))
+
+            next_threads: List[Tuple[int, int, Bindings, MatchSpan]] = []
+            next_visited: Set[Tuple[int, int, Bindings]] = set()
+            for state, used, bindings, start in threads:
+                if automaton.kinds[state] == MATCH:
+                    found = MatchSpan(start.start, position)
+                    # Threads with less priority are not followed
+                    break
+
+                if position >= number_of_instructions:
+                    continue
+
+                condition = automaton.conditions[state]
+                assert condition is not None
+                if condition.binds_captures:
+                    reached_bindings = condition.get_bindings(self, position, bindings)  # type: ignore
+                elif condition.is_satisfied(self, position):
+                    reached_bindings = [bindings]
+                else:
+                    continue
+
+                for next_bindings in reached_bindings:
+                    for reached_state, reached_used in automaton.get_closure(automaton.targets[state], used):
+                        reached = (reached_state, reached_used, next_bindings)
+                        if reached not in next_visited:
+                            next_visited.add(reached)
+                            next_threads.append((*reached, start))
+
+            threads = next_threads
+            if found is not None and not threads:
+                return found
+            position += 1
+
+        return found
+
+    def _get_possible_starts(
+        self, automaton: InstructionAutomaton, start_states: Tuple[Tuple[int, int], ...]
+    ) -> bytes:
+        """
+        Get which instructions an automaton starting with mnemonics can consume first, as a 1 per
+        instruction.
+
+        Start states are mnemonic conditions, so they are checked once per instruction id.
+        """
+
+        possible_starts = self._possible_starts.get(id(automaton))
+        if possible_starts is None:
+            conditions = {automaton.conditions[state] for state, _ in start_states}
+            possible_ids = [
+                any(
+                    condition.is_satisfied(self, position)  # type: ignore
+                    for condition in conditions
+                )
+                for position in self.id_positions
+            ]
+            possible_starts = bytes(map(possible_ids.__getitem__, self.instruction_ids))
+            self._possible_starts[id(automaton)] = possible_starts
+        return possible_starts
+
+class AutomatonMatcher:
+    """Match a rule over a sequence of instructions with its InstructionAutomaton"""
+
+    def __init__(self, automaton: InstructionAutomaton) -> None:
+        # A rule matching no instructions would match everywhere
+        if any(automaton.kinds[state] == MATCH for state, _ in automaton.get_closure(automaton.start)):
+            raise UnsupportedRuleError("rules that can match no instructions are not supported")
+
+        self.automaton = automaton
+
+    @classmethod
+    def from_rule_tree(cls, rule_tree: PatternNode) -> "AutomatonMatcher":
+        """
+        Build the matcher of a typed rule tree, raises UnsupportedRuleError if it can not be matched
+        by an automaton. It must be called with the configuration of the rule loaded.
+        """
+        automaton = AutomatonCompiler().compile(rule_tree)
+        logger.debug("Rule automaton has %s states", len(automaton))
+        return cls(automaton)
+
+    def get_match_spans(
+        self,
+        instructions: Sequence[Instruction],
+        matching_mode: MatchingSearchMode,
+        register_index: Optional[RegisterIndex] = None,
+    ) -> List[MatchSpan]:
+        """
+        Get the spans of the matches, in order and without overlapping as the regex ones.
+
+        The register index of the instructions can be shared by the matchers of several rules.
+        """
+
+        run = AutomatonRun(instructions, register_index)
+        spans: List[MatchSpan] = []
+        position = 0
+        while position < len(instructions):
+            span = run.search(self.automaton, position)
+            if span is None:
+                break
+
+            spans.append(span)
+            if matching_mode == MatchingSearchMode.first_find:
+                break
+            position = span.end
+
+        return spans
+
+
+def get_matched_string(instructions: Sequence[Instruction], span: MatchSpan) -> str:
+    """Get the stringified instructions of a match, as the regex matches them"""
+
+    return "".join(inst.stringify() + ",|" for inst in instructions[span.start:span.end])
+
+
+class AutomatonMatchingConsumer(RegexMatchingConsumer):
+    """
+    Consumer that matches the rule with an AutomatonMatcher once every instruction was consumed.
+
+    The findings are reported as CompleteConsumer does.
+    """
+
+    def __init__(
+        self,
+        regex_rule: str,
+        automaton_matcher: AutomatonMatcher,
+        matched_observer: IMatchedObserver,
+        matching_mode: MatchingSearchMode,
+        return_only_address: bool,
+    ) -> None:
+        super().__init__(
+            regex_rule=regex_rule,
+            matched_observer=matched_observer,
+            matching_mode=matching_mode,
+            return_only_address=return_only_address,
+        )
+        self.automaton_matcher = automaton_matcher
+        self._instructions: List[Instruction] = []
+
+    def consume_instruction(self, inst: Instruction) -> None:
+        processed_inst = self._process_instruction(inst)
+        if processed_inst:
+            self._instructions.append(processed_inst)
+
+    def finalize(self) -> None:
+        logger.info("Matching %s instructions with the rule automaton", len(self._instructions))
+
+        for span in self.automaton_matcher.get_match_spans(self._instructions, self.matching_mode):
+            self._report_match(get_matched_string(self._instructions, span))
+
+        super().finalize()
@@ -0,0 +1,190 @@
+"Batch entry module, for matching one rule over many files in a single process"
+import glob
+import json
+import os
+import sys
+from argparse import Namespace
+from itertools import chain
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional
+
+from jasm.global_definitions import (
+    BinaryFileFormatNotSupported,
+    ConsumerType,
+    InputFileType,
+    MatchConfig,
+    MatchingReturnMode,
+    MatchingSearchMode,
+)
+from jasm.logging_config import configure_logger, logger
+from jasm.match import MasterOfPuppets
+from jasm.parse_arguments import parse_batch_args_from_console
+
+GLOB_CHARACTERS = frozenset("*?[")
+
+
+class BatchResult(NamedTuple):
+    """Matching result of a rule over a single file of the batch"""
+
+    file: str
+    rule: str
+    matched: bool
+    matches: List[str]
+    error: Optional[str] = None
+
+    def to_json(self) -> str:
+        return json.dumps(self._asdict())
+
+
+def read_null_separated_paths(stream: BinaryIO) -> Iterator[str]:
+    """Read a NUL separated list of paths, as printed by `find -print0`"""
+
+    pending = b""
+    for block in iter(lambda: stream.read(65536), b""):
+        *paths, pending = (pending + block).split(b"\0")
+        for path in paths:
+            if path:
+                yield os.fsdecode(path)
+
+    if pending:
+        yield os.fsdecode(pending)
+
+
+def expand_input(input_path: str) -> Iterator[str]:
+    """Expand a file, a directory (recursively) or a glob pattern into files"""
+
+    if any(char in GLOB_CHARACTERS for char in input_path) and not Path(input_path).exists():
+        for matched_path in sorted(glob.glob(input_path, recursive=True)):
+            yield from expand_input(matched_path)
+        return
+
+    path = Path(input_path)
+    if path.is_dir():
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                yield os.path.join(dirpath, filename)
+        return
+
+    yield input_path
+
+
+def iter_input_files(
+    inputs: Iterable[str], null_separated_stream: Optional[BinaryIO] = None
+) -> Iterator[str]:
+    """Get every file to match, without repetitions, in the order they were given"""
+
+    input_paths: Iterable[str] = inputs
+    if null_separated_stream is not None:
+        input_paths = chain(inputs, read_null_separated_paths(null_separated_stream))
+
+    seen_files = set()
+    for input_path in input_paths:
+        for file in expand_input(input_path):
+            if file in seen_files:
+                continue
+            seen_files.add(file)
+            yield file
+
+
+def match_files(
+    master_of_puppets: MasterOfPuppets, files: Iterable[str], input_file_type: InputFileType
+) -> Iterator[BatchResult]:
+    """
+    Match the already generated rules over every file, yielding the results of each file when they
+    are ready. Every file is parsed once for all the rules.
+    """
+
+    for file in files:
+        try:
+            results = master_of_puppets.perform_matching_all_rules(
+                input_file=file, input_file_type=input_file_type
+            )
+
+        except (OSError, ValueError, BinaryFileFormatNotSupported) as exc:
+            logger.error("Error while matching file %s: %s", file, exc)
+            error = str(exc) or type(exc).__name__
+            for compiled_rule in master_of_puppets.compiled_rules:
+                yield BatchResult(
+                    file=file,
+                    rule=compiled_rule.pattern_pathstr,
+                    matched=False,
+                    matches=[],
+                    error=error,
+                )
+            continue
+
+        for rule, result in results.items():
+            assert isinstance(result, list)
+            yield BatchResult(file=file, rule=rule, matched=bool(result), matches=result)
+
+
+def start_configurations() -> Namespace:
+    "Parse user args and start logger"
+
+    args: Namespace = parse_batch_args_from_console()
+
+    configure_logger(
+        debug=args.debug,
+        info=args.info,
+        enable_log_to_file=args.enable_logging_to_file,
+        enable_log_to_terminal=args.enable_logging_to_terminal,
+    )
+
+    return args
+
+
+def main() -> None:
+    "Batch main function. Results are printed as one JSON line per file and rule"
+
+    args = start_configurations()
+
+    input_file_type = InputFileType.assembly if args.assembly else InputFileType.binary
+    if args.all_matches:
+        matching_mode = MatchingSearchMode.all_finds
+    else:
+        matching_mode = MatchingSearchMode.first_find
+
+    if args.mask:
+        consumer_type = ConsumerType.mask
+    elif args.automaton:
+        consumer_type = ConsumerType.automaton
+    elif args.stream:
+        consumer_type = ConsumerType.stream
+    else:
+        consumer_type = ConsumerType.complete
+
+    match_config = MatchConfig(
+        pattern_pathstr=args.pattern,
+        # Every file of the batch is given to perform_matching_on_file
+        input_file="",
+        input_file_type=input_file_type,
+        return_mode=MatchingReturnMode.matched_addrs_list,
+        matching_mode=matching_mode,
+        return_only_address=args.return_only_address,
+        macros=args.macros,
+        consumer_type=consumer_type,
+        stream_window_size=args.stream_window_size,
+        windowed_matching=not args.no_windowed_matching,
+        jobs=args.jobs,
+        disassembly_cache_dir=args.disassembly_cache,
+        disassembly_cache_max_size=args.disassembly_cache_max_size * 1024**2,
+        instruction_stream_cache_dir=args.instruction_stream_cache,
+        instruction_stream_cache_max_size=args.instruction_stream_cache_max_size * 1024**2,
+        rule_cache_dir=args.rule_cache,
+        rule_cache_max_size=args.rule_cache_max_size * 1024**2,
+    )
+
+    # The rules are generated only once for the whole batch
+    master_of_puppets = MasterOfPuppets(match_config=match_config)
+
+    files = iter_input_files(
+        inputs=args.inputs, null_separated_stream=sys.stdin.buffer if args.null_stdin else None
+    )
+
+    for batch_result in match_files(master_of_puppets, files, input_file_type):
+        print(batch_result.to_json(), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,23 @@
-from typing import Final, List, Optional
+from typing import Final, List, Optional, Tuple
 
 import regex
 
-from jasm.global_definitions import MatchingSearchMode, Instruction
+from jasm.global_definitions import WINDOWED_MATCHING_CHUNK_SIZE, MatchingSearchMode, Instruction
+from jasm.instruction_starts import (
+    Text,
+    finditer_at_instruction_starts,
+    match_at_instruction_start,
+    search_at_instruction_starts,
+)
+from jasm.jasm_regex.regex_optimizer import RegexOptimizer
+from jasm.literal_prefilter import LiteralPrefilter, StartRanges
 from jasm.logging_config import logger
+from jasm.parallel_matching import ParallelMatcher
 from jasm.stringify_asm.abstracts.abs_observer import IConsumer, IInstructionObserver, IMatchedObserver
+from jasm.stringify_asm.implementations.instruction_stream_cache import (
+    CachedInstructionStream,
+    InstructionStreamRecorder,
+)
 
 
 class InstructionObserverConsumer(IConsumer):  # type: ignore
@@ -29,7 +42,33 @@ class InstructionObserverConsumer(IConsumer):  # type: ignore
         self._matched_observer.finalize()
 
 
-class CompleteConsumer(InstructionObserverConsumer):
+class MultiConsumer(IConsumer):
+    """
+    Consumer that forwards every instruction to several consumers.
+
+    It is used for parsing the input once and matching it with several rules. Every consumer reports
+    its matches to its own matched observer.
+    """
+
+    def __init__(self, consumers: List[IConsumer]) -> None:  # pylint: disable=super-init-not-called
+        self.consumers: Final = consumers
+
+    def consume_instruction(self, inst: Instruction) -> None:
+        for consumer in self.consumers:
+            consumer.consume_instruction(inst)
+
+    @property
+    def done(self) -> bool:
+        return all(consumer.done for consumer in self.consumers)
+
+    def finalize(self) -> None:
+        for consumer in self.consumers:
+            consumer.finalize()
+
+
+class RegexMatchingConsumer(InstructionObserverConsumer):
+    """Base consumer for matching the regex rule against the stringified instructions."""
+
     def __init__(
         self,
         regex_rule: str,
@@ -38,23 +77,151 @@ class CompleteConsumer(InstructionObserverConsumer):
         return_only_address: bool,
     ) -> None:
         super().__init__(regex_rule=regex_rule, matched_observer=matched_observer)
-        self._all_instructions: str = ""
-        self._all_instructions_list: List[str] = []
         self.matching_mode = matching_mode
         self.timeout_regex: Final = 60
         self.return_only_addresses: bool = return_only_address
 
+    @staticmethod
+    def get_first_addr_from_regex_result(regex_result: str) -> str:
+        return regex_result.split("::")[0]
+
+    def _report_match(self, matched_string: str) -> None:
+        """Report a match to the matched observer"""
+        if self.return_only_addresses:
+            # Returning just the address
+            addr = self.get_first_addr_from_regex_result(matched_string)
+            self._matched_observer.regex_matched(addr)
+        else:
+            # Return address and instructions
+            self._matched_observer.regex_matched(matched_string)
+
+
+class CompleteConsumer(RegexMatchingConsumer):
+    """
+    Consumer that matches the regex rule over all the stringified instructions.
+
+    Matches are only tried at the start of every stringified instruction (see instruction_starts).
+    When a `prefilter` is given, only at the ones it finds before the literals of the rule.
+
+    When `window_size` is given, it must be an upper bound of the number of instructions a match can
+    span (see MaxSpanAnalyzer). The instructions are then matched in chunks of `chunk_size`
+    instructions overlapping the next chunk by `window_size` instructions. Chunks are matched as soon
+    as they are complete, so the memory used does not grow with the whole disassembly, and the
+    findings are the same as matching the whole stringified instructions at once.
+
+    With `jobs` greater than 1 and a `window_size`, the instructions are matched in parallel once every
+    instruction was consumed (see ParallelMatcher).
+
+    When a `stream_recorder` is given, every stringified instruction is recorded for matching it
+    again later from the instruction stream cache (see match_instruction_stream).
+
+    The skips of the regex rule are bounded by the longest instruction consumed before matching (see
+    RegexOptimizer.bound_skips).
+    """
+
+    def __init__(
+        self,
+        regex_rule: str,
+        matched_observer: IMatchedObserver,
+        matching_mode: MatchingSearchMode,
+        return_only_address: bool,
+        window_size: Optional[int] = None,
+        chunk_size: int = WINDOWED_MATCHING_CHUNK_SIZE,
+        jobs: int = 1,
+        stream_recorder: Optional[InstructionStreamRecorder] = None,
+        prefilter: Optional[LiteralPrefilter] = None,
+    ) -> None:
+        super().__init__(
+            regex_rule=regex_rule,
+            matched_observer=matched_observer,
+            matching_mode=matching_mode,
+            return_only_address=return_only_address,
+        )
+        self.stream_recorder = stream_recorder
+        self.prefilter = prefilter
+        self._all_instructions: str = ""
+        self._all_instructions_list: List[str] = []
+
+        self.window_size = window_size
+        if window_size is not None:
+            chunk_size = max(chunk_size, 4 * window_size)
+        self.chunk_size = chunk_size
+        self.jobs = jobs
+        self._compiled_rule = regex.compile(regex_rule)
+
+        # Length of the longest consumed instruction, and the one the compiled rule is bounded by
+        self._max_instruction_length: int = 0
+        self._compiled_rule_bound: Optional[int] = None
+
+        # Offset of the first buffered instruction in the whole stream of stringified instructions
+        self._chunk_offset: int = 0
+
+        # Span of the last reported match, used to continue after it and to drop seam duplicates
+        self._last_match_span: Tuple[int, int] = (-1, 0)
+
+        self._done: bool = False
+
+    @property
+    def done(self) -> bool:
+        """True once no more matches can be reported and there is nothing left to record"""
+        return self._done and self.stream_recorder is None
+
     def consume_instruction(self, inst: Instruction) -> None:
+        if self._done and self.stream_recorder is None:
+            return
+
         processed_inst = self._process_instruction(inst)
         if processed_inst:
-            self._all_instructions_list.append(processed_inst.stringify() + ",|")
+            stringified_instruction = processed_inst.stringify() + ",|"
+            if self.stream_recorder is not None:
+                self.stream_recorder.add(stringified_instruction)
+            if self._done:
+                # Only recording the rest of the instructions
+                return
+            self._all_instructions_list.append(stringified_instruction)
+            # The separator is not part of the instruction
+            self._max_instruction_length = max(
+                self._max_instruction_length, len(stringified_instruction) - 1
+            )
 
-    @staticmethod
-    def get_first_addr_from_regex_result(regex_result: str) -> str:
-        return regex_result.split("::")[0]
+        window_size = self.window_size
+        if window_size is None or not self._match_while_consuming():
+            return
+
+        if len(self._all_instructions_list) >= self.chunk_size + window_size:
+            self._match_chunk(number_of_starts=self.chunk_size)
+
+    def _match_in_parallel(self) -> bool:
+        return self.window_size is not None and self.jobs > 1
+
+    def _match_while_consuming(self) -> bool:
+        return self.window_size is not None and not self._match_in_parallel()
 
     def finalize(self) -> None:
 
+        if self.stream_recorder is not None:
+            self.stream_recorder.commit()
+
+        if self._match_in_parallel():
+            match self.matching_mode:
+                case MatchingSearchMode.first_find:
+                    logger.info("Matching first occurence using %s jobs", self.jobs)
+                    self.do_match_first_occurence_in_parallel()
+
+                case MatchingSearchMode.all_finds:
+                    logger.info("Matching all findings using %s jobs", self.jobs)
+                    self.do_match_all_findings_in_parallel()
+
+            super().finalize()
+            return
+
+        if self.window_size is not None:
+            logger.info("Matching in chunks of %s instructions", self.chunk_size)
+            if not self._done:
+                self._match_chunk(number_of_starts=len(self._all_instructions_list))
+            super().finalize()
+            return
+
         self._all_instructions = "".join(self._all_instructions_list)
         logger.debug("Finalized with instructions: \n%s", self._all_instructions)
 
@@ -73,11 +240,92 @@ class CompleteConsumer(InstructionObserverConsumer):
 
         super().finalize()
 
+    def match_instruction_stream(self, instruction_stream: CachedInstructionStream) -> None:
+        """
+        Match the stringified instructions of a cached instruction stream instead of consuming them.
+
+        The findings are the same as consuming the instructions. The stream is matched in place
+        through its memory map, except when matching in parallel.
+        """
+
+        if self._match_in_parallel():
+            parallel_matcher = self._get_parallel_matcher(self._regex_rule)
+            chunks = parallel_matcher.split_stream_in_chunks(
+                instruction_stream.stream, instruction_stream.offsets
+            )
+            try:
+                match self.matching_mode:
+                    case MatchingSearchMode.first_find:
+                        logger.info("Matching first occurence using %s jobs", self.jobs)
+                        first_match = parallel_matcher.find_first_in_chunks(chunks)
+                        all_matches = [first_match] if first_match else []
+
+                    case MatchingSearchMode.all_finds:
+                        logger.info("Matching all findings using %s jobs", self.jobs)
+                        all_matches = parallel_matcher.find_all_in_chunks(chunks)
+
+            except TimeoutError as exc:
+                logger.error("Regex timeout")
+                raise ValueError("Regex timeout") from exc
+
+            for chunk_match in all_matches:
+                self._report_match(chunk_match.matched_string)
+
+            super().finalize()
+            return
+
+        if self.window_size is None:
+            self._matched_observer.stringified_instructions = instruction_stream.get_instructions(
+                0, instruction_stream.number_of_instructions
+            )
+
+        encoded_rule = regex.compile(self._regex_rule.encode("utf-8"))
+        start_ranges = self._get_start_ranges(
+            instruction_stream.stream,
+            endpos=instruction_stream.stream_length,
+            number_of_instructions=instruction_stream.number_of_instructions,
+        )
+        try:
+            match self.matching_mode:
+                case MatchingSearchMode.first_find:
+                    logger.info("Matching first occurence")
+                    match_result = search_at_instruction_starts(
+                        encoded_rule,
+                        instruction_stream.stream,
+                        0,
+                        instruction_stream.stream_length,
+                        timeout=self.timeout_regex,
+                        start_ranges=start_ranges,
+                    )
+                    if match_result:
+                        self._report_match(match_result.group(0).decode("utf-8"))
+
+                case MatchingSearchMode.all_finds:
+                    logger.info("Matching all findings")
+                    for match_result in finditer_at_instruction_starts(
+                        encoded_rule,
+                        instruction_stream.stream,
+                        0,
+                        instruction_stream.stream_length,
+                        timeout=self.timeout_regex,
+                        start_ranges=start_ranges,
+                    ):
+                        self._report_match(match_result.group(0).decode("utf-8"))
+
+        except TimeoutError as exc:
+            logger.error("Regex timeout")
+            raise ValueError("Regex timeout") from exc
+
+        super().finalize()
+
     def do_match_first_occurence(self) -> None:
         """Match the first occurence of the regex in the instructions"""
         try:
-            match_result = regex.search(
-                pattern=self._regex_rule, string=self._all_instructions, timeout=self.timeout_regex
+            match_result = search_at_instruction_starts(
+                self._get_compiled_rule(),
+                self._all_instructions,
+                timeout=self.timeout_regex,
+                start_ranges=self._get_start_ranges(self._all_instructions),
             )
 
         except TimeoutError as exc:
@@ -85,47 +333,246 @@ class CompleteConsumer(InstructionObserverConsumer):
             raise ValueError("Regex timeout") from exc
 
         if match_result:
-
-            if self.return_only_addresses:
-                # Returning just the address
-                addr = self.get_first_addr_from_regex_result(match_result.group(0))
-                self._matched_observer.regex_matched(addr)
-            else:
-                # Return address and main instruction
-                self._matched_observer.regex_matched(match_result.group(0))
+            self._report_match(match_result.group(0))
 
     def do_match_all_findings(self) -> None:
         """Match all findings of the regex in the instructions"""
         try:
-            match_iterator = regex.finditer(
-                pattern=self._regex_rule, string=self._all_instructions, timeout=self.timeout_regex
+            for match_result in finditer_at_instruction_starts(
+                self._get_compiled_rule(),
+                self._all_instructions,
+                timeout=self.timeout_regex,
+                start_ranges=self._get_start_ranges(self._all_instructions),
+            ):
+                self._report_match(match_result.group(0))
+
+        except TimeoutError as exc:
+            logger.error("Regex timeout")
+            raise ValueError("Regex timeout") from exc
+
+    def do_match_first_occurence_in_parallel(self) -> None:
+        """Match the first occurence of the regex in the instructions using several processes"""
+
+        try:
+            first_match = self._get_parallel_matcher(self._get_bounded_rule()).find_first(
+                self._all_instructions_list
             )
 
         except TimeoutError as exc:
             logger.error("Regex timeout")
             raise ValueError("Regex timeout") from exc
 
-        if match_iterator:
+        if first_match:
+            self._report_match(first_match.matched_string)
+
+    def do_match_all_findings_in_parallel(self) -> None:
+        """Match all findings of the regex in the instructions using several processes"""
+
+        try:
+            all_matches = self._get_parallel_matcher(self._get_bounded_rule()).find_all(
+                self._all_instructions_list
+            )
+
+        except TimeoutError as exc:
+            logger.error("Regex timeout")
+            raise ValueError("Regex timeout") from exc
+
+        for chunk_match in all_matches:
+            self._report_match(chunk_match.matched_string)
+
+    def _get_parallel_matcher(self, regex_rule: str) -> ParallelMatcher:
+        assert self.window_size is not None
+        return ParallelMatcher(
+            regex_rule=regex_rule,
+            window_size=self.window_size,
+            jobs=self.jobs,
+            timeout=self.timeout_regex,
+            min_chunk_size=self.chunk_size,
+            prefilter=self.prefilter,
+        )
+
+    def _get_bounded_rule(self) -> str:
+        """Get the regex rule with its skips bounded by the longest consumed instruction"""
+        return RegexOptimizer().bound_skips(self._regex_rule, self._max_instruction_length)
+
+    def _get_compiled_rule(self) -> regex.Pattern:
+        """Get the compiled bounded regex rule, compiled again once a longer instruction is consumed"""
+        if self._compiled_rule_bound != self._max_instruction_length:
+            self._compiled_rule = regex.compile(self._get_bounded_rule())
+            self._compiled_rule_bound = self._max_instruction_length
+        return self._compiled_rule
+
+    def _get_start_ranges(
+        self,
+        text: Text,
+        pos: int = 0,
+        endpos: Optional[int] = None,
+        number_of_instructions: Optional[int] = None,
+    ) -> Optional[StartRanges]:
+        """Get where matches can start in the text from the prefilter, None if there is no prefilter"""
+
+        if self.prefilter is None:
+            return None
+        return self.prefilter.get_start_ranges(text, pos, endpos, number_of_instructions)
+
+    def _match_chunk(self, number_of_starts: int) -> None:
+        """
+        Match the matches starting in the first `number_of_starts` buffered instructions.
+
+        The rest of the buffered instructions are only used as the overlap needed to complete them.
+        """
+
+        chunk = "".join(self._all_instructions_list)
+        chunk_offset = self._chunk_offset
+        starts_limit = sum(
+            len(inst_str) for inst_str in self._all_instructions_list[:number_of_starts]
+        )
+
+        # Continue where the last match ended, as regex.finditer does
+        search_position = max(0, self._last_match_span[1] - chunk_offset)
+
+        try:
+            match_iterator = finditer_at_instruction_starts(
+                self._get_compiled_rule(),
+                chunk,
+                search_position,
+                timeout=self.timeout_regex,
+                start_ranges=self._get_start_ranges(
+                    chunk, search_position, number_of_instructions=len(self._all_instructions_list)
+                ),
+            )
             for match_result in match_iterator:
-                if match_result:
-                    if self.return_only_addresses:
-                        # Returning just the address
-                        addr = self.get_first_addr_from_regex_result(match_result.group(0))
-                        self._matched_observer.regex_matched(addr)
-                    else:
-                        # Return addresses and instructions
-                        self._matched_observer.regex_matched(match_result.group(0))
-
-
-# TODO: Implement this Consumer
-# class StreamConsumer(InstructionObserverConsumer):
-
-#     def consume_instruction_normal(self, inst: Instruction) -> None:
-#         processed_inst = self._process_instruction(inst)
-#         if processed_inst:
-#             # Evaluate the instruction in the streaming regex engine
-#             # TODO: implement this
-#             # regex_engine.process(processed_inst)
-#             # if regex_engine.matched:
-#             #     self._matched_observer.regex_matched(processed_inst.addrs)
-#             pass
+                if match_result.start() >= starts_limit:
+                    break
+
+                match_span = (
+                    chunk_offset + match_result.start(), chunk_offset + match_result.end()
+                )
+                if match_span == self._last_match_span:
+                    # Already reported while matching the previous chunk
+                    continue
+
+                self._last_match_span = match_span
+                self._report_match(match_result.group(0))
+
+                if self.matching_mode == MatchingSearchMode.first_find:
+                    self._all_instructions_list = []
+                    self._done = True
+                    return
+
+        except TimeoutError as exc:
+            logger.error("Regex timeout")
+            raise ValueError("Regex timeout") from exc
+
+        del self._all_instructions_list[:number_of_starts]
+        self._chunk_offset = chunk_offset + starts_limit
+
+
+class StreamConsumer(RegexMatchingConsumer):
+    """
+    Consumer that matches the regex rule while the instructions are being consumed.
+
+    Only a bounded window of stringified instructions is kept in memory. A match attempt anchored at
+    an instruction start is done once `window_size` instructions following it were consumed, so every
+    match is reported as soon as it can be confirmed. Rules spanning more than `window_size`
+    instructions can not be matched.
+    """
+
+    def __init__(
+        self,
+        regex_rule: str,
+        matched_observer: IMatchedObserver,
+        matching_mode: MatchingSearchMode,
+        return_only_address: bool,
+        window_size: int,
+    ) -> None:
+        super().__init__(
+            regex_rule=regex_rule,
+            matched_observer=matched_observer,
+            matching_mode=matching_mode,
+            return_only_address=return_only_address,
+        )
+        if window_size < 1:
+            raise ValueError("window_size must be greater than 0")
+
+        self.window_size = window_size
+        self._compiled_rule = regex.compile(regex_rule)
+
+        # Stringified instructions not yet used as a match start
+        self._pending_instructions: List[str] = []
+
+        # Offset of the first pending instruction in the whole stream of stringified instructions
+        self._pending_offset: int = 0
+
+        # Offset where the last reported match ended. Matches can not overlap, as with regex.finditer
+        self._last_match_end: int = 0
+
+        self._done: bool = False
+
+    @property
+    def done(self) -> bool:
+        """True once no more matches can be reported"""
+        return self._done
+
+    def consume_instruction(self, inst: Instruction) -> None:
+        if self._done:
+            return
+
+        processed_inst = self._process_instruction(inst)
+        if processed_inst:
+            self._pending_instructions.append(processed_inst.stringify() + ",|")
+
+        # Every instruction in the first half has now a full window ahead of it
+        if len(self._pending_instructions) >= 2 * self.window_size:
+            self._match_pending_window(number_of_starts=self.window_size)
+
+    def finalize(self) -> None:
+        if not self._done:
+            # The remaining instructions can only be matched against what is left in the stream
+            self._match_pending_window(number_of_starts=len(self._pending_instructions))
+
+        self._pending_instructions = []
+        self._done = True
+        super().finalize()
+
+    def _match_pending_window(self, number_of_starts: int) -> None:
+        """Try a match at the start of the first `number_of_starts` pending instructions"""
+
+        window = "".join(self._pending_instructions)
+        window_start = self._pending_offset
+
+        start_position = 0
+        for inst_str in self._pending_instructions[:number_of_starts]:
+            if window_start + start_position >= self._last_match_end:
+                self._match_at(
+                    window=window, window_start=window_start, start_position=start_position
+                )
+                if self._done:
+                    return
+
+            start_position += len(inst_str)
+
+        del self._pending_instructions[:number_of_starts]
+        self._pending_offset = window_start + start_position
+
+    def _match_at(self, window: str, window_start: int, start_position: int) -> None:
+        """Try an anchored match of the rule at `start_position` of the window"""
+        try:
+            match_results = list(
+                match_at_instruction_start(
+                    self._compiled_rule, window, start_position, timeout=self.timeout_regex
+                )
+            )
+
+        except TimeoutError as exc:
+            logger.error("Regex timeout")
+            raise ValueError("Regex timeout") from exc
+
+        for match_result in match_results:
+            self._last_match_end = window_start + match_result.end()
+            self._report_match(match_result.group(0))
+
+            if self.matching_mode == MatchingSearchMode.first_find:
+                self._pending_instructions = []
+                self._done = True
+                return
@@ -0,0 +1,100 @@
+"""
+Structured memory operands.
+
+The parser normalizes the memory operands of the AT&T syntax as `k(a,b,c)` into `[a+b*c+k]` (see
+OperandsParser). A DerefRecord keeps the fields of a normalized operand, the base register `a`, the
+index register `b`, the scale `c` and the displacement `k`, so the `$deref` patterns can be evaluated
+comparing the fields of every distinct operand instead of matching the regex of the pattern over it.
+"""
+
+from functools import lru_cache
+from typing import Final, FrozenSet, NamedTuple, Optional, Tuple
+
+# Maximum number of distinct operands whose records are remembered
+DEREF_RECORDS_CACHE_SIZE: Final = 16384
+
+# A memory operand has a base, an index with its scale and a displacement
+MAX_DEREF_TERMS: Final = 3
+
+
+class DerefRecord(NamedTuple):
+    """
+    Fields of a normalized memory operand, as written in it.
+
+    The registers and the displacement are kept as text, as `%rsp` or `-0x8`, because the `$deref`
+    patterns compare how they are written. The base is empty when the operand has no base register.
+    """
+
+    base: str
+    index_register: Optional[str] = None
+    scale: Optional[int] = None
+    displacement: Optional[str] = None
+
+    def get_terms(self) -> Tuple[Tuple[str, Optional[int]], ...]:
+        """Get the terms between the `+` of the operand, the index term with its scale"""
+
+        terms: Tuple[Tuple[str, Optional[int]], ...] = ((self.base, None),)
+        if self.index_register is not None:
+            terms += ((self.index_register, self.scale),)
+        if self.displacement is not None:
+            terms += ((self.displacement, None),)
+        return terms
+
+
+@lru_cache(maxsize=DEREF_RECORDS_CACHE_SIZE)
+def get_deref_record(operand: str) -> Optional[DerefRecord]:
+    """
+    Get the fields of a normalized operand as `[%rax+%rbx*8+0x10]`, None if it is not a memory
+    operand or its fields can not be told apart
+    """
+
+    if not (operand.startswith("[") and operand.endswith("]")):
+        return None
+
+    terms = operand[1:-1].split("+")
+    if len(terms) == 1:
+        return DerefRecord(terms[0], None, None, None)
+    if len(terms) > MAX_DEREF_TERMS:
+        return None
+
+    index, separator, scale = terms[1].partition("*")
+    if not separator:
+        return DerefRecord(terms[0], None, None, terms[1]) if len(terms) == 2 else None
+    if index and scale.isdecimal() and str(int(scale)) == scale:
+        return DerefRecord(terms[0], index, int(scale), terms[2] if len(terms) == 3 else None)
+
+    # A `*` starting the displacement, as in `[%rip+*0x1dc59]`, is kept in it
+    if not index and "*" not in scale and len(terms) == 2:
+        return DerefRecord(terms[0], None, None, terms[1])
+    return None
+
+
+class DerefTerm(NamedTuple):
+    """Accepted texts of a term of a memory operand, and of its scale if it is the index term"""
+
+    values: FrozenSet[str]
+    scales: Optional[FrozenSet[str]] = None
+
+    def matches(self, text: str, scale: Optional[int]) -> bool:
+        if text not in self.values:
+            return False
+        if self.scales is None or scale is None:
+            return self.scales is None and scale is None
+        return str(scale) in self.scales
+
+
+class DerefPattern(NamedTuple):
+    """
+    Memory operands with the given terms, as a `$deref` of literal fields.
+
+    The texts of the terms do not contain `+` nor `*`, so a record matches the pattern when the
+    regex of the `$deref` fully matches its operand.
+    """
+
+    terms: Tuple[DerefTerm, ...]
+
+    def matches(self, record: DerefRecord) -> bool:
+        record_terms = record.get_terms()
+        return len(record_terms) == len(self.terms) and all(
+            term.matches(text, scale) for term, (text, scale) in zip(self.terms, record_terms)
+        )
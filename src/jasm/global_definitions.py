@@ -1,9 +1,13 @@
 "Global definition file"
 
+import hashlib
 import sys
 from dataclasses import dataclass
 from enum import Enum, auto
-from typing import Any, Dict, Final, List, Optional, TypeAlias
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Dict, Final, List, Optional, Sequence, Tuple, TypeAlias
 
 from jasm.logging_config import logger
 
@@ -26,6 +30,25 @@ IGNORE_NAME_PREFIX: Final = f"[^,|]{ASTERISK_WITH_LIMIT}"
 IGNORE_NAME_SUFFIX: Final = f"[^,|]{ASTERISK_WITH_LIMIT},"
 
 OPTIONAL_PERCENTAGE_CHAR: Final = "%?"
+
+# Number of instructions the stream consumer keeps ahead of a match attempt when the rule span can not be
+# bounded. A rule spanning more instructions than this value can not be matched by the stream consumer
+DEFAULT_STREAM_WINDOW_SIZE: Final = 512
+
+# Number of instructions matched at once by the complete consumer when matching in bounded windows
+WINDOWED_MATCHING_CHUNK_SIZE: Final = 4096
+
+# Number of chunks the instructions are split into per job when matching in parallel
+PARALLEL_MATCHING_CHUNKS_PER_JOB: Final = 4
+
+# Default maximum size in bytes of the disassembly cache
+DEFAULT_DISASSEMBLY_CACHE_MAX_SIZE: Final = 2 * 1024**3
+
+# Default maximum size in bytes of the instruction stream cache
+DEFAULT_INSTRUCTION_STREAM_CACHE_MAX_SIZE: Final = 4 * 1024**3
+
+# Default maximum size in bytes of the compiled rules cache
+DEFAULT_RULE_CACHE_MAX_SIZE: Final = 64 * 1024**2
 MAX_PYTHON_INT = sys.maxsize * 2
 
 PatternDict: TypeAlias = Dict[str, Any]
@@ -42,6 +65,40 @@ PatternNodeName: TypeAlias = str | int
 # Move this to a global config class
 ALLOW_MATCHING_SUBSTRINGS_IN_NAMES_AND_OPERANDS: Final = True
 
+# Version reported when JASM is run from a source tree without being installed
+UNKNOWN_JASM_VERSION: Final = "unknown"
+
+
+@lru_cache(maxsize=None)
+def get_jasm_version() -> str:
+    """Get the version of the installed JASM package"""
+    try:
+        return version("JASM")
+    except PackageNotFoundError:
+        return UNKNOWN_JASM_VERSION
+
+
+# Sources the regex of a rule is generated from, relative to the jasm package
+REGEX_GENERATOR_SOURCES: Final = ("jasm_regex", "derefs.py", "global_definitions.py")
+
+
+@lru_cache(maxsize=None)
+def get_regex_generator_hash() -> str:
+    """
+    Get the hash of the sources of the regex generator. Unlike the JASM version, it changes with every
+    change of the generator, also when JASM is run from a source tree.
+    """
+
+    package_path = Path(__file__).parent
+    generator_hash = hashlib.sha256()
+    for source in REGEX_GENERATOR_SOURCES:
+        source_path = package_path / source
+        source_files = sorted(source_path.rglob("*.py")) if source_path.is_dir() else [source_path]
+        for source_file in source_files:
+            generator_hash.update(source_file.relative_to(package_path).as_posix().encode("utf-8") + b"\0")
+            generator_hash.update(source_file.read_bytes() + b"\0")
+    return generator_hash.hexdigest()
+
 
 class InputFileType(Enum):
     """
@@ -74,6 +131,24 @@ class MatchingSearchMode(Enum):
     all_finds = auto()
 
 
+class ConsumerType(Enum):
+    """
+    Enum for the consumer type.
+
+    `complete`: buffer every instruction and match the rule once the input was fully consumed
+    `stream`: match the rule incrementally while instructions are consumed, keeping a bounded window
+    `mask`: match the rule with boolean masks over an instruction table once the input was fully consumed
+    (see MaskMatcher), rules it does not support are matched as `complete`
+    `automaton`: match the rule with an automaton over the instructions once the input was fully consumed
+    (see AutomatonMatcher), rules it does not support are matched as `complete`
+    """
+
+    complete = auto()
+    stream = auto()
+    mask = auto()
+    automaton = auto()
+
+
 class MatchingReturnMode(Enum):
     """
     Enum for the matching return mode.
@@ -157,41 +232,127 @@ class MatchConfig:
     """
     Dataclass for match configuration.
 
-    `pattern_pathstr`: the path to the pattern file
+    `pattern_pathstr`: the path to the pattern file, or a list of pattern files to match over the same
+    disassembly (see MasterOfPuppets.perform_matching_all_rules)
     `input_file`: the input file
     `input_file_type`: the input file type
     `return_only_address`: return only the address, not address+instruction
     `return_mode`: the return mode, options are: `bool`, `matched_addrs_list` or `all_instructions_string` (see MatchingReturnMode)
     `matching_mode`: the matching mode, options are: `first_find` or `all_finds` (see MatchingSearchMode)
     `macros`: list of extra macros path files to use
+    `consumer_type`: the consumer used for matching, options are: `complete`, `stream`, `mask` or
+    `automaton` (see ConsumerType)
+    `stream_window_size`: number of instructions kept ahead of a match attempt by the `stream` consumer,
+    by default the maximum span of the rule
+    `windowed_matching`: match the `complete` consumer instructions in chunks bounded by the maximum span of the rule
+    `jobs`: number of processes used by the `complete` consumer to match the instructions
+    `disassembly_cache_dir`: directory of the binaries disassembly cache, disabled if None
+    `disassembly_cache_max_size`: maximum size in bytes of the disassembly cache
+    `instruction_stream_cache_dir`: directory of the stringified instructions cache, disabled if None
+    `instruction_stream_cache_max_size`: maximum size in bytes of the stringified instructions cache
+    `rule_cache_dir`: directory of the compiled rules cache, disabled if None
+    `rule_cache_max_size`: maximum size in bytes of the compiled rules cache
     """
 
-    pattern_pathstr: str
+    pattern_pathstr: str | List[str]
     input_file: str
     input_file_type: InputFileType = InputFileType.assembly
     return_only_address: bool = False
     return_mode: MatchingReturnMode = MatchingReturnMode.bool
     matching_mode: MatchingSearchMode = MatchingSearchMode.first_find
     macros: Optional[List[str]] = None
+    consumer_type: ConsumerType = ConsumerType.complete
+    stream_window_size: Optional[int] = None
+    windowed_matching: bool = True
+    jobs: int = 1
+    disassembly_cache_dir: Optional[str] = None
+    disassembly_cache_max_size: int = DEFAULT_DISASSEMBLY_CACHE_MAX_SIZE
+    instruction_stream_cache_dir: Optional[str] = None
+    instruction_stream_cache_max_size: int = DEFAULT_INSTRUCTION_STREAM_CACHE_MAX_SIZE
+    rule_cache_dir: Optional[str] = None
+    rule_cache_max_size: int = DEFAULT_RULE_CACHE_MAX_SIZE
+
+    def get_pattern_pathstrs(self) -> List[str]:
+        """Get the list of pattern files, without repetitions"""
+        if isinstance(self.pattern_pathstr, str):
+            return [self.pattern_pathstr]
+        return list(dict.fromkeys(self.pattern_pathstr))
 
 
-@dataclass
 class Instruction:
-    "Main instruction class for match patterns"
+    """
+    Main instruction class for match patterns
+
+    Large disassemblies create millions of instructions, so they have no `__dict__`, the address is
+    kept as an integer and the mnemonic and operands as interned strings in a tuple. `addr` can be
+    given as the hex string printed by the disassembler, and it is printed back with the same number
+    of digits. Addresses with uppercase hex digits are also kept as given, so they are printed back
+    exactly.
+    """
+
+    __slots__ = ("address", "mnemonic", "operands", "_addr_digits", "_addr_text")
+
+    def __init__(self, addr: str | int, mnemonic: str, operands: Sequence[str]) -> None:
+        self._addr_text: Optional[str] = None
+        if isinstance(addr, str):
+            self.address: int = int(addr, 16)
+            self._addr_digits: int = len(addr)
+            if not (addr.islower() or addr.isdecimal()):
+                self._addr_text = addr
+        else:
+            self.address = addr
+            self._addr_digits = 0
+
+        self.mnemonic: str = sys.intern(mnemonic)
+        self.operands: Tuple[str, ...] = tuple(sys.intern(operand) for operand in operands)
+
+    @property
+    def addr_digits(self) -> int:
+        "Number of digits the address is printed with"
+        return self._addr_digits
 
-    addr: str
-    mnemonic: str
-    operands: List[str]
+    @property
+    def addr_text(self) -> Optional[str]:
+        "Address as given when it has uppercase hex digits, None if it is printed from its value"
+        return self._addr_text
+
+    @property
+    def addr(self) -> str:
+        "Address as a hex string, as printed by the disassembler"
+        if self._addr_text is not None:
+            return self._addr_text
+        return "%0*x" % (self._addr_digits, self.address)
 
     def stringify(self) -> str:
         "Method for returning instruction as a string"
-        return f"{self.addr}::{self.mnemonic},{','.join(self.operands)}"
+        if self._addr_text is not None:
+            return "%s::%s,%s" % (self._addr_text, self.mnemonic, ",".join(self.operands))
+        # printf style formatting is faster than a nested f-string format spec
+        return "%0*x::%s,%s" % (self._addr_digits, self.address, self.mnemonic, ",".join(self.operands))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Instruction):
+            return NotImplemented
+        return (self.address, self._addr_digits, self._addr_text, self.mnemonic, self.operands) == (
+            other.address, other._addr_digits, other._addr_text, other.mnemonic, other.operands
+        )
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return (
+            f"Instruction(addr={self.addr!r}, mnemonic={self.mnemonic!r}, operands={self.operands!r})"
+        )
 
 
 class BinaryFileFormatNotSupported(Exception):
     "Exception for binary file format not supported by disassembler"
 
 
+class UnsupportedRuleError(Exception):
+    "Exception for rules that can not be matched without their regex"
+
+
 class RegisterCaptureSuffixs(Enum):
     SUFFIX_64 = "64"
     SUFFIX_32 = "32"
@@ -224,26 +385,51 @@ class PartialMatchingConfig(Enum):
 
 
 class JASMConfig:
-    _instance = None
+    _instance: Optional["JASMConfig"] = None
+    global_info: Dict[Any, Any]
 
-    def __new__(cls):
+    def __new__(cls) -> "JASMConfig":
         if cls._instance is None:
             cls._instance = super(JASMConfig, cls).__new__(cls)
             cls.global_info = {}
         return cls._instance
 
     @staticmethod
-    def get_instance():
+    def get_instance() -> "JASMConfig":
         if JASMConfig._instance is None:
-            JASMConfig()
+            return JASMConfig()
         return JASMConfig._instance
 
-    def _set_info(self, key, value):
+    def _set_info(self, key: Any, value: Any) -> None:
         self.global_info[key] = value
 
-    def get_info(self, key):
+    def get_info(self, key: Any) -> Any:
         return self.global_info.get(key)
 
+    def get_all_info(self) -> Dict[str, Any]:
+        """Get a copy of all the loaded configuration, to load it back later with `load_all_info`."""
+        return dict(self.global_info)
+
+    def load_all_info(self, info: Dict[str, Any]) -> None:
+        """Replace all the loaded configuration with the given one."""
+        self.global_info.clear()
+        self.global_info.update(info)
+
+    def get_config(self) -> Dict[str, Any]:
+        """Get the loaded configuration as the `config` of a pattern file, to load it back with `load_config`."""
+
+        valid_addr_range = self.get_info("valid_addr_range")
+        assembly_style = self.get_info("assembly_style") or DisassStyle.att
+        return {
+            "mnemonics-full-match": bool(self.get_info(PartialMatchingConfig.MnemonicsFullMatch)),
+            "operands-full-match": bool(self.get_info(PartialMatchingConfig.OperandsFullMatch)),
+            "style": assembly_style.name,
+            "valid_addr_range": {
+                "min": hex(valid_addr_range.min.hex), "max": hex(valid_addr_range.max.hex)
+            } if valid_addr_range is not None else None,
+            "sections": list(self.get_info("sections") or []),
+        }
+
     def load_config(self, config: Dict[str, Any]) -> None:
         """Load configuration into the singleton if they are present and valid."""
         self._load_full_match_options(config)
@@ -0,0 +1,126 @@
+"""
+Matching of the regex rules only at the start of the stringified instructions.
+
+Every stringified instruction ends with the instruction separator `|`, so a match can only start at
+the start of the text or right after a separator. A regex search tries a match at every character,
+including the ones of the addresses and operands, where it always fails (or matches starting in the
+middle of an instruction, as rules starting with `$not` do). Trying an anchored match at every
+instruction start instead skips those attempts.
+"""
+
+import mmap
+import time
+from functools import lru_cache
+from typing import Iterator, Optional, Sequence, Tuple, TypeAlias
+
+import regex
+
+# Stringified instructions, decoded or encoded as the instruction stream cache memory maps
+Text: TypeAlias = str | bytes | bytearray | mmap.mmap
+
+
+def get_next_instruction_start(text: Text, position: int, endpos: int) -> int:
+    """Get the first instruction start from the position, or `endpos` if there is none"""
+
+    separator = "|" if isinstance(text, str) else b"|"
+    if position == 0 or text[position - 1:position] == separator:
+        return position
+
+    separator_position = text.find(separator, position, endpos)  # type: ignore
+    if separator_position == -1:
+        return endpos
+    return separator_position + 1
+
+
+@lru_cache(maxsize=None)
+def get_non_empty_pattern(pattern: regex.Pattern) -> regex.Pattern:
+    """Get the pattern that only matches when it consumes some text"""
+
+    if isinstance(pattern.pattern, str):
+        return regex.compile(rf"(?:{pattern.pattern})(?!\G)", pattern.flags)
+    return regex.compile(b"(?:" + pattern.pattern + rb")(?!\G)", pattern.flags)
+
+
+def match_at_instruction_start(
+    pattern: regex.Pattern,
+    text: Text,
+    position: int,
+    endpos: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[regex.Match]:
+    """
+    Get the matches of the pattern starting at the position, as `pattern.finditer` finds them: after
+    an empty match, it tries again a match that consumes some text from the same position.
+    """
+
+    match_result = pattern.match(text, position, endpos, timeout=timeout)
+    if match_result is None:
+        return
+    yield match_result
+
+    if match_result.end() == position:
+        match_result = get_non_empty_pattern(pattern).match(text, position, endpos, timeout=timeout)
+        if match_result is not None:
+            yield match_result
+
+
+def finditer_at_instruction_starts(
+    pattern: regex.Pattern,
+    text: Text,
+    pos: int = 0,
+    endpos: Optional[int] = None,
+    timeout: Optional[float] = None,
+    start_ranges: Optional[Sequence[Tuple[int, int]]] = None,
+) -> Iterator[regex.Match]:
+    """
+    Find the non overlapping matches of the pattern starting at an instruction start, as
+    `pattern.finditer(text, pos, endpos)` finds them when every match starts at an instruction start.
+
+    `timeout` bounds the whole search, TimeoutError is raised once it is exceeded. It is checked
+    between the match attempts, as the regex timeout of every attempt costs more than most attempts.
+    `start_ranges` limits the attempts to the instruction starts inside the given sorted ranges of
+    offsets, both included (see LiteralPrefilter).
+    """
+
+    if endpos is None:
+        endpos = len(text)
+    if start_ranges is None:
+        start_ranges = [(pos, endpos - 1)]
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    separator = "|" if isinstance(text, str) else b"|"
+    position = pos
+    for range_first, range_last in start_ranges:
+        position = get_next_instruction_start(text, max(position, range_first), endpos)
+        range_last = min(range_last, endpos - 1)
+        while position <= range_last:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("regex timed out")
+
+            match_end = position
+            for match_result in match_at_instruction_start(pattern, text, position, endpos):
+                yield match_result
+                match_end = match_result.end()
+            if match_end > position:
+                # Matches do not overlap, continue where the match ended
+                position = get_next_instruction_start(text, match_end, endpos)
+                continue
+
+            separator_position = text.find(separator, position, endpos)  # type: ignore
+            if separator_position == -1:
+                return
+            position = separator_position + 1
+
+
+def search_at_instruction_starts(
+    pattern: regex.Pattern,
+    text: Text,
+    pos: int = 0,
+    endpos: Optional[int] = None,
+    timeout: Optional[float] = None,
+    start_ranges: Optional[Sequence[Tuple[int, int]]] = None,
+) -> Optional[regex.Match]:
+    """Find the first match of the pattern starting at an instruction start"""
+    return next(
+        finditer_at_instruction_starts(pattern, text, pos, endpos, timeout, start_ranges), None
+    )
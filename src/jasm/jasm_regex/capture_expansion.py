@@ -0,0 +1,326 @@
+"""
+Expansion of the capture groups that can only capture a few known values.
+
+The register captures, as `&indreg`, capture a few letters of the register names with a capture group
+as `([sd])`, and match the rest of the references to them with backreferences. The backreferences can
+be replaced by the values themselves: the regex from the capture group up to its last backreference is
+matched as an alternation with an alternative for every value, in the order the capture group tries
+them, so the matches do not change. The alternation is a branch reset group, so the capture groups
+keep their numbers.
+
+The capture groups of open domains, as the `([^,|]+)` of `&` operands, keep their backreferences, they
+are bound by the regex engine while matching.
+"""
+
+from itertools import product
+from typing import Dict, Final, Iterator, List, Optional, Sequence, Tuple
+
+import regex
+
+from jasm.jasm_regex.regex_optimizer import (
+    RegexAtom,
+    RegexBranch,
+    RegexGroup,
+    RegexItem,
+    RegexOptimizer,
+    RegexParser,
+    get_literal_character,
+    join_branches,
+)
+from jasm.logging_config import logger
+
+# Maximum number of alternatives the capture groups of an alternation can be expanded into
+MAX_CAPTURE_INSTANTIATIONS: Final = 16
+
+BACKREFERENCE_REGEX = regex.compile(r"\\(?P<number>[1-9]\d*)|\\g<(?P<group>\w+)>|\(\?P=(?P<name>\w+)\)")
+
+
+class CaptureExpander:
+    """
+    Replace the backreferences of the capture groups with small domains by their values.
+
+    A capture group is expanded when it is not repeated, its values are a sequence of literals and
+    positive character sets, and every reference to it is a backreference later in the same branch.
+    Regexes with unsupported syntax, or with branch reset groups already, are returned as they are.
+    """
+
+    def __init__(self, max_instantiations: int = MAX_CAPTURE_INSTANTIATIONS) -> None:
+        self.max_instantiations = max_instantiations
+
+        # Parsed capture groups with their numbers, and the numbers of the group names
+        self._numbered_groups: List[Tuple[RegexGroup, int]] = []
+        self._name_numbers: Dict[str, int] = {}
+        self._branches: List[RegexBranch] = []
+
+    def expand(self, pattern: str) -> str:
+        """Get the regex with the captures of small domains expanded"""
+
+        try:
+            branches = RegexParser(pattern).parse()
+        except ValueError as exc:
+            logger.debug("The captures of the regex %s are not expanded: %s", pattern, exc)
+            return pattern
+
+        if any(isinstance(item, RegexGroup) and item.is_branch_reset for item in iter_items(branches)):
+            return pattern
+
+        self._branches = branches
+        self._number_groups()
+        if not self._expand_branches(branches):
+            return pattern
+
+        # The backreferences replaced by literals can make more skips possessive
+        return RegexOptimizer().optimize(join_branches(branches))
+
+    def instantiate(self, pattern: str, group_numbers: Sequence[int], values: Dict[int, str]) -> str:
+        """
+        Get a part of a regex with capture groups and backreferences matching the given values.
+
+        The capture groups of the part have the numbers of `group_numbers`, in order, as they are
+        numbered in the whole regex. Raises ValueError if the part can not be parsed.
+        """
+
+        branches = RegexParser(pattern).parse()
+        groups = [item for item in iter_items(branches) if isinstance(item, RegexGroup) and item.is_capturing]
+        if len(groups) != len(group_numbers):
+            raise ValueError(f"{len(groups)} capture groups in {pattern}, {len(group_numbers)} numbers given")
+
+        self._numbered_groups = list(zip(groups, group_numbers))
+        self._name_numbers = {}
+        return join_branches([self._instantiate_branch(branch, values) for branch in branches])
+
+    def _number_groups(self) -> None:
+        self._numbered_groups = []
+        self._name_numbers = {}
+        for item in iter_items(self._branches):
+            if isinstance(item, RegexGroup) and item.is_capturing:
+                number = len(self._numbered_groups) + 1
+                self._numbered_groups.append((item, number))
+                if item.opening.startswith("(?P<"):
+                    self._name_numbers[item.opening[4:-1]] = number
+
+    def _get_group_number(self, item: RegexItem) -> Optional[int]:
+        """Get the number of a parsed capture group, None for other items and for the expanded copies"""
+        return next((number for group, number in self._numbered_groups if group is item), None)
+
+    def _expand_branches(self, branches: List[RegexBranch]) -> bool:
+        """Expand the captures of every branch, nested ones first, True if any was expanded"""
+
+        expanded = False
+        for branch in branches:
+            for item in branch:
+                if isinstance(item, RegexGroup) and self._expand_branches(item.branches):
+                    expanded = True
+            if self._expand_branch(branch):
+                expanded = True
+        return expanded
+
+    def _expand_branch(self, branch: RegexBranch) -> bool:
+        """Replace the captures of the branch by alternations of their values, in place"""
+
+        # First and last item of every alternation, with the values of its capture groups by number
+        segments: List[Tuple[int, int, Dict[int, List[str]]]] = []
+        for index, item in enumerate(branch):
+            candidate = self._get_candidate(branch, index)
+            if candidate is None:
+                continue
+            number, last_index, values = candidate
+
+            if segments and index <= segments[-1][1]:
+                first_index, segment_last_index, segment_values = segments[-1]
+                if get_number_of_instantiations(segment_values) * len(values) > self.max_instantiations:
+                    continue
+                segment_values[number] = values
+                segments[-1] = (first_index, max(segment_last_index, last_index), segment_values)
+            else:
+                segments.append((index, last_index, {number: values}))
+
+        # Replace from the last one, so the indexes of the previous ones are kept
+        for first_index, last_index, values_by_number in reversed(segments):
+            numbers = list(values_by_number)
+            alternatives = [
+                self._instantiate_branch(branch[first_index:last_index + 1], dict(zip(numbers, values)))
+                for values in product(*(values_by_number[number] for number in numbers))
+            ]
+            if len(alternatives) == 1:
+                branch[first_index:last_index + 1] = alternatives[0]
+            else:
+                branch[first_index:last_index + 1] = [RegexGroup("(?|", alternatives)]
+
+        return bool(segments)
+
+    def _get_candidate(self, branch: RegexBranch, index: int) -> Optional[Tuple[int, int, List[str]]]:
+        """
+        Get the number of the capture group at the index of the branch, the index of its last
+        backreference and its values, None if it can not be expanded
+        """
+
+        item = branch[index]
+        if not isinstance(item, RegexGroup) or item.quantifier:
+            return None
+        number = self._get_group_number(item)
+        if number is None:
+            return None
+
+        last_index = None
+        references = 0
+        for later_index in range(index + 1, len(branch)):
+            later_references = self._count_references([[branch[later_index]]], number)
+            if later_references:
+                last_index = later_index
+                references += later_references
+
+        # Every reference must be in the rest of the branch and be a backreference
+        if last_index is None or references != self._count_references(self._branches, number):
+            return None
+        if self._is_conditioned(number):
+            return None
+
+        values = get_values(item.branches, self.max_instantiations)
+        if values is None:
+            return None
+        return number, last_index, values
+
+    def _count_references(self, branches: List[RegexBranch], number: int) -> int:
+        return sum(
+            1 for item in iter_items(branches)
+            if isinstance(item, RegexAtom) and self._get_referenced_number(item) == number
+        )
+
+    def _is_conditioned(self, number: int) -> bool:
+        """Check if a conditional group depends on the capture group"""
+
+        for item in iter_items(self._branches):
+            if isinstance(item, RegexGroup) and item.is_conditional:
+                condition = item.opening[3:-1]
+                if condition == str(number) or self._name_numbers.get(condition) == number:
+                    return True
+        return False
+
+    def _get_referenced_number(self, atom: RegexAtom) -> Optional[int]:
+        """Get the number of the capture group a backreference refers to, None if it is not one"""
+
+        reference = BACKREFERENCE_REGEX.fullmatch(atom.text)
+        if reference is None:
+            return None
+        if reference.group("number"):
+            return int(reference.group("number"))
+        name = reference.group("group") or reference.group("name")
+        if name.isdigit():
+            return int(name)
+        return self._name_numbers.get(name)
+
+    def _instantiate_branch(self, branch: RegexBranch, values: Dict[int, str]) -> RegexBranch:
+        """Copy the branch with the given capture groups matching their values, and their references"""
+
+        items: RegexBranch = []
+        for item in branch:
+            if isinstance(item, RegexAtom):
+                number = self._get_referenced_number(item)
+                if number is None or number not in values:
+                    items.append(RegexAtom(item.text, item.quantifier))
+                    continue
+                literal_atoms = get_literal_atoms(values[number])
+                if item.quantifier:
+                    items.append(RegexGroup("(?:", [literal_atoms], item.quantifier))
+                else:
+                    items.extend(literal_atoms)
+                continue
+
+            number = self._get_group_number(item)
+            if number is not None and number in values:
+                group_branches = [get_literal_atoms(values[number])]
+            else:
+                group_branches = [
+                    self._instantiate_branch(group_branch, values) for group_branch in item.branches
+                ]
+            items.append(RegexGroup(item.opening, group_branches, item.quantifier))
+        return items
+
+
+def iter_items(branches: List[RegexBranch]) -> Iterator[RegexItem]:
+    """Iterate over every item of the branches and of their groups, in the order of the regex"""
+    for branch in branches:
+        for item in branch:
+            yield item
+            if isinstance(item, RegexGroup):
+                yield from iter_items(item.branches)
+
+
+def get_values(branches: List[RegexBranch], max_values: int) -> Optional[List[str]]:
+    """
+    Get the strings the branches of a group match, in the order they are tried, None if there are more
+    than `max_values` or they can not be computed
+    """
+
+    values: List[str] = []
+    for branch in branches:
+        branch_values = [""]
+        for item in branch:
+            if item.quantifier:
+                return None
+            if isinstance(item, RegexGroup):
+                if item.opening != "(?:":
+                    return None
+                item_values = get_values(item.branches, max_values)
+            else:
+                item_values = get_atom_values(item)
+            if item_values is None or len(branch_values) * len(item_values) > max_values:
+                return None
+            branch_values = [prefix + value for prefix in branch_values for value in item_values]
+
+        for value in branch_values:
+            if value not in values:
+                values.append(value)
+        if len(values) > max_values:
+            return None
+    return values
+
+
+def get_atom_values(atom: RegexAtom) -> Optional[List[str]]:
+    """Get the characters a literal or a positive character set matches, None for other atoms"""
+
+    literal = get_literal_character(atom)
+    if literal is not None:
+        return [literal]
+    if not atom.text.startswith("[") or atom.text.startswith("[^"):
+        return None
+
+    characters: List[str] = []
+    set_text = atom.text[1:-1]
+    position = 0
+    while position < len(set_text):
+        char = set_text[position]
+        if char == "\\":
+            escaped = set_text[position + 1:position + 2]
+            if not escaped or escaped.isalnum():
+                return None
+            char = escaped
+            position += 1
+        elif char == "[":
+            return None
+
+        if set_text.startswith("-", position + 1) and position + 2 < len(set_text):
+            last = set_text[position + 2]
+            if last in "\\[" or last < char:
+                return None
+            characters.extend(chr(code) for code in range(ord(char), ord(last) + 1))
+            position += 3
+        else:
+            characters.append(char)
+            position += 1
+
+    return sorted(set(characters))
+
+
+def get_literal_atoms(value: str) -> RegexBranch:
+    """Get the atoms matching a literal string"""
+    return [RegexAtom(regex.escape(char)) for char in value]
+
+
+def get_number_of_instantiations(values_by_number: Dict[int, List[str]]) -> int:
+    number_of_instantiations = 1
+    for values in values_by_number.values():
+        number_of_instantiations *= len(values)
+    return number_of_instantiations
+
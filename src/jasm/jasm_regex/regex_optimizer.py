@@ -0,0 +1,458 @@
+"""
+Optimization of the regexes generated from the rule trees.
+
+Every pattern node wraps its regex in non-capturing groups, so the generated regexes nest redundant
+groups, repeat the instruction address skip in every alternative and backtrack into skips that can only
+match in one way. The regex is parsed into its groups, rewritten without changing its matches nor the
+numbers of its capture groups, and joined back.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+import regex
+
+from jasm.logging_config import logger
+
+QUANTIFIER_REGEX = regex.compile(r"(?:[*+?]|\{(?:\d+(?:,\d*)?|,\d+)\})[?+]?")
+CHARACTER_CLASS_ESCAPES = "dDwWsS"
+ESCAPE_HEX_LENGTHS = {"x": 2, "u": 4, "U": 8}
+
+
+@dataclass
+class RegexAtom:
+    "Single element of a regex: a character, an escape, a character set or a backreference"
+    text: str
+    quantifier: str = ""
+
+
+@dataclass
+class RegexGroup:
+    "Group of alternatives, opened by `opening` as `(?:`, `(?!`, `(?|` or `(?P<name>`"
+    opening: str
+    branches: List[List["RegexItem"]]
+    quantifier: str = ""
+
+    @property
+    def is_conditional(self) -> bool:
+        "The branches of a conditional group are its yes and no patterns, not alternatives"
+        return self.opening.startswith("(?(")
+
+    @property
+    def is_branch_reset(self) -> bool:
+        "The alternatives of a branch reset group number their capture groups from the same number"
+        return self.opening == "(?|"
+
+    @property
+    def is_capturing(self) -> bool:
+        "Check if the group is a numbered or named capture group"
+        return self.opening == "(" or self.opening.startswith("(?P<")
+
+
+RegexItem = Union[RegexAtom, RegexGroup]
+RegexBranch = List[RegexItem]
+
+
+class RegexParser:
+    """
+    Parse a regex into its branches of atoms and groups.
+
+    Only the syntax used by the generated regexes and the usual macros is supported, a ValueError is
+    raised for anything else (inline flags, comments, nested sets...).
+    """
+
+    def __init__(self, pattern: str) -> None:
+        self.pattern = pattern
+        self.position = 0
+
+    def parse(self) -> List[RegexBranch]:
+        """Parse the whole regex"""
+        branches = self._parse_branches()
+        if self.position != len(self.pattern):
+            raise ValueError(f"unbalanced parenthesis at position {self.position}")
+        return branches
+
+    def _parse_branches(self) -> List[RegexBranch]:
+        branches = [self._parse_branch()]
+        while self.pattern.startswith("|", self.position):
+            self.position += 1
+            branches.append(self._parse_branch())
+        return branches
+
+    def _parse_branch(self) -> RegexBranch:
+        items: RegexBranch = []
+        while self.position < len(self.pattern) and self.pattern[self.position] not in "|)":
+            item = self._parse_item()
+            quantifier_match = QUANTIFIER_REGEX.match(self.pattern, self.position)
+            if quantifier_match:
+                item.quantifier = quantifier_match.group(0)
+                self.position = quantifier_match.end()
+            items.append(item)
+        return items
+
+    def _parse_item(self) -> RegexItem:
+        char = self.pattern[self.position]
+        if char == "(":
+            return self._parse_group()
+        if char == "[":
+            return RegexAtom(self._read_until_set_end())
+        if char == "\\":
+            return RegexAtom(self._read_escape())
+        if QUANTIFIER_REGEX.match(self.pattern, self.position):
+            raise ValueError(f"nothing to repeat at position {self.position}")
+
+        self.position += 1
+        return RegexAtom(char)
+
+    def _parse_group(self) -> RegexItem:
+        start = self.position
+        if self.pattern.startswith("(?P=", start):
+            # Named backreference
+            return RegexAtom(self._read_past(")", start))
+
+        for opening in ("(?:", "(?!", "(?=", "(?>", "(?|", "(?<=", "(?<!"):
+            if self.pattern.startswith(opening, start):
+                self.position = start + len(opening)
+                break
+        else:
+            if self.pattern.startswith("(?P<", start):
+                self._read_past(">", start)
+            elif self.pattern.startswith("(?(", start):
+                # Conditional on a group, its name is closed by a parenthesis
+                self._read_past(")", start + 3)
+            elif self.pattern.startswith("(?", start):
+                raise ValueError(f"unsupported group at position {start}")
+            else:
+                self.position = start + 1
+
+        opening = self.pattern[start:self.position]
+        branches = self._parse_branches()
+        if not self.pattern.startswith(")", self.position):
+            raise ValueError(f"missing parenthesis of the group at position {start}")
+        self.position += 1
+        return RegexGroup(opening, branches)
+
+    def _read_past(self, closing: str, start: int) -> str:
+        """Read from `start` up to the closing character, both included"""
+        end = self.pattern.find(closing, start)
+        if end == -1:
+            raise ValueError(f"missing '{closing}' after position {start}")
+        self.position = end + 1
+        return self.pattern[start:self.position]
+
+    def _read_until_set_end(self) -> str:
+        start = self.position
+        position = start + 1
+        if self.pattern.startswith("^", position):
+            position += 1
+        if self.pattern.startswith("]", position):
+            position += 1
+
+        while position < len(self.pattern):
+            char = self.pattern[position]
+            if char == "\\":
+                position += 2
+            elif self.pattern.startswith("[:", position):
+                # POSIX class
+                end = self.pattern.find(":]", position + 2)
+                if end == -1:
+                    raise ValueError(f"unsupported set at position {start}")
+                position = end + 2
+            elif char == "[":
+                raise ValueError(f"unsupported nested set at position {start}")
+            elif char == "]":
+                self.position = position + 1
+                return self.pattern[start:self.position]
+            else:
+                position += 1
+
+        raise ValueError(f"missing ']' of the set at position {start}")
+
+    def _read_escape(self) -> str:
+        start = self.position
+        if start + 1 >= len(self.pattern):
+            raise ValueError("bad escape at the end of the regex")
+
+        escaped = self.pattern[start + 1]
+        end = start + 2
+        if escaped.isdigit():
+            while end < len(self.pattern) and self.pattern[end].isdigit():
+                end += 1
+        elif escaped in ESCAPE_HEX_LENGTHS:
+            end += ESCAPE_HEX_LENGTHS[escaped]
+        elif escaped in "pPN" and self.pattern.startswith("{", end):
+            return self._read_past("}", start)
+        elif escaped == "g" and self.pattern.startswith("<", end):
+            return self._read_past(">", start)
+
+        self.position = end
+        return self.pattern[start:end]
+
+
+class RegexOptimizer:
+    """
+    Rewrite a regex into an equivalent one that is shorter and faster to match.
+
+    - Non-capturing groups that are not repeated are merged into the branch containing them, and the
+      alternatives of the ones that are a whole alternative into their parent alternatives.
+    - Repeated single character atoms that are adjacent and equal are repeated once.
+    - Greedy repetitions of a single character atom followed by a character it does not match are made
+      possessive, they can only match in one way.
+    - The common prefix of adjacent alternatives is matched once when it can only match in one way, as
+      the instruction address skip of every alternative, so the alternatives are tried in the same order.
+
+    Regexes with unsupported syntax are returned as they are.
+    """
+
+    def optimize(self, pattern: str) -> str:
+        """Get the optimized regex of the given regex"""
+
+        try:
+            branches = RegexParser(pattern).parse()
+        except ValueError as exc:
+            logger.debug("The regex %s is not optimized: %s", pattern, exc)
+            return pattern
+
+        branches = self._optimize_branches(branches)
+        optimized_regex = join_branches(branches)
+
+        # Keep the regex usable as a part of other regexes
+        if len(branches) > 1:
+            return f"(?:{optimized_regex})"
+        return optimized_regex
+
+    def bound_skips(self, pattern: str, max_instruction_length: int) -> str:
+        """
+        Bound the skips of the regex by the length of the longest stringified instruction it is matched
+        against, separator excluded.
+
+        A repetition of a set that does not match the instruction separator can not match more
+        characters than the longest instruction, so it gives up after those characters instead of the
+        ones of `ASTERISK_WITH_LIMIT`. The matches do not change.
+        """
+
+        try:
+            branches = RegexParser(pattern).parse()
+        except ValueError as exc:
+            logger.debug("The skips of the regex %s are not bounded: %s", pattern, exc)
+            return pattern
+
+        for branch in branches:
+            self._bound_branch_skips(branch, max_instruction_length)
+        return join_branches(branches)
+
+    def _bound_branch_skips(self, branch: RegexBranch, max_instruction_length: int) -> None:
+        for item in branch:
+            if isinstance(item, RegexGroup):
+                for group_branch in item.branches:
+                    self._bound_branch_skips(group_branch, max_instruction_length)
+                continue
+
+            bounds = get_quantifier_bounds(item.quantifier)
+            if not bounds or not matches_single_character(item) or regex.fullmatch(item.text, "|"):
+                continue
+            minimum, maximum, mode = bounds
+            if minimum <= max_instruction_length and (maximum is None or maximum > max_instruction_length):
+                item.quantifier = make_quantifier(minimum, max_instruction_length) + mode
+
+    def _optimize_branches(self, branches: List[RegexBranch], keep_branches: bool = False) -> List[RegexBranch]:
+        """
+        Optimize the alternatives of a group, `keep_branches` for the groups whose branches are not
+        plain alternatives (conditional and branch reset groups)
+        """
+
+        branches = [self._optimize_branch(branch) for branch in branches]
+        if keep_branches:
+            return branches
+        return self._factor_common_prefixes(self._merge_alternatives(branches))
+
+    def _optimize_branch(self, branch: RegexBranch) -> RegexBranch:
+        items: RegexBranch = []
+        for item in branch:
+            if isinstance(item, RegexGroup):
+                item.branches = self._optimize_branches(
+                    item.branches, item.is_conditional or item.is_branch_reset
+                )
+                if item.opening == "(?:" and len(item.branches) == 1:
+                    group_items = item.branches[0]
+                    if not item.quantifier:
+                        items.extend(group_items)
+                        continue
+                    # Repeat the atom itself, as `(?:0x)?` can not be
+                    if len(group_items) == 1 and isinstance(group_items[0], RegexAtom):
+                        if not group_items[0].quantifier:
+                            items.append(RegexAtom(group_items[0].text, item.quantifier))
+                            continue
+            items.append(item)
+
+        return self._make_possessive(self._merge_repetitions(items))
+
+    @staticmethod
+    def _merge_alternatives(branches: List[RegexBranch]) -> List[RegexBranch]:
+        merged: List[RegexBranch] = []
+        for branch in branches:
+            if len(branch) == 1 and is_plain_group(branch[0]):
+                merged.extend(branch[0].branches)  # type: ignore
+            else:
+                merged.append(branch)
+        return merged
+
+    @staticmethod
+    def _merge_repetitions(items: RegexBranch) -> RegexBranch:
+        """Merge adjacent repetitions of the same single character atom, as `a{0,3}a{1,2}` into `a{1,5}`"""
+
+        merged: RegexBranch = []
+        for item in items:
+            previous = merged[-1] if merged else None
+            if (
+                isinstance(item, RegexAtom) and isinstance(previous, RegexAtom) and item.text == previous.text
+                and matches_single_character(item) and (item.quantifier or previous.quantifier)
+            ):
+                previous_bounds = get_greedy_bounds(previous.quantifier)
+                bounds = get_greedy_bounds(item.quantifier)
+                if previous_bounds and bounds:
+                    maximum = None
+                    if previous_bounds[1] is not None and bounds[1] is not None:
+                        maximum = previous_bounds[1] + bounds[1]
+                    previous.quantifier = make_quantifier(previous_bounds[0] + bounds[0], maximum)
+                    continue
+            merged.append(item)
+        return merged
+
+    @staticmethod
+    def _make_possessive(items: RegexBranch) -> RegexBranch:
+        for item, next_item in zip(items, items[1:]):
+            if not isinstance(item, RegexAtom) or not matches_single_character(item):
+                continue
+            if not get_greedy_bounds(item.quantifier) or not item.quantifier:
+                continue
+            if not isinstance(next_item, RegexAtom) or next_item.quantifier:
+                continue
+            next_char = get_literal_character(next_item)
+            if next_char is not None and regex.fullmatch(item.text, next_char) is None:
+                item.quantifier += "+"
+        return items
+
+    def _factor_common_prefixes(self, branches: List[RegexBranch]) -> List[RegexBranch]:
+        factored: List[RegexBranch] = []
+        first = 0
+        while first < len(branches):
+            # Adjacent alternatives starting with the same item
+            end = first + 1
+            while end < len(branches) and self._get_common_prefix_length([branches[first], branches[end]]):
+                end += 1
+            if end - first < 2:
+                factored.append(branches[first])
+                first += 1
+                continue
+
+            prefix_length = self._get_common_prefix_length(branches[first:end])
+            suffixes = self._factor_common_prefixes(
+                self._merge_alternatives([branch[prefix_length:] for branch in branches[first:end]])
+            )
+            if len(suffixes) == 1:
+                factored.append(branches[first][:prefix_length] + suffixes[0])
+            else:
+                factored.append(branches[first][:prefix_length] + [RegexGroup("(?:", suffixes)])
+            first = end
+        return factored
+
+    @staticmethod
+    def _get_common_prefix_length(branches: List[RegexBranch]) -> int:
+        """Length of the common prefix of the branches that can only match in one way"""
+
+        length = 0
+        for items in zip(*branches):
+            first_item = items[0]
+            if not isinstance(first_item, RegexAtom) or not matches_single_character(first_item):
+                break
+            if first_item.quantifier and not is_possessive(first_item.quantifier):
+                break
+            if any(item != first_item for item in items[1:]):
+                break
+            length += 1
+        return length
+
+
+def join_branches(branches: List[RegexBranch]) -> str:
+    """Join parsed branches back into a regex"""
+    return "|".join("".join(join_item(item) for item in branch) for branch in branches)
+
+
+def join_item(item: RegexItem) -> str:
+    """Join a parsed item back into a regex"""
+    if isinstance(item, RegexAtom):
+        return item.text + item.quantifier
+    return f"{item.opening}{join_branches(item.branches)}){item.quantifier}"
+
+
+def is_plain_group(item: RegexItem) -> bool:
+    """Check if the item is a non-capturing group that is not repeated"""
+    return isinstance(item, RegexGroup) and item.opening == "(?:" and not item.quantifier
+
+
+def matches_single_character(atom: RegexAtom) -> bool:
+    """Check if the atom, without its quantifier, always matches exactly one character"""
+    text = atom.text
+    if text.startswith("[") or text == ".":
+        return True
+    if len(text) == 1:
+        return text not in "^$"
+    if len(text) != 2 or text[0] != "\\":
+        return False
+    return not text[1].isalnum() or text[1] in CHARACTER_CLASS_ESCAPES
+
+
+def get_literal_character(atom: RegexAtom) -> Optional[str]:
+    """Get the character a literal atom matches, None if it is not a literal"""
+    if len(atom.text) == 1 and atom.text not in ".^$":
+        return atom.text
+    if len(atom.text) == 2 and atom.text[0] == "\\" and not atom.text[1].isalnum():
+        return atom.text[1]
+    return None
+
+
+def get_quantifier_bounds(quantifier: str) -> Optional[Tuple[int, Optional[int], str]]:
+    """
+    Get the minimum, the maximum (None if unbounded) and the mode (`?` for lazy and `+` for possessive
+    quantifiers, empty for greedy ones) of a quantifier, None if there is no quantifier.
+    """
+
+    match quantifier:
+        case "":
+            return None
+        case "*" | "*?" | "*+":
+            return 0, None, quantifier[1:]
+        case "+" | "+?" | "++":
+            return 1, None, quantifier[1:]
+        case "?" | "??" | "?+":
+            return 0, 1, quantifier[1:]
+
+    bounds, _, mode = quantifier[1:].partition("}")
+    minimum, comma, maximum = bounds.partition(",")
+    if not comma:
+        return int(minimum), int(minimum), mode
+    return int(minimum or 0), int(maximum) if maximum else None, mode
+
+
+def get_greedy_bounds(quantifier: str) -> Optional[Tuple[int, Optional[int]]]:
+    """Get the minimum and maximum (None if unbounded) of a greedy quantifier, None if it is not greedy"""
+
+    if not quantifier:
+        return 1, 1
+    bounds = get_quantifier_bounds(quantifier)
+    if bounds is None or bounds[2]:
+        return None
+    return bounds[0], bounds[1]
+
+
+def make_quantifier(minimum: int, maximum: Optional[int]) -> str:
+    """Make the greedy quantifier of the given bounds"""
+    if minimum == maximum:
+        return f"{{{minimum}}}"
+    return f"{{{minimum},{'' if maximum is None else maximum}}}"
+
+
+def is_possessive(quantifier: str) -> bool:
+    """Check if the quantifier is possessive"""
+    return len(quantifier) > 1 and quantifier.endswith("+")
@@ -0,0 +1,157 @@
+"Static analysis for matching `$and_any_order` nodes without expanding every permutation"
+
+from typing import Final, List, Optional
+
+from jasm.jasm_regex.tree_analysis.max_span import is_single_field_name
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.deref import (
+    PatternNodeDeref,
+    PatternNodeDerefProperty,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.mnemonic_and_operand.mnemonic_and_operand import (
+    PatternNodeMnemonic,
+    PatternNodeOperand,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.node_branch_root import (
+    NodeAnd,
+    NodeAndAnyOrder,
+    NodeNot,
+    NodeOr,
+    PatternNodeTimes,
+)
+
+# Every repetition of a marked node is unrolled with its own groups, so nodes repeated more times keep
+# the permutations regex
+MAX_UNROLLED_ANY_ORDER_TIMES: Final = 8
+
+
+class FixedLengthAnalyzer:
+    """
+    Compute the number of instructions a typed pattern node always consumes.
+
+    `None` is returned when the node can consume a different number of instructions, or when it is
+    not known. When every child of a `$and_any_order` has a fixed length, all its orders end at the
+    same instruction, so the order in which they are tried does not change the matches.
+    """
+
+    def get_fixed_length(self, node: PatternNode) -> Optional[int]:
+        """Get the number of instructions the given node always consumes"""
+
+        match node:
+            case PatternNodeTimes():
+                return 0
+
+            # NodeAndAnyOrder is a NodeAnd, so it must be checked first
+            case NodeAndAnyOrder():
+                return self._repeat(self._sum_children(node), node)
+
+            case NodeAnd():
+                # When repeated, every repetition skips the following instruction
+                extra_skip = 0 if self._is_single_time(node) else 1
+                length = self._sum_children(node)
+                return self._repeat(None if length is None else length + extra_skip, node)
+
+            case NodeOr():
+                lengths = self._children_lengths(node)
+                if not lengths or None in lengths or len(set(lengths)) != 1:
+                    return None
+                return self._repeat(lengths[0], node)
+
+            case NodeNot():
+                # The negative lookahead is followed by a skip to the end of the instruction
+                return self._repeat(1, node)
+
+            case PatternNodeMnemonic():
+                # Raw regex names can reach into the next instructions
+                if not self._has_single_field_names(node):
+                    return None
+                return self._repeat(1, node)
+
+        return None
+
+    def _has_single_field_names(self, node: PatternNode) -> bool:
+        if not is_single_field_name(node.name):
+            return False
+
+        for child in node.children or []:
+            match child:
+                case PatternNodeTimes():
+                    continue
+                case NodeOr() | PatternNodeDeref():
+                    if not all(self._has_single_field_names(grandchild) for grandchild in child.children or []):
+                        return False
+                case PatternNodeOperand() | PatternNodeDerefProperty():
+                    if not self._has_single_field_names(child):
+                        return False
+                case _:
+                    return False
+
+        return True
+
+    @staticmethod
+    def _is_single_time(node: PatternNode) -> bool:
+        return node.times.min_times == 1 and node.times.max_times == 1
+
+    @staticmethod
+    def _repeat(length: Optional[int], node: PatternNode) -> Optional[int]:
+        if length is None or node.times.min_times != node.times.max_times:
+            return None
+        return length * node.times.max_times
+
+    def _children_lengths(self, node: PatternNode) -> List[Optional[int]]:
+        if not node.children:
+            return []
+        return [self.get_fixed_length(child) for child in node.children]
+
+    def _sum_children(self, node: PatternNode) -> Optional[int]:
+        lengths = self._children_lengths(node)
+        if not lengths or None in lengths:
+            return None
+        return sum(length for length in lengths if length is not None)
+
+
+class AnyOrderGroupsMarker:
+    """
+    Mark the `$and_any_order` nodes whose regex can track the used children with named groups.
+
+    The groups keep their value while the regex goes on, so the node must not be inside a repeated
+    node, except through a `$not` whose lookahead drops its groups. The rule must not have capture
+    groups, as their references are group numbers, and every child must have a fixed length. The node
+    must not be repeated more than MAX_UNROLLED_ANY_ORDER_TIMES times.
+    """
+
+    def __init__(self) -> None:
+        self.fixed_length_analyzer = FixedLengthAnalyzer()
+        self._marked_nodes = 0
+
+    def mark(self, rule_tree: PatternNode) -> None:
+        """Set `used_groups_prefix` of the `$and_any_order` nodes of the rule that can use groups"""
+
+        if rule_tree.shared_context.capture_manager.capture_group_references:
+            return
+
+        self._mark(rule_tree, repeated=False)
+
+    def _mark(self, node: PatternNode, repeated: bool) -> None:
+        if (
+            isinstance(node, NodeAndAnyOrder)
+            and not repeated
+            and node.times.max_times <= MAX_UNROLLED_ANY_ORDER_TIMES
+            and self._has_fixed_length_children(node)
+        ):
+            node.used_groups_prefix = f"any_order_{self._marked_nodes}"
+            self._marked_nodes += 1
+
+        if isinstance(node, NodeNot):
+            repeated = False
+        else:
+            repeated = repeated or not (node.times.min_times == 1 and node.times.max_times == 1)
+
+        for child in node.children or []:
+            self._mark(child, repeated)
+
+    def _has_fixed_length_children(self, node: NodeAndAnyOrder) -> bool:
+        children = [child for child in node.children or [] if not isinstance(child, PatternNodeTimes)]
+        return bool(children) and all(
+            self.fixed_length_analyzer.get_fixed_length(child) is not None for child in children
+        )
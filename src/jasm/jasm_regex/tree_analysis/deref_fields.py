@@ -0,0 +1,95 @@
+"Translation of the `$deref` nodes with literal fields into field comparisons"
+
+from typing import Dict, FrozenSet, List, Optional
+
+from jasm.derefs import DerefPattern, DerefTerm
+from jasm.jasm_regex.tree_analysis.max_span import REGEX_METACHARACTERS
+from jasm.jasm_regex.tree_generators.deref_classes import DerefChildNames
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.deref import (
+    PatternNodeDeref,
+    PatternNodeDerefProperty,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.node_branch_root import NodeOr
+
+
+def get_deref_pattern(node: PatternNodeDeref) -> Optional[DerefPattern]:
+    """
+    Get the fields a `$deref` node compares, with the same layout of terms as its regex (see
+    DerefObject). None if some field is not a literal or a `$or` of literals, as the capture groups.
+    """
+
+    main_reg = _get_field_values(node, DerefChildNames.MAIN_REG, "%")
+    if not main_reg:
+        return None
+
+    # Values of the optional fields the node has
+    fields: Dict[DerefChildNames, FrozenSet[str]] = {}
+    for child_name, prefix in (
+        (DerefChildNames.CONSTANT_OFFSET, "0x"),
+        (DerefChildNames.REGISTER_MULTIPLIER, "%"),
+        (DerefChildNames.CONSTANT_MULTIPLIER, "0x"),
+    ):
+        if _get_field(node, child_name) is None:
+            continue
+        values = _get_field_values(node, child_name, prefix)
+        if values is None:
+            return None
+        fields[child_name] = values
+
+    constant_offset = fields.get(DerefChildNames.CONSTANT_OFFSET)
+    register_multiplier = fields.get(DerefChildNames.REGISTER_MULTIPLIER)
+    constant_multiplier = fields.get(DerefChildNames.CONSTANT_MULTIPLIER)
+
+    terms: List[DerefTerm] = [DerefTerm(main_reg)]
+    if register_multiplier and constant_multiplier:
+        terms.append(DerefTerm(register_multiplier, constant_multiplier))
+    elif register_multiplier:
+        terms.append(DerefTerm(register_multiplier))
+    elif constant_multiplier:
+        terms.append(DerefTerm(constant_multiplier))
+    if constant_offset:
+        terms.append(DerefTerm(constant_offset))
+
+    return DerefPattern(tuple(terms))
+
+
+def _get_field(node: PatternNodeDeref, child_name: DerefChildNames) -> Optional[PatternNode]:
+    return next((child for child in node.children or [] if child.name == child_name.value), None)
+
+
+def _get_field_values(
+    node: PatternNodeDeref, child_name: DerefChildNames, optional_prefix: str
+) -> Optional[FrozenSet[str]]:
+    """Get the texts a field matches, with and without the prefix its regex makes optional"""
+
+    field = _get_field(node, child_name)
+    if not isinstance(field, PatternNodeDerefProperty) or not field.children or len(field.children) != 1:
+        return None
+
+    literals = _get_literals(field.children[0])
+    if literals is None:
+        return None
+    return frozenset(literals) | frozenset(f"{optional_prefix}{literal}" for literal in literals)
+
+
+def _get_literals(node: PatternNode) -> Optional[List[str]]:
+    """Get the literals a field value is, None if it is not a literal nor a `$or` of them"""
+
+    match node:
+        case PatternNodeDerefProperty() if not node.children:
+            literal = str(node.name)
+            if not literal or any(char in REGEX_METACHARACTERS for char in literal):
+                return None
+            return [literal]
+
+        case NodeOr() if node.times.min_times == 1 and node.times.max_times == 1 and node.children:
+            literals: List[str] = []
+            for child in node.children:
+                child_literals = _get_literals(child)
+                if child_literals is None:
+                    return None
+                literals.extend(child_literals)
+            return literals
+
+    return None
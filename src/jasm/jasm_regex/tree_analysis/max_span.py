@@ -0,0 +1,204 @@
+"Static analysis of the maximum number of instructions a rule can span"
+
+from typing import Final, List, Optional
+
+import regex
+
+from jasm.global_definitions import PatternNodeName
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.capture_group.capture_group_instruction import (
+    PatternNodeCaptureGroupInstructionCall,
+    PatternNodeCaptureGroupInstructionReference,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.capture_group.capture_group_operand import (
+    PatternNodeCaptureGroupOperandCall,
+    PatternNodeCaptureGroupOperandReference,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.capture_group.capture_group_register import (
+    PatternNodeCaptureGroupRegisterCall,
+    PatternNodeCaptureGroupSpecialRegisterReference,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.deref import (
+    PatternNodeDeref,
+    PatternNodeDerefProperty,
+    PatternNodeDerefPropertyCaptureGroupCall,
+    PatternNodeDerefPropertyCaptureGroupReference,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.mnemonic_and_operand.mnemonic_and_operand import (
+    PatternNodeMnemonic,
+    PatternNodeOperand,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.node_branch_root import (
+    NodeAnd,
+    NodeAndAnyOrder,
+    NodeNot,
+    NodeOr,
+    PatternNodeTimes,
+)
+
+# Characters that turn a pattern node name into a raw regex fragment (e.g. the `@any` macro)
+REGEX_METACHARACTERS: Final = frozenset(".^$*+?{}[]\\|()")
+
+# Raw regex names that only match inside a single operand, as the one of the `@any` macro
+SINGLE_FIELD_REGEX_NAME: Final = regex.compile(r"\[\^[^\]\\]*,[^\]\\]*\](?:\{\d*(?:,\d*)?\}|[*+?])?")
+
+# Pieces of the raw regex names whose matches can be checked: character classes, literal characters
+# and anchors, each one optionally repeated
+NAME_REGEX_PIECE: Final = regex.compile(r"(\[\^?\]?[^\]]*\]|[^.*+?{}\[\]\\|()])(?:\{\d*(?:,\d*)?\}|[*+?])?\??")
+
+# The separator between two instructions in the stringified instructions
+INSTRUCTION_SEPARATOR: Final = "|"
+
+
+def is_single_field_name(name: PatternNodeName) -> bool:
+    """Check if a pattern node name can only match inside the mnemonic or the operand it names"""
+    name_str = str(name)
+    if not any(char in REGEX_METACHARACTERS for char in name_str):
+        return True
+    return SINGLE_FIELD_REGEX_NAME.fullmatch(name_str) is not None
+
+
+def can_match_instruction_separator(name: PatternNodeName) -> bool:
+    """
+    Check if a pattern node name can consume an instruction separator. It is True when it can not
+    be proven otherwise, as for the names with `.` or escapes.
+    """
+
+    name_str = str(name)
+    if is_single_field_name(name_str):
+        return False
+
+    position = 0
+    while position < len(name_str):
+        piece_match = NAME_REGEX_PIECE.match(name_str, position)
+        if piece_match is None:
+            return True
+        if _can_piece_match_separator(piece_match.group(1)):
+            return True
+        position = piece_match.end()
+    return False
+
+
+def _can_piece_match_separator(piece: str) -> bool:
+    if not piece.startswith("["):
+        return piece == INSTRUCTION_SEPARATOR
+
+    if "\\" in piece:
+        return True
+    if piece.startswith("[^"):
+        # The separator is always preceded by a comma, see is_single_field_name
+        return not any(char in piece[2:-1] for char in f",{INSTRUCTION_SEPARATOR}")
+
+    members = piece[1:-1]
+    if INSTRUCTION_SEPARATOR in members:
+        return True
+    # Ranges as `a-z`, the first `]` of `[]...]` and a trailing `-` are literal members
+    return any(
+        members[index - 1] <= INSTRUCTION_SEPARATOR <= members[index + 1]
+        for index in range(1, len(members) - 1)
+        if members[index] == "-"
+    )
+
+
+class MaxSpanAnalyzer:
+    """
+    Compute an upper bound of the number of instructions a typed pattern node can inspect.
+
+    The span is measured as the number of instruction separators (`|`) the node regex can consume or
+    look ahead over, so a match starting inside instruction `i` only depends on instructions `i` to
+    `i + span`. `None` is returned when the span can not be bounded.
+    """
+
+    def get_max_span(self, node: PatternNode) -> Optional[int]:
+        """Get the maximum span of the given node"""
+
+        match node:
+            case PatternNodeTimes():
+                return 0
+
+            # NodeAndAnyOrder is a NodeAnd, so it must be checked first
+            case NodeAndAnyOrder():
+                return self._repeat(self._sum_children(node), node)
+
+            case NodeAnd():
+                # When repeated, every repetition skips up to the end of the following instruction
+                extra_skip = 0 if self._is_single_time(node) else 1
+                return self._repeat(self._add(self._sum_children(node), extra_skip), node)
+
+            case NodeOr():
+                return self._repeat(self._max_children(node), node)
+
+            case NodeNot():
+                # The negative lookahead inspects the child and then skips to the end of the instruction
+                return self._repeat(self._add(self._max_children(node), 1), node)
+
+            case PatternNodeMnemonic():
+                own_span = self._add(self._add(self._sum_children(node), 1), self._name_span(node))
+                return self._repeat(own_span, node)
+
+            case PatternNodeCaptureGroupInstructionReference() | PatternNodeCaptureGroupInstructionCall():
+                return 1
+
+            case (
+                PatternNodeCaptureGroupOperandReference()
+                | PatternNodeCaptureGroupOperandCall()
+                | PatternNodeCaptureGroupSpecialRegisterReference()
+                | PatternNodeCaptureGroupRegisterCall()
+                | PatternNodeDerefPropertyCaptureGroupReference()
+                | PatternNodeDerefPropertyCaptureGroupCall()
+            ):
+                return 0
+
+            case PatternNodeOperand() | PatternNodeDerefProperty():
+                return self._add(self._sum_children(node), self._name_span(node))
+
+            case PatternNodeDeref():
+                return self._repeat(self._sum_children(node), node)
+
+        return None
+
+    @staticmethod
+    def _name_span(node: PatternNode) -> Optional[int]:
+        """
+        Span of the node name itself.
+
+        Plain names never cross an instruction separator. A raw regex fragment, as the ones coming
+        from macros, is unbounded unless it can not consume a separator (see
+        can_match_instruction_separator).
+        """
+        if can_match_instruction_separator(node.name):
+            return None
+        return 0
+
+    @staticmethod
+    def _is_single_time(node: PatternNode) -> bool:
+        return node.times.min_times == 1 and node.times.max_times == 1
+
+    @staticmethod
+    def _add(span: Optional[int], value: Optional[int]) -> Optional[int]:
+        if span is None or value is None:
+            return None
+        return span + value
+
+    @staticmethod
+    def _repeat(span: Optional[int], node: PatternNode) -> Optional[int]:
+        if span is None:
+            return None
+        return span * node.times.max_times
+
+    def _children_spans(self, node: PatternNode) -> List[Optional[int]]:
+        if not node.children:
+            return []
+        return [self.get_max_span(child) for child in node.children]
+
+    def _sum_children(self, node: PatternNode) -> Optional[int]:
+        spans = self._children_spans(node)
+        if None in spans:
+            return None
+        return sum(span for span in spans if span is not None)
+
+    def _max_children(self, node: PatternNode) -> Optional[int]:
+        spans = self._children_spans(node)
+        if None in spans:
+            return None
+        return max((span for span in spans if span is not None), default=0)
@@ -0,0 +1,80 @@
+"Static analysis of the literal strings every match of a rule contains"
+
+from typing import FrozenSet, List, Optional
+
+from jasm.jasm_regex.tree_analysis.max_span import REGEX_METACHARACTERS
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.mnemonic_and_operand.mnemonic_and_operand import (
+    PatternNodeMnemonic,
+    PatternNodeOperand,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.node_branch_root import (
+    NodeAnd,
+    NodeOr,
+)
+
+# Set of literals where at least one of them is in every match
+LiteralClause = FrozenSet[str]
+
+
+class RequiredLiteralsAnalyzer:
+    """
+    Compute the literal strings the stringified instructions of every match of a typed pattern node
+    contain.
+
+    The result is a list of clauses, every match contains at least one literal of every clause.
+    Mnemonic and operand names without regex metacharacters are inserted as they are in the regex,
+    so they are literals of the match. `$not` nodes, optional nodes, capture groups and `$deref` add
+    no literals.
+    """
+
+    def get_required_literals(self, node: PatternNode) -> List[LiteralClause]:
+        """Get the literal clauses of the given node"""
+
+        if node.times.min_times < 1:
+            return []
+
+        match node:
+            # NodeAndAnyOrder is a NodeAnd too, all its children are matched
+            case NodeAnd():
+                return self._get_children_literals(node)
+
+            case NodeOr():
+                clause = self._get_any_child_clause(node)
+                return [clause] if clause else []
+
+            case PatternNodeMnemonic():
+                return self._get_name_clauses(node) + self._get_children_literals(node)
+
+            case PatternNodeOperand():
+                return self._get_name_clauses(node)
+
+        return []
+
+    def _get_children_literals(self, node: PatternNode) -> List[LiteralClause]:
+        clauses: List[LiteralClause] = []
+        for child in node.children or []:
+            for clause in self.get_required_literals(child):
+                if clause not in clauses:
+                    clauses.append(clause)
+        return clauses
+
+    def _get_any_child_clause(self, node: PatternNode) -> Optional[LiteralClause]:
+        """Get a clause satisfied by every match of any child, None if a child has no literals"""
+
+        literals: set[str] = set()
+        for child in node.children or []:
+            child_clauses = self.get_required_literals(child)
+            if not child_clauses:
+                return None
+            # Longer literals are expected to be less frequent
+            literals |= max(child_clauses, key=lambda clause: min(len(literal) for literal in clause))
+
+        return frozenset(literals) if literals else None
+
+    @staticmethod
+    def _get_name_clauses(node: PatternNode) -> List[LiteralClause]:
+        name = node.get_regex_name() if isinstance(node, PatternNodeOperand) else str(node.name)
+        if not name or any(char in REGEX_METACHARACTERS for char in name):
+            return []
+        return [frozenset([name])]
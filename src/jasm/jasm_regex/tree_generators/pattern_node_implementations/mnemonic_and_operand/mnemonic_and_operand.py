@@ -54,6 +54,12 @@ class PatternNodeOperand(PatternNode):
         operand_elem = "0x" + hex_operand_elem.removesuffix("h")
         return operand_elem
 
+    def get_regex_name(self) -> str:
+        "Name of the operand as its regex has it, hex operands are written as `0x` numbers"
+        if self._is_hex_operand(self.name):
+            return self._process_hex_operand(str(self.name))
+        return str(self.name)
+
     def get_regex(self) -> str:
         if self.children:
             logger.warning("Operand %s has children", self.name)
@@ -94,6 +100,13 @@ class PatternNodeMnemonic(PatternNode):
             operands_regex=operands_regex, allow_matching_substrings=substr_flag
         )
 
+    def get_regex_without_times(self) -> str:
+        "Regex of a single instruction of the mnemonic, ignoring its times"
+        substr_flag = self.helper.allow_matching_substring(PartialMatchingConfig.MnemonicsFullMatch)
+        return self._form_regex_without_time(
+            operands_regex=self.get_operand_regex(), allow_matching_substrings=substr_flag
+        )
+
     def get_operand_regex(self) -> Optional[str]:
         if not self.children:
             return None
@@ -68,6 +68,48 @@ class NodeNot(LogicalOperationBaseNode):
 
 
 class NodeAndAnyOrder(NodeAnd):
+    """
+    Match all the children in any order.
+
+    By default the regex is the alternation of every permutation of the children. When
+    `used_groups_prefix` is set (see AnyOrderGroupsMarker), every child is matched at most once by
+    marking it with a named group, so the regex grows linearly with the number of children.
+    """
+
+    used_groups_prefix: Optional[str] = None
+
+    def get_regex(self) -> str:
+        if self.used_groups_prefix is None:
+            return super().get_regex()
+
+        child_regexes = [
+            child.get_regex()
+            for child in self.children or []
+            if not isinstance(child, PatternNodeTimes)
+        ]
+        if not child_regexes:
+            raise ValueError("There are no instructions to join")
+
+        # Every repetition has its own groups, the optional ones are nested as a greedy {min,max}
+        repetitions = [
+            self._make_used_groups_regex(child_regexes, f"{self.used_groups_prefix}_{repetition}")
+            for repetition in range(self.times.max_times)
+        ]
+        optional_repetitions = ""
+        for repetition_regex in reversed(repetitions[self.times.min_times:]):
+            optional_repetitions = f"(?:{repetition_regex}{optional_repetitions})?"
+
+        return f"(?:{''.join(repetitions[:self.times.min_times])}{optional_repetitions})"
+
+    @staticmethod
+    def _make_used_groups_regex(child_regexes: List[str], groups_prefix: str) -> str:
+        "Match every child once, in any order, skipping the children whose group is already set"
+
+        alternatives = [
+            f"(?({groups_prefix}_{index})(?!)|(?P<{groups_prefix}_{index}>{child_regex}))"
+            for index, child_regex in enumerate(child_regexes)
+        ]
+        return f"(?:{'|'.join(alternatives)}){{{len(child_regexes)}}}"
 
     def _make_main_regex(self, child_regexes: List[str], times_regex: Optional[str]) -> str:
         full_all_against_all_regex: List[List[str]
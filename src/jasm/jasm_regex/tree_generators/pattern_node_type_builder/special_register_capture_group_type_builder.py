@@ -16,7 +16,7 @@ class SpecialRegisterCaptureGroupTypeBuilder:
 
     def process(self) -> PatternNode:
         if self.is_genreg():
-            return PatternNodeCaptureGroupSpecialRegisterReference(self.pattern_node_untyped, "(.)[xhl]")
+            return PatternNodeCaptureGroupSpecialRegisterReference(self.pattern_node_untyped, "([a-d])[xhl]")
         if self.is_indreg():
             return PatternNodeCaptureGroupSpecialRegisterReference(self.pattern_node_untyped, "([sd])il?")
         if self.is_stackreg():
@@ -2,8 +2,11 @@ from typing import Any, Dict, List, Optional
 import yaml
 from jasm.global_definitions import JASMConfig
 from jasm.logging_config import logger
+from jasm.jasm_regex.capture_expansion import CaptureExpander
 from jasm.jasm_regex.file2regex import File2Regex
 from jasm.jasm_regex.macro_expander.macro_expander import MacroExpander, PatternTree
+from jasm.jasm_regex.regex_optimizer import RegexOptimizer
+from jasm.jasm_regex.tree_analysis.any_order import AnyOrderGroupsMarker
 from jasm.jasm_regex.tree_generators.capture_manager import CapturesManager
 from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
 from jasm.jasm_regex.tree_generators.pattern_node_builder import PatternNodeBuilderNoParents
@@ -19,6 +22,7 @@ class Yaml2Regex(File2Regex):  # type: ignore
     ) -> None:
         self.loaded_file = self.load_file(file=pattern_pathstr)
         self.macros_from_terminal_filepath = macros_from_terminal
+        self._rule_tree: Optional[PatternNode] = None
         self._load_config()
 
     def _load_config(self) -> None:
@@ -35,18 +39,31 @@ class Yaml2Regex(File2Regex):  # type: ignore
     def produce_regex(self) -> str:
         """Handle all patterns and returns the final regex string"""
 
-        patterns = self._get_pattern()
-
-        rule_tree = self._generate_rule_tree(patterns=patterns)
+        rule_tree = self.produce_rule_tree()
 
         # Process the rule tree and generate the regex
         output_regex: str = rule_tree.get_regex()
 
+        # Remove the redundant groups and backtracking of the regexes of every node
+        output_regex = RegexOptimizer().optimize(output_regex)
+
+        # Match the captures that can only capture a few values without backreferences
+        output_regex = CaptureExpander().expand(output_regex)
+
         # Log regex results
         logger.debug("The output regex is:\n%s\n", output_regex)
 
         return output_regex
 
+    def produce_rule_tree(self) -> PatternNode:
+        """Handle all patterns and returns the typed rule tree"""
+
+        if self._rule_tree is None:
+            patterns = self._get_pattern()
+            self._rule_tree = self._generate_rule_tree(patterns=patterns)
+
+        return self._rule_tree
+
     def _get_pattern(self) -> PatternTree:
         """Load pattern from file"""
         patterns = self.loaded_file.get("pattern")
@@ -104,4 +121,9 @@ class Yaml2Regex(File2Regex):  # type: ignore
         ).build()
 
         # Transform each node in the rule tree to a typed node
-        return GeneralPatternNodeBuilder().build(rule_tree)
+        typed_rule_tree = GeneralPatternNodeBuilder().build(rule_tree)
+
+        # Avoid expanding every permutation of the `$and_any_order` nodes when possible
+        AnyOrderGroupsMarker().mark(typed_rule_tree)
+
+        return typed_rule_tree
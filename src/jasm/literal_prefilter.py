@@ -0,0 +1,172 @@
+"""
+Literal prefilter of the match attempts of a rule.
+
+Every match of a rule contains the literals of its required literal clauses (see
+RequiredLiteralsAnalyzer). Before matching the regex, the stringified instructions are searched for
+them with `find`: if a clause has no literal in the text there is no match at all, and otherwise only
+the instructions starting up to the maximum span of the rule before a hit of the least frequent clause
+can start a match.
+"""
+
+import mmap
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from jasm.instruction_starts import Text, get_next_instruction_start
+from jasm.jasm_regex.tree_analysis.max_span import INSTRUCTION_SEPARATOR, MaxSpanAnalyzer
+from jasm.jasm_regex.tree_analysis.required_literals import LiteralClause, RequiredLiteralsAnalyzer
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
+
+# Ranges of offsets (both included) of the instruction starts where a match can start
+StartRanges = List[Tuple[int, int]]
+
+
+class LiteralPrefilter:
+    """
+    Find where the matches of a rule can start from the literals they contain.
+
+    `max_span` is the maximum span of the rule (see MaxSpanAnalyzer). Rules whose span can not be
+    bounded have no prefilter.
+    """
+
+    def __init__(self, required_literals: Sequence[LiteralClause], max_span: int) -> None:
+        if not required_literals:
+            raise ValueError("a literal prefilter needs at least one required literal")
+
+        self.required_literals = list(required_literals)
+        self.max_span = max_span
+
+        self._encoded_literals: Dict[str, bytes] = {
+            literal: literal.encode("utf-8") for clause in self.required_literals for literal in clause
+        }
+
+    @classmethod
+    def from_rule_tree(cls, rule_tree: PatternNode) -> Optional["LiteralPrefilter"]:
+        """
+        Build the prefilter of a typed rule tree, None if its matches have no required literals or their
+        span can not be bounded. It must be called with the configuration of the rule loaded.
+        """
+
+        max_span = MaxSpanAnalyzer().get_max_span(rule_tree)
+        if max_span is None:
+            return None
+        required_literals = RequiredLiteralsAnalyzer().get_required_literals(rule_tree)
+        if not required_literals:
+            return None
+        return cls(required_literals, max_span)
+
+    def get_start_ranges(
+        self,
+        text: Text,
+        pos: int = 0,
+        endpos: Optional[int] = None,
+        number_of_instructions: Optional[int] = None,
+    ) -> Optional[StartRanges]:
+        """
+        Get the ranges of the instruction starts of the text where a match can start.
+
+        An empty list means that there is no match in the text. None is returned when the hits of the
+        literals are too many to be worth skipping the rest of the instruction starts.
+        `number_of_instructions` is counted from the text if not given, memory maps must give it.
+        """
+
+        if endpos is None:
+            endpos = len(text)
+        if number_of_instructions is None:
+            if isinstance(text, mmap.mmap):
+                raise ValueError("the number of instructions of a memory map must be given")
+            number_of_instructions = self._count(text, INSTRUCTION_SEPARATOR, pos, endpos)
+
+        # Every hit keeps up to `max_span + 1` instruction starts, skipping less than half of them is
+        # not worth it
+        max_hits = number_of_instructions // (2 * (self.max_span + 1))
+
+        fewest_hits: Optional[List[int]] = None
+        for clause in self.required_literals:
+            hits_limit = max_hits if fewest_hits is None else min(max_hits, len(fewest_hits) - 1)
+            hits = self._find_hits(text, clause, pos, endpos, hits_limit)
+            if hits is None:
+                continue
+            if not hits:
+                return []
+            fewest_hits = hits
+
+        if fewest_hits is None:
+            return None
+        return self._get_ranges(text, fewest_hits, pos, endpos)
+
+    def _find_hits(self, text: Text, clause: LiteralClause, pos: int, endpos: int, limit: int) -> Optional[List[int]]:
+        """Get the sorted offsets of the literals of the clause, None if there are more than `limit`"""
+
+        # Counting is much faster than finding every hit of the frequent literals, memory maps can not
+        # count
+        if not isinstance(text, mmap.mmap):
+            if sum(self._count(text, literal, pos, endpos) for literal in clause) > limit:
+                return None
+
+        hits: List[int] = []
+        for literal in clause:
+            hit = self._find(text, literal, pos, endpos)
+            while hit != -1:
+                if len(hits) >= limit:
+                    return None
+                hits.append(hit)
+                hit = self._find(text, literal, hit + 1, endpos)
+
+        hits.sort()
+        return hits
+
+    def _get_ranges(self, text: Text, hits: List[int], pos: int, endpos: int) -> StartRanges:
+        """Get the instruction starts from up to `max_span` instructions before every hit"""
+
+        first_start = get_next_instruction_start(text, pos, endpos)
+
+        ranges: StartRanges = []
+        for hit in hits:
+            # Start of the instruction of the hit
+            separator_position = self._rfind(text, INSTRUCTION_SEPARATOR, pos, hit)
+            hit_start = separator_position + 1 if separator_position != -1 else first_start
+            if hit_start > hit:
+                # The hit is in the instruction before the first start
+                continue
+
+            # Go back up to the maximum span, or until the range of the previous hit
+            range_first = hit_start
+            covered_until = ranges[-1][1] if ranges else -1
+            for _ in range(self.max_span):
+                if range_first <= max(first_start, covered_until):
+                    break
+                separator_position = self._rfind(text, INSTRUCTION_SEPARATOR, pos, range_first - 1)
+                range_first = separator_position + 1 if separator_position != -1 else first_start
+
+            if range_first <= covered_until:
+                ranges[-1] = (ranges[-1][0], hit_start)
+            else:
+                ranges.append((range_first, hit_start))
+
+        return ranges
+
+    # The literals are searched as they are in decoded texts and encoded in the others
+
+    def _count(self, text: str | bytes | bytearray, literal: str, start: int, end: int) -> int:
+        if isinstance(text, str):
+            return text.count(literal, start, end)
+        count: int = text.count(self._encode(literal), start, end)
+        return count
+
+    def _find(self, text: Text, literal: str, start: int, end: int) -> int:
+        if isinstance(text, str):
+            return text.find(literal, start, end)
+        position: int = text.find(self._encode(literal), start, end)
+        return position
+
+    def _rfind(self, text: Text, literal: str, start: int, end: int) -> int:
+        if isinstance(text, str):
+            return text.rfind(literal, start, end)
+        position: int = text.rfind(self._encode(literal), start, end)
+        return position
+
+    def _encode(self, literal: str) -> bytes:
+        encoded_literal = self._encoded_literals.get(literal)
+        if encoded_literal is None:
+            encoded_literal = self._encoded_literals[literal] = literal.encode("utf-8")
+        return encoded_literal
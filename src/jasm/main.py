@@ -1,10 +1,18 @@
 "Main entry module"
+import sys
 from argparse import Namespace
 
-from jasm.global_definitions import InputFileType, MatchConfig, MatchingSearchMode
+from jasm.global_definitions import (
+    ConsumerType,
+    InputFileType,
+    MatchConfig,
+    MatchingReturnMode,
+    MatchingSearchMode,
+)
 from jasm.logging_config import configure_logger, logger
 from jasm.match import MasterOfPuppets
 from jasm.parse_arguments import parse_args_from_console
+from jasm.rule_artifact import main as compile_main
 
 
 def start_configurations() -> Namespace:
@@ -27,6 +35,11 @@ def start_configurations() -> Namespace:
 def main() -> None:
     "Main function"
 
+    # `jasm compile` writes precompiled rules instead of matching
+    if sys.argv[1:2] == ["compile"]:
+        compile_main(sys.argv[2:])
+        return
+
     args = start_configurations()
 
     print("Starting execution... ")
@@ -49,16 +62,54 @@ def main() -> None:
     else:
         matching_mode = MatchingSearchMode.first_find
 
+    # Set buffered, streaming, mask or automaton matching
+    if args.mask:
+        consumer_type = ConsumerType.mask
+    elif args.automaton:
+        consumer_type = ConsumerType.automaton
+    elif args.stream:
+        consumer_type = ConsumerType.stream
+    else:
+        consumer_type = ConsumerType.complete
+
+    # Report where every pattern matched when matching several patterns
+    if len(args.pattern) > 1:
+        return_mode = MatchingReturnMode.matched_addrs_list
+    else:
+        return_mode = MatchingReturnMode.bool
+
     match_config = MatchConfig(
-        pattern_pathstr=args.pattern,
+        pattern_pathstr=args.pattern[0] if len(args.pattern) == 1 else args.pattern,
         input_file=input_file,
         input_file_type=input_file_type,
+        return_mode=return_mode,
         matching_mode=matching_mode,
         return_only_address=args.return_only_address,
         macros=args.macros,
+        consumer_type=consumer_type,
+        stream_window_size=args.stream_window_size,
+        windowed_matching=not args.no_windowed_matching,
+        jobs=args.jobs,
+        disassembly_cache_dir=args.disassembly_cache,
+        disassembly_cache_max_size=args.disassembly_cache_max_size * 1024**2,
+        instruction_stream_cache_dir=args.instruction_stream_cache,
+        instruction_stream_cache_max_size=args.instruction_stream_cache_max_size * 1024**2,
+        rule_cache_dir=args.rule_cache,
+        rule_cache_max_size=args.rule_cache_max_size * 1024**2,
     )
 
-    MasterOfPuppets(match_config=match_config).perform_matching()
+    master_of_puppets = MasterOfPuppets(match_config=match_config)
+
+    if len(master_of_puppets.compiled_rules) == 1:
+        master_of_puppets.perform_matching()
+        return
+
+    # Several patterns are matched over a single disassembly
+    for pattern_pathstr, result in master_of_puppets.perform_matching_all_rules().items():
+        if result:
+            logger.info("RESULT: Pattern %s found at: %s", pattern_pathstr, result)
+        else:
+            logger.info("RESULT: Pattern %s not found", pattern_pathstr)
 
 
 def decide_assembly_or_binary(args: Namespace) -> InputFileType:
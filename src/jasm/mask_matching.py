@@ -0,0 +1,438 @@
+"""
+Vectorized matching of rules over an InstructionTable.
+
+The single instruction predicates of a rule (a mnemonic with its operands, and the `$or` and `$not`
+of them) are evaluated once per distinct mnemonic and operand of the table, and then over every
+instruction at once as NumPy boolean masks. The sequence of the rule and the `times` of its nodes
+are resolved over those masks, instead of backtracking over the stringified instructions.
+
+The `$deref` operands with literal fields are evaluated comparing the fields of the memory operands
+(see jasm.derefs) instead of matching their regex.
+
+Only rules whose regex consumes whole instructions are supported, their findings are the same as
+matching the regex over the stringified instructions. MaskMatcher.from_rule_tree raises
+UnsupportedRuleError for the other ones, which must be matched with their regex.
+
+It needs the optional `numpy` dependency (`pip install jasm[table]`).
+"""
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Tuple, TypeAlias
+
+import numpy as np
+import numpy.typing as npt
+import regex
+
+from jasm.consumer import RegexMatchingConsumer
+from jasm.derefs import DerefPattern
+from jasm.global_definitions import (
+    SKIP_TO_END_OF_OPERAND,
+    Instruction,
+    MatchingSearchMode,
+    PartialMatchingConfig,
+    UnsupportedRuleError,
+)
+from jasm.jasm_regex.tree_analysis.deref_fields import get_deref_pattern
+from jasm.jasm_regex.tree_analysis.max_span import is_single_field_name
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.deref import PatternNodeDeref
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.mnemonic_and_operand.mnemonic_and_operand import (
+    InstructionNodeHelper,
+    PatternNodeMnemonic,
+    PatternNodeOperand,
+)
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.node_branch_root import (
+    NodeAnd,
+    NodeAndAnyOrder,
+    NodeNot,
+    NodeOr,
+    PatternNodeTimes,
+)
+from jasm.logging_config import logger
+from jasm.stringify_asm.abstracts.abs_observer import IMatchedObserver
+from jasm.stringify_asm.implementations.instruction_table import InstructionTable
+
+
+class DerefOperandPattern(NamedTuple):
+    """
+    Operands matching a `$deref` with literal fields, compared field by field. The memory operands
+    whose fields can not be told apart are matched with the regex of the `$deref`
+    """
+
+    deref_pattern: DerefPattern
+    fallback_pattern: regex.Pattern[str]
+
+
+OperandPattern: TypeAlias = regex.Pattern[str] | DerefOperandPattern
+
+
+class InstructionPredicate(ABC):
+    """Predicate over single instructions, evaluated over every instruction of a table at once"""
+
+    @abstractmethod
+    def get_mask(self, table: InstructionTable) -> npt.NDArray[np.bool_]:
+        """Get which instructions of the table satisfy the predicate"""
+
+
+class MnemonicPredicate(InstructionPredicate):
+    """
+    Instructions matching the regex of a mnemonic node.
+
+    The stringified instruction is `addr::mnemonic,operand_1,...,operand_n,|`, where an instruction
+    without operands has a single empty operand. `mnemonic_pattern` must fully match the mnemonic
+    followed by its comma, and `operand_patterns[i]` the operand `i` followed by its comma.
+    """
+
+    def __init__(
+        self, mnemonic_pattern: regex.Pattern[str], operand_patterns: List[OperandPattern]
+    ) -> None:
+        self.mnemonic_pattern = mnemonic_pattern
+        self.operand_patterns = operand_patterns
+
+    def get_mask(self, table: InstructionTable) -> npt.NDArray[np.bool_]:
+        mnemonic_lookup = self._get_lookup(self.mnemonic_pattern, table.mnemonics.strings)
+        mask = mnemonic_lookup[table.mnemonic_ids]
+
+        for position, operand_pattern in enumerate(self.operand_patterns):
+            mask &= self._get_operand_mask(table, position, operand_pattern)
+
+        return mask
+
+    @staticmethod
+    def _get_lookup(pattern: regex.Pattern[str], strings: List[str]) -> npt.NDArray[np.bool_]:
+        """Get which strings of a vocabulary fully match the pattern when followed by a comma"""
+        return np.fromiter(
+            (pattern.fullmatch(f"{string},") is not None for string in strings),
+            dtype=np.bool_,
+            count=len(strings),
+        )
+
+    @staticmethod
+    def _get_deref_lookup(
+        operand_pattern: DerefOperandPattern, table: InstructionTable
+    ) -> npt.NDArray[np.bool_]:
+        """Get which operands of the vocabulary match the `$deref`, comparing their fields"""
+
+        deref_table = table.get_deref_table()
+        lookup = deref_table.get_mask(operand_pattern.deref_pattern)
+        for operand_id in deref_table.unparsed_ids:
+            string = table.operands.strings[operand_id]
+            lookup[operand_id] = operand_pattern.fallback_pattern.fullmatch(f"{string},") is not None
+        return lookup
+
+    def _get_operand_mask(
+        self, table: InstructionTable, position: int, operand_pattern: OperandPattern
+    ) -> npt.NDArray[np.bool_]:
+        # The empty operand of the instructions without operands is the last id of the lookup
+        if isinstance(operand_pattern, DerefOperandPattern):
+            operand_lookup = np.append(self._get_deref_lookup(operand_pattern, table), False)
+        else:
+            operand_lookup = self._get_lookup(operand_pattern, [*table.operands.strings, ""])
+        empty_operand_id = len(table.operands)
+
+        operand_counts = table.get_operand_counts()
+        has_operand = operand_counts > position
+        operand_ids = np.full(len(table), empty_operand_id, dtype=np.int64)
+        operand_ids[has_operand] = table.operand_ids[table.operand_offsets[:-1][has_operand] + position]
+
+        if position == 0:
+            has_operand |= operand_counts == 0
+
+        operand_mask: npt.NDArray[np.bool_] = has_operand & operand_lookup[operand_ids]
+        return operand_mask
+
+
+class AnyPredicate(InstructionPredicate):
+    """Instructions satisfying any of the predicates, as a `$or` of single instructions"""
+
+    def __init__(self, predicates: List[InstructionPredicate]) -> None:
+        self.predicates = predicates
+
+    def get_mask(self, table: InstructionTable) -> npt.NDArray[np.bool_]:
+        mask = np.zeros(len(table), dtype=np.bool_)
+        for predicate in self.predicates:
+            mask |= predicate.get_mask(table)
+        return mask
+
+
+class NotPredicate(InstructionPredicate):
+    """Instructions not satisfying the predicate, as a `$not` of a single instruction"""
+
+    def __init__(self, predicate: InstructionPredicate) -> None:
+        self.predicate = predicate
+
+    def get_mask(self, table: InstructionTable) -> npt.NDArray[np.bool_]:
+        return ~self.predicate.get_mask(table)
+
+
+class SequenceElement(NamedTuple):
+    """Between `min_times` and `max_times` consecutive instructions satisfying the predicate"""
+
+    predicate: InstructionPredicate
+    min_times: int
+    max_times: int
+
+
+class MaskRuleCompiler:
+    """Translate a typed rule tree into a sequence of single instruction predicates"""
+
+    def __init__(self) -> None:
+        self.helper = InstructionNodeHelper()
+
+    def compile(self, node: PatternNode) -> List[SequenceElement]:
+        """Get the sequence of elements of the node, raises UnsupportedRuleError if there is none"""
+
+        match node:
+            case PatternNodeTimes():
+                return []
+
+            # NodeAndAnyOrder is a NodeAnd, so it must be checked first
+            case NodeAndAnyOrder():
+                raise UnsupportedRuleError("$and_any_order is not supported")
+
+            case NodeAnd():
+                # When repeated, every repetition skips one more instruction
+                if not self._is_single_time(node):
+                    raise UnsupportedRuleError("repeated $and is not supported")
+                return [element for child in node.children or [] for element in self.compile(child)]
+
+            case PatternNodeMnemonic() | NodeOr() | NodeNot():
+                return [
+                    SequenceElement(
+                        predicate=self._get_predicate(node),
+                        min_times=node.times.min_times,
+                        max_times=node.times.max_times,
+                    )
+                ]
+
+        raise UnsupportedRuleError(f"{type(node).__name__} is not supported")
+
+    def _get_predicate(self, node: PatternNode) -> InstructionPredicate:
+        """Get the predicate of a node matching a single instruction, without its times"""
+
+        match node:
+            case PatternNodeMnemonic():
+                return self._get_mnemonic_predicate(node)
+
+            case NodeOr():
+                return AnyPredicate([self._get_single_predicate(child) for child in node.children or []])
+
+            case NodeNot():
+                children = [
+                    child for child in node.children or [] if not isinstance(child, PatternNodeTimes)
+                ]
+                if len(children) != 1:
+                    raise UnsupportedRuleError("$not of several nodes is not supported")
+                return NotPredicate(self._get_single_predicate(children[0]))
+
+        raise UnsupportedRuleError(f"{type(node).__name__} is not supported inside $or nor $not")
+
+    def _get_single_predicate(self, node: PatternNode) -> InstructionPredicate:
+        if isinstance(node, PatternNodeTimes) or not self._is_single_time(node):
+            raise UnsupportedRuleError("times inside $or and $not are not supported")
+        return self._get_predicate(node)
+
+    def _get_mnemonic_predicate(self, node: PatternNodeMnemonic) -> MnemonicPredicate:
+        self._check_single_field_name(node.name)
+        mnemonic_regex = self.helper.get_pattern_node_name(
+            node.name, self.helper.allow_matching_substring(PartialMatchingConfig.MnemonicsFullMatch)
+        )
+
+        operands = [child for child in node.children or [] if not isinstance(child, PatternNodeTimes)]
+        operand_patterns: List[OperandPattern] = []
+        for position, operand in enumerate(operands):
+            if isinstance(operand, PatternNodeDeref):
+                operand_patterns.append(self._get_deref_operand_pattern(operand))
+                continue
+            is_last_operand = position == len(operands) - 1
+            operand_patterns.append(regex.compile(self._get_operand_regex(operand, is_last_operand)))
+
+        return MnemonicPredicate(mnemonic_pattern=regex.compile(mnemonic_regex), operand_patterns=operand_patterns)
+
+    def _get_deref_operand_pattern(self, node: PatternNodeDeref) -> DerefOperandPattern:
+        if not self._is_single_time(node):
+            raise UnsupportedRuleError("$deref with times is not supported")
+
+        deref_pattern = get_deref_pattern(node)
+        if deref_pattern is None:
+            raise UnsupportedRuleError("$deref with fields that are not literals is not supported")
+        return DerefOperandPattern(deref_pattern=deref_pattern, fallback_pattern=regex.compile(node.get_regex()))
+
+    def _get_operand_regex(self, node: PatternNode, is_last_operand: bool) -> str:
+        """Get the regex fully matching an operand of the instruction followed by its comma"""
+
+        match node:
+            case PatternNodeOperand():
+                self._check_single_field_name(node.name)
+                operand_regex = node.get_regex()
+                if operand_regex.endswith(","):
+                    return operand_regex
+
+                # Hex operands match the start of the operand, what follows must skip the rest
+                if not is_last_operand:
+                    raise UnsupportedRuleError("hex operands are only supported as last operand")
+                return f"{regex.escape(operand_regex)}{SKIP_TO_END_OF_OPERAND}"
+
+            case NodeOr() if self._is_single_time(node):
+                alternatives = [self._get_operand_regex(child, False) for child in node.children or []]
+                return "|".join(f"(?:{alternative})" for alternative in alternatives)
+
+        raise UnsupportedRuleError(f"operand {type(node).__name__} is not supported")
+
+    @staticmethod
+    def _check_single_field_name(name: str | int) -> None:
+        """Raw regex names must not match across the comma that ends their field"""
+        if not is_single_field_name(name):
+            raise UnsupportedRuleError(f"regex name {name} is not supported")
+
+    @staticmethod
+    def _is_single_time(node: PatternNode) -> bool:
+        return node.times.min_times == 1 and node.times.max_times == 1
+
+
+class MaskMatcher:
+    """
+    Match a sequence of single instruction predicates over an InstructionTable.
+
+    Every `times` is resolved over the run lengths of the masks: the positions from where the rest of
+    the sequence can match are computed backwards once for every element, and the match starts are
+    the positions from where the whole sequence can match. Like the regex, the match is the
+    leftmost one and every `times` takes as many instructions as possible.
+    """
+
+    def __init__(self, elements: List[SequenceElement]) -> None:
+        if not elements:
+            raise UnsupportedRuleError("empty rules are not supported")
+
+        if elements[0].min_times < 1:
+            raise UnsupportedRuleError("rules starting with optional nodes are not supported")
+
+        self.elements = elements
+
+    @classmethod
+    def from_rule_tree(cls, rule_tree: PatternNode) -> "MaskMatcher":
+        """
+        Build the matcher of a typed rule tree, raises UnsupportedRuleError if it can not be matched
+        with masks. It must be called with the configuration of the rule loaded.
+        """
+        return cls(MaskRuleCompiler().compile(rule_tree))
+
+    def get_match_spans(
+        self, table: InstructionTable, matching_mode: MatchingSearchMode
+    ) -> List[Tuple[int, int]]:
+        """Get the index of the first and next to last instruction of every match"""
+
+        run_lengths = [
+            self._get_run_lengths(element.predicate.get_mask(table)) for element in self.elements
+        ]
+        feasible = self._get_feasible_positions(run_lengths)
+        starts = np.flatnonzero(feasible[0][:len(table)])
+
+        spans: List[Tuple[int, int]] = []
+        start_index = 0
+        while start_index < len(starts):
+            start = int(starts[start_index])
+            end = self._get_match_end(start, run_lengths, feasible)
+            spans.append((start, end))
+
+            if matching_mode == MatchingSearchMode.first_find:
+                break
+
+            # Matches do not overlap, the next one starts after the end of this one
+            start_index = int(np.searchsorted(starts, end))
+
+        return spans
+
+    @staticmethod
+    def _get_run_lengths(mask: npt.NDArray[np.bool_]) -> npt.NDArray[np.int64]:
+        """Get the number of consecutive True values starting at every position, and at the end"""
+
+        positions = np.arange(len(mask) + 1, dtype=np.int64)
+        next_false = np.where(np.append(mask, False), len(mask), positions)
+        next_false = np.minimum.accumulate(next_false[::-1])[::-1]
+        return next_false - positions
+
+    def _get_feasible_positions(
+        self, run_lengths: List[npt.NDArray[np.int64]]
+    ) -> List[npt.NDArray[np.bool_]]:
+        """
+        Get, for every element, the positions from where the sequence can match starting at that
+        element. The last array is the one after the last element, where every position is valid.
+        """
+
+        number_of_positions = len(run_lengths[0])
+        positions = np.arange(number_of_positions, dtype=np.int64)
+
+        feasible = [np.ones(number_of_positions, dtype=np.bool_)]
+        for element, element_run_lengths in zip(reversed(self.elements), reversed(run_lengths)):
+            # Number of feasible positions of the next element before every position
+            feasible_counts = np.zeros(number_of_positions + 1, dtype=np.int64)
+            np.cumsum(feasible[-1], out=feasible_counts[1:])
+
+            lowest_end = np.minimum(positions + element.min_times, number_of_positions)
+            highest_end = positions + np.minimum(element_run_lengths, element.max_times)
+            feasible.append(
+                (lowest_end <= highest_end)
+                & (feasible_counts[highest_end + 1] > feasible_counts[lowest_end])
+            )
+
+        feasible.reverse()
+        return feasible
+
+    def _get_match_end(
+        self,
+        start: int,
+        run_lengths: List[npt.NDArray[np.int64]],
+        feasible: List[npt.NDArray[np.bool_]],
+    ) -> int:
+        """Follow the match from a feasible start taking as many instructions as possible every time"""
+
+        position = start
+        for index, element in enumerate(self.elements):
+            lowest_end = position + element.min_times
+            highest_end = position + min(int(run_lengths[index][position]), element.max_times)
+            ends = np.flatnonzero(feasible[index + 1][lowest_end:highest_end + 1])
+            position = lowest_end + int(ends[-1])
+
+        return position
+
+
+class MaskMatchingConsumer(RegexMatchingConsumer):
+    """
+    Consumer that matches the rule with a MaskMatcher once every instruction was consumed.
+
+    The matched instructions are stringified as CompleteConsumer does, so the findings are reported
+    the same way.
+    """
+
+    def __init__(
+        self,
+        regex_rule: str,
+        mask_matcher: MaskMatcher,
+        matched_observer: IMatchedObserver,
+        matching_mode: MatchingSearchMode,
+        return_only_address: bool,
+    ) -> None:
+        super().__init__(
+            regex_rule=regex_rule,
+            matched_observer=matched_observer,
+            matching_mode=matching_mode,
+            return_only_address=return_only_address,
+        )
+        self.mask_matcher = mask_matcher
+        self._instructions: List[Instruction] = []
+
+    def consume_instruction(self, inst: Instruction) -> None:
+        processed_inst = self._process_instruction(inst)
+        if processed_inst:
+            self._instructions.append(processed_inst)
+
+    def finalize(self) -> None:
+        table = InstructionTable.from_parsed_elements(self._instructions)
+        logger.info("Matching %s instructions with masks", len(table))
+
+        for start, end in self.mask_matcher.get_match_spans(table, self.matching_mode):
+            self._report_match(
+                "".join(inst.stringify() + ",|" for inst in self._instructions[start:end])
+            )
+
+        super().finalize()
@@ -2,37 +2,58 @@
 Main match module
 """
 
-from enum import Enum, auto
-from typing import List, Optional
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from jasm.consumer import CompleteConsumer, InstructionObserverConsumer
+from jasm.consumer import CompleteConsumer, InstructionObserverConsumer, MultiConsumer, StreamConsumer
 from jasm.global_definitions import (
+    DEFAULT_STREAM_WINDOW_SIZE,
+    ConsumerType,
     DisassStyle,
     InputFileType,
     Instruction,
     MatchConfig,
     MatchingReturnMode,
     MatchingSearchMode,
+    UnsupportedRuleError,
     ValidAddrRange,
     JASMConfig,
 )
+from jasm.literal_prefilter import LiteralPrefilter
+from jasm.logging_config import logger
 from jasm.matched_observers import MatchedObserver
+from jasm.rule_artifact import RuleArtifact, is_rule_artifact
+from jasm.rule_cache import RuleCache
+from jasm.jasm_regex.tree_analysis.max_span import MaxSpanAnalyzer
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
 from jasm.jasm_regex.yaml2regex import Yaml2Regex
-from jasm.stringify_asm.abstracts.abs_observer import IInstructionObserver, IMatchedObserver
+from jasm.stringify_asm.abstracts.abs_observer import IConsumer, IInstructionObserver, IMatchedObserver
 from jasm.stringify_asm.abstracts.asm_parser import AsmParser
 from jasm.stringify_asm.abstracts.disassembler import Disassembler
-from jasm.stringify_asm.implementations.composable_producer import ComposableProducer, IInstructionProducer
+from jasm.stringify_asm.implementations.composable_producer import (
+    ComposableProducer,
+    IInstructionProducer,
+    StreamingProducer,
+)
+from jasm.stringify_asm.implementations.disassembly_cache import (
+    CachedDisassembler,
+    DisassemblyCache,
+    get_program_version,
+)
 from jasm.stringify_asm.implementations.gnu_objdump.gnu_objdump_disassembler import GNUObjdumpDisassembler
 from jasm.stringify_asm.implementations.gnu_objdump.gnu_objdump_parser_manual import ObjdumpParserManual
+from jasm.stringify_asm.implementations.instruction_stream_cache import (
+    InstructionStreamCache,
+    InstructionStreamRecorder,
+    get_instruction_stream_key,
+)
 from jasm.stringify_asm.implementations.null_disassembler import NullDisassembler
 from jasm.stringify_asm.implementations.observers import RemoveEmptyInstructions
 
-
-class ConsumerType(Enum):
-    """Enum for the consumer type."""
-
-    complete = auto()
-    stream = auto()
+if TYPE_CHECKING:
+    from jasm.automaton_matching import AutomatonMatcher
+    from jasm.mask_matching import MaskMatcher
 
 
 class ObserverBuilder:
@@ -62,20 +83,64 @@ class ConsumerBuilder:
         consumer_type: ConsumerType,
         matching_mode: MatchingSearchMode,
         return_only_address: bool,
+        window_size: Optional[int] = None,
+        jobs: int = 1,
+        mask_matcher: Optional["MaskMatcher"] = None,
+        automaton_matcher: Optional["AutomatonMatcher"] = None,
+        prefilter: Optional[LiteralPrefilter] = None,
     ) -> InstructionObserverConsumer:
-        """Decide which consumer to create"""
+        """
+        Decide which consumer to create
+
+        `window_size` is an upper bound of the number of instructions spanned by a match
+        `jobs` is the number of processes used for matching
+        `mask_matcher` is the mask matcher of the rule, None if it must be matched with the regex
+        `automaton_matcher` is the automaton matcher of the rule, None if it must be matched with
+        the regex
+        `prefilter` is the literal prefilter of the rule, None if it has no required literals
+        """
 
         match consumer_type:
-            case ConsumerType.complete:
+            case ConsumerType.mask if mask_matcher is not None:
+                # pylint: disable-next=import-outside-toplevel
+                from jasm.mask_matching import MaskMatchingConsumer
+
+                return MaskMatchingConsumer(
+                    regex_rule=regex_rule,
+                    mask_matcher=mask_matcher,
+                    matched_observer=iMatchedObserver,
+                    matching_mode=matching_mode,
+                    return_only_address=return_only_address,
+                )
+            case ConsumerType.automaton if automaton_matcher is not None:
+                # pylint: disable-next=import-outside-toplevel
+                from jasm.automaton_matching import AutomatonMatchingConsumer
+
+                return AutomatonMatchingConsumer(
+                    regex_rule=regex_rule,
+                    automaton_matcher=automaton_matcher,
+                    matched_observer=iMatchedObserver,
+                    matching_mode=matching_mode,
+                    return_only_address=return_only_address,
+                )
+            case ConsumerType.complete | ConsumerType.mask | ConsumerType.automaton:
                 return CompleteConsumer(
                     regex_rule=regex_rule,
                     matched_observer=iMatchedObserver,
                     matching_mode=matching_mode,
                     return_only_address=return_only_address,
+                    window_size=window_size,
+                    jobs=jobs,
+                    prefilter=prefilter,
+                )
+            case ConsumerType.stream:
+                return StreamConsumer(
+                    regex_rule=regex_rule,
+                    matched_observer=iMatchedObserver,
+                    matching_mode=matching_mode,
+                    return_only_address=return_only_address,
+                    window_size=window_size if window_size is not None else DEFAULT_STREAM_WINDOW_SIZE,
                 )
-            # TODO: implement this consumer
-            # case ConsumerType.stream:
-            #     return StreamConsumer(regex_rule=regex_rule, matched_observer=iMatchedObserver)
 
             case _:
                 raise ValueError("Invalid consumer type")
@@ -86,9 +151,16 @@ class ProducerBuilder:
 
     @staticmethod
     def build(
-        file_type: InputFileType, assembly_style: DisassStyle = DisassStyle.att
+        file_type: InputFileType,
+        assembly_style: DisassStyle = DisassStyle.att,
+        disassembly_cache: Optional[DisassemblyCache] = None,
     ) -> IInstructionProducer:
-        """Create a producer based on the file type."""
+        """
+        Create a producer based on the file type.
+
+        Binaries disassembly is cached in `disassembly_cache` if given. Otherwise the disassembler
+        output is parsed while it is running (see StreamingProducer)
+        """
 
         # Logic for choosing diferent type of parser should be here
 
@@ -98,7 +170,12 @@ class ProducerBuilder:
         # Logic for choosing diferent type of disassembler should be here
         match file_type:
             case InputFileType.binary:
-                disassembler = GNUObjdumpDisassembler(enum_disas_style=assembly_style)
+                objdump_disassembler = GNUObjdumpDisassembler(enum_disas_style=assembly_style)
+                if disassembly_cache is None:
+                    return StreamingProducer(
+                        disassembler=objdump_disassembler, parser=ObjdumpParserManual()
+                    )
+                disassembler = CachedDisassembler(objdump_disassembler, disassembly_cache)
             case InputFileType.assembly:
                 disassembler = NullDisassembler()
 
@@ -108,43 +185,440 @@ class ProducerBuilder:
         return ComposableProducer(disassembler=disassembler, parser=parser)
 
 
+@dataclass
+class CompiledRule:
+    """
+    Regex rule generated from a pattern file.
+
+    `config_info` is the JASMConfig configuration loaded from the pattern file, it is loaded back
+    into the singleton before matching the rule. `mask_matcher` and `automaton_matcher` are only
+    built for the `mask` and `automaton` consumers, and they are None for the rules that must be
+    matched with the regex. `prefilter` is None for the rules without required literals.
+    """
+
+    pattern_pathstr: str
+    regex_rule: str
+    max_span: Optional[int]
+    config_info: Dict[str, Any]
+    mask_matcher: Optional["MaskMatcher"] = None
+    automaton_matcher: Optional["AutomatonMatcher"] = None
+    prefilter: Optional[LiteralPrefilter] = None
+
+    def get_disassembly_key(self) -> Tuple[Any, ...]:
+        """Rules with the same key can be matched over the same disassembly"""
+        sections = tuple(self.config_info.get("sections") or [])
+        return (self.config_info.get("assembly_style"), sections)
+
+
 class MasterOfPuppets:
     """Main class which is responsible for the execution of the program."""
 
     def __init__(self, match_config: MatchConfig) -> None:
         self.match_config = match_config
 
-        yaml_2_regex_instance = Yaml2Regex(
-            self.match_config.pattern_pathstr, macros_from_terminal=match_config.macros
-        )
         # init the singleton JASMConfig
         self.global_config = JASMConfig()
 
-        self.regex_rule = yaml_2_regex_instance.produce_regex()
+        self.disassembly_cache: Optional[DisassemblyCache] = None
+        if self.match_config.disassembly_cache_dir is not None:
+            self.disassembly_cache = DisassemblyCache(
+                cache_dir=self.match_config.disassembly_cache_dir,
+                max_size=self.match_config.disassembly_cache_max_size,
+            )
+
+        self.instruction_stream_cache: Optional[InstructionStreamCache] = None
+        if self.match_config.instruction_stream_cache_dir is not None:
+            self.instruction_stream_cache = InstructionStreamCache(
+                cache_dir=self.match_config.instruction_stream_cache_dir,
+                max_size=self.match_config.instruction_stream_cache_max_size,
+            )
+
+        self.rule_cache: Optional[RuleCache] = None
+        if self.match_config.rule_cache_dir is not None:
+            self.rule_cache = RuleCache(
+                cache_dir=self.match_config.rule_cache_dir,
+                max_size=self.match_config.rule_cache_max_size,
+            )
+
+        self.compiled_rules = [
+            self._compile_rule(pattern_pathstr)
+            for pattern_pathstr in self.match_config.get_pattern_pathstrs()
+        ]
+
+        # The global configuration is left as the one of the first rule
+        first_rule = self.compiled_rules[0]
+        self.global_config.load_all_info(first_rule.config_info)
+
+        self.regex_rule = first_rule.regex_rule
+
+        # Upper bound of the number of instructions a match can span, None if it can not be bounded
+        self.max_span = first_rule.max_span
+
+        self.mask_matcher = first_rule.mask_matcher
+        self.automaton_matcher = first_rule.automaton_matcher
+        self.prefilter = first_rule.prefilter
+
+    def _compile_rule(self, pattern_pathstr: str) -> CompiledRule:
+        if is_rule_artifact(pattern_pathstr):
+            return self._get_artifact_rule(pattern_pathstr, RuleArtifact.load(pattern_pathstr))
+
+        # The mask and automaton matchers are built from the rule tree, so those rules are not cached
+        if self.rule_cache is not None and self.match_config.consumer_type not in (
+            ConsumerType.mask, ConsumerType.automaton
+        ):
+            artifact = self.rule_cache.get_artifact(pattern_pathstr, macros=self.match_config.macros)
+            return self._get_artifact_rule(pattern_pathstr, artifact)
+
+        yaml_2_regex_instance = Yaml2Regex(
+            pattern_pathstr, macros_from_terminal=self.match_config.macros
+        )
+        regex_rule = yaml_2_regex_instance.produce_regex()
+        rule_tree = yaml_2_regex_instance.produce_rule_tree()
+        max_span = MaxSpanAnalyzer().get_max_span(rule_tree)
+
+        mask_matcher: Optional["MaskMatcher"] = None
+        if self.match_config.consumer_type == ConsumerType.mask:
+            mask_matcher = self._build_mask_matcher(pattern_pathstr, rule_tree)
+
+        automaton_matcher: Optional["AutomatonMatcher"] = None
+        if self.match_config.consumer_type == ConsumerType.automaton:
+            automaton_matcher = self._build_automaton_matcher(pattern_pathstr, rule_tree)
+
+        return CompiledRule(
+            pattern_pathstr=pattern_pathstr,
+            regex_rule=regex_rule,
+            max_span=max_span,
+            config_info=self.global_config.get_all_info(),
+            mask_matcher=mask_matcher,
+            automaton_matcher=automaton_matcher,
+            prefilter=LiteralPrefilter.from_rule_tree(rule_tree),
+        )
+
+    def _get_artifact_rule(self, pattern_pathstr: str, artifact: RuleArtifact) -> CompiledRule:
+        """Get the rule of an artifact, compiled by `jasm compile` or cached, without running the front end"""
+
+        # The matchers are built from the rule tree, which is not kept in the artifact
+        if self.match_config.consumer_type in (ConsumerType.mask, ConsumerType.automaton):
+            logger.warning(
+                "Matching rule %s with its regex, precompiled rules do not keep their rule tree", pattern_pathstr
+            )
+
+        return CompiledRule(
+            pattern_pathstr=pattern_pathstr,
+            regex_rule=artifact.regex_rule,
+            max_span=artifact.max_span,
+            config_info=artifact.load_config(),
+            mask_matcher=None,
+            automaton_matcher=None,
+            prefilter=artifact.get_prefilter(),
+        )
+
+    @staticmethod
+    def _build_mask_matcher(pattern_pathstr: str, rule_tree: PatternNode) -> Optional["MaskMatcher"]:
+        """Build the mask matcher of a rule, None if the rule must be matched with the regex"""
+
+        # pylint: disable-next=import-outside-toplevel
+        from jasm.mask_matching import MaskMatcher
+
+        try:
+            return MaskMatcher.from_rule_tree(rule_tree)
+
+        except UnsupportedRuleError as exc:
+            logger.warning("Matching rule %s with its regex, it can not use masks: %s", pattern_pathstr, exc)
+            return None
+
+    @staticmethod
+    def _build_automaton_matcher(
+        pattern_pathstr: str, rule_tree: PatternNode
+    ) -> Optional["AutomatonMatcher"]:
+        """Build the automaton matcher of a rule, None if the rule must be matched with the regex"""
+
+        # pylint: disable-next=import-outside-toplevel
+        from jasm.automaton_matching import AutomatonMatcher
+
+        try:
+            return AutomatonMatcher.from_rule_tree(rule_tree)
+
+        except UnsupportedRuleError as exc:
+            logger.warning(
+                "Matching rule %s with its regex, it can not use an automaton: %s", pattern_pathstr, exc
+            )
+            return None
 
     def perform_matching(self) -> bool | str | List[str]:
         """Main function to perform regex matching on assembly or binary."""
 
+        return self.perform_matching_on_file(
+            input_file=self.match_config.input_file,
+            input_file_type=self.match_config.input_file_type,
+        )
+
+    def perform_matching_on_file(
+        self, input_file: str, input_file_type: InputFileType
+    ) -> bool | str | List[str]:
+        """Perform the matching of the already generated regex rule on the given file."""
+
+        if len(self.compiled_rules) > 1:
+            raise ValueError("Several rules were given, use perform_matching_all_rules")
+
         return self._do_matching_and_get_result(
             regex_rule=self.regex_rule,
             assembly_style=self.global_config.get_info("assembly_style"),
+            input_file=input_file,
+            input_file_type=input_file_type,
+        )
+
+    def perform_matching_all_rules(
+        self, input_file: Optional[str] = None, input_file_type: Optional[InputFileType] = None
+    ) -> Dict[str, bool | str | List[str]]:
+        """
+        Match every rule and get the result of each one, by pattern file.
+
+        The input is disassembled and parsed once for all the rules that share the disassembly
+        configuration. The input file and its type default to the ones of the match config.
+        """
+
+        if input_file is None:
+            input_file = self.match_config.input_file
+        if input_file_type is None:
+            input_file_type = self.match_config.input_file_type
+
+        rule_groups: Dict[Tuple[Any, ...], List[CompiledRule]] = {}
+        for compiled_rule in self.compiled_rules:
+            rule_groups.setdefault(compiled_rule.get_disassembly_key(), []).append(compiled_rule)
+
+        results: Dict[str, bool | str | List[str]] = {}
+        try:
+            for rule_group in rule_groups.values():
+                results.update(
+                    self._do_multi_rule_matching(
+                        compiled_rules=rule_group,
+                        input_file=input_file,
+                        input_file_type=input_file_type,
+                    )
+                )
+        finally:
+            self.global_config.load_all_info(self.compiled_rules[0].config_info)
+
+        return {
+            compiled_rule.pattern_pathstr: results[compiled_rule.pattern_pathstr]
+            for compiled_rule in self.compiled_rules
+        }
+
+    def _do_multi_rule_matching(
+        self, compiled_rules: List[CompiledRule], input_file: str, input_file_type: InputFileType
+    ) -> Dict[str, bool | str | List[str]]:
+        """Match several rules that share the disassembly configuration parsing the input once"""
+
+        assembly_style = compiled_rules[0].config_info.get("assembly_style", DisassStyle.att)
+
+        matched_observers: List[MatchedObserver] = []
+        consumers: List[InstructionObserverConsumer] = []
+        stream_keys: List[Optional[str]] = []
+        for compiled_rule in compiled_rules:
+            # Observers are built from the configuration of each rule
+            self.global_config.load_all_info(compiled_rule.config_info)
+
+            matched_observer = MatchedObserver()
+            matched_observers.append(matched_observer)
+            consumer = self._build_consumer(
+                regex_rule=compiled_rule.regex_rule,
+                max_span=compiled_rule.max_span,
+                matched_observer=matched_observer,
+                mask_matcher=compiled_rule.mask_matcher,
+                automaton_matcher=compiled_rule.automaton_matcher,
+                prefilter=compiled_rule.prefilter,
+            )
+            consumers.append(consumer)
+            stream_keys.append(
+                self._get_instruction_stream_key(
+                    input_file=input_file,
+                    input_file_type=input_file_type,
+                    assembly_style=assembly_style,
+                    observers=consumer.instruction_observers,
+                )
+            )
+
+        self._process_input(
+            consumers=consumers,
+            stream_keys=stream_keys,
+            input_file=input_file,
+            input_file_type=input_file_type,
+            assembly_style=assembly_style,
         )
 
+        return {
+            compiled_rule.pattern_pathstr: self._get_result(matched_observer)
+            for compiled_rule, matched_observer in zip(compiled_rules, matched_observers)
+        }
+
     def _do_matching_and_get_result(
         self,
         regex_rule: str,
         assembly_style: DisassStyle,
+        input_file: Optional[str] = None,
+        input_file_type: Optional[InputFileType] = None,
     ) -> bool | str | List[str]:
-        """Main function to perform regex matching on assembly or binary."""
+        """
+        Main function to perform regex matching on assembly or binary.
+
+        The input file and its type default to the ones of the match config.
+        """
+
+        if input_file is None:
+            input_file = self.match_config.input_file
+        if input_file_type is None:
+            input_file_type = self.match_config.input_file_type
 
         matched_observer = MatchedObserver()
 
+        consumer = self._build_consumer(
+            regex_rule=regex_rule,
+            max_span=self.max_span,
+            matched_observer=matched_observer,
+            mask_matcher=self.mask_matcher,
+            automaton_matcher=self.automaton_matcher,
+            prefilter=self.prefilter,
+        )
+        stream_key = self._get_instruction_stream_key(
+            input_file=input_file,
+            input_file_type=input_file_type,
+            assembly_style=assembly_style,
+            observers=consumer.instruction_observers,
+        )
+
+        # Do the processing
+        self._process_input(
+            consumers=[consumer],
+            stream_keys=[stream_key],
+            input_file=input_file,
+            input_file_type=input_file_type,
+            assembly_style=assembly_style,
+        )
+
+        return self._get_result(matched_observer)
+
+    def _process_input(
+        self,
+        consumers: List[InstructionObserverConsumer],
+        stream_keys: List[Optional[str]],
+        input_file: str,
+        input_file_type: InputFileType,
+        assembly_style: DisassStyle,
+    ) -> None:
+        """
+        Give the instructions of the input to every consumer, parsing the input once.
+
+        Consumers with a cached instruction stream match it instead, and the instruction stream is
+        recorded for the other ones (see InstructionStreamCache).
+        """
+
+        pending_consumers: List[IConsumer] = []
+        stream_recorders: Dict[str, InstructionStreamRecorder] = {}
+        for consumer, stream_key in zip(consumers, stream_keys):
+            if stream_key is not None and isinstance(consumer, CompleteConsumer):
+                assert self.instruction_stream_cache is not None
+                cached_stream = self.instruction_stream_cache.open(stream_key)
+                if cached_stream is not None:
+                    logger.info("Matching the cached instruction stream")
+                    with cached_stream:
+                        consumer.match_instruction_stream(cached_stream)
+                    continue
+
+                # Consumers with the same key record the same instruction stream
+                if stream_key not in stream_recorders:
+                    stream_recorder = self.instruction_stream_cache.create_recorder(stream_key)
+                    stream_recorders[stream_key] = stream_recorder
+                    consumer.stream_recorder = stream_recorder
+
+            pending_consumers.append(consumer)
+
+        if not pending_consumers:
+            return
+
+        # Create producer
+        producer = ProducerBuilder().build(
+            file_type=input_file_type,
+            assembly_style=assembly_style,
+            disassembly_cache=self.disassembly_cache,
+        )
+
+        try:
+            if len(pending_consumers) == 1:
+                producer.process_file(file=input_file, iConsumer=pending_consumers[0])
+            else:
+                producer.process_file(file=input_file, iConsumer=MultiConsumer(pending_consumers))
+
+        finally:
+            # Drop the instruction streams not committed when the processing failed
+            for stream_recorder in stream_recorders.values():
+                stream_recorder.discard()
+
+    def _get_instruction_stream_key(
+        self,
+        input_file: str,
+        input_file_type: InputFileType,
+        assembly_style: DisassStyle,
+        observers: List[IInstructionObserver],
+    ) -> Optional[str]:
+        """
+        Get the instruction stream cache key of the input, None if it can not be cached.
+
+        It must be called with the configuration of the rule loaded, as it defines the sections.
+        """
+
+        if self.instruction_stream_cache is None:
+            return None
+
+        # Only the complete consumer matches the whole instruction stream
+        if self.match_config.consumer_type not in (
+            ConsumerType.complete,
+            ConsumerType.mask,
+            ConsumerType.automaton,
+        ):
+            return None
+
+        if not Path(input_file).is_file():
+            return None
+
+        source_parts: List[str] = [input_file_type.name]
+        if input_file_type == InputFileType.binary:
+            disassembler = GNUObjdumpDisassembler(enum_disas_style=assembly_style)
+            source_parts.extend(
+                [disassembler.program, get_program_version(disassembler.program), *disassembler.flags]
+            )
+
+        source_parts.extend([ObjdumpParserManual.__name__, ObjdumpParserManual.PARSER_VERSION])
+
+        for observer in observers:
+            source_parts.append(type(observer).__name__)
+            if isinstance(observer, ValidAddrObserver):
+                source_parts.append(f"{observer.addr_range.min.hex}-{observer.addr_range.max.hex}")
+
+        return get_instruction_stream_key(input_file=input_file, source_parts=source_parts)
+
+    def _build_consumer(
+        self,
+        regex_rule: str,
+        max_span: Optional[int],
+        matched_observer: MatchedObserver,
+        mask_matcher: Optional["MaskMatcher"] = None,
+        automaton_matcher: Optional["AutomatonMatcher"] = None,
+        prefilter: Optional[LiteralPrefilter] = None,
+    ) -> InstructionObserverConsumer:
+        """Build the consumer of a rule, with the observers of the loaded configuration"""
+
         consumer = ConsumerBuilder().build(
             regex_rule=regex_rule,
             iMatchedObserver=matched_observer,
-            consumer_type=ConsumerType.complete,
+            consumer_type=self.match_config.consumer_type,
             matching_mode=self.match_config.matching_mode,
             return_only_address=self.match_config.return_only_address,
+            window_size=self._get_window_size(max_span),
+            jobs=self.match_config.jobs,
+            mask_matcher=mask_matcher,
+            automaton_matcher=automaton_matcher,
+            prefilter=prefilter,
         )
 
         # Consumer call observers
@@ -153,13 +627,10 @@ class MasterOfPuppets:
         for obs in observer_list:
             consumer.add_observer(obs)
 
-        # Create producer
-        producer = ProducerBuilder().build(
-            file_type=self.match_config.input_file_type, assembly_style=assembly_style
-        )
+        return consumer
 
-        # Do the processing
-        producer.process_file(file=self.match_config.input_file, iConsumer=consumer)
+    def _get_result(self, matched_observer: MatchedObserver) -> bool | str | List[str]:
+        """Get the result of the matching as set in the return mode"""
 
         match self.match_config.return_mode:
             case MatchingReturnMode.bool:
@@ -177,6 +648,47 @@ class MasterOfPuppets:
 
         raise ValueError("Invalid return mode")
 
+    def _get_window_size(self, max_span: Optional[int]) -> Optional[int]:
+        """
+        Get the number of instructions the consumer must keep ahead of a match start.
+
+        `max_span` is the maximum span of the rule, None if it can not be bounded
+        """
+
+        match self.match_config.consumer_type:
+            case ConsumerType.stream:
+                if self.match_config.stream_window_size is not None:
+                    return self.match_config.stream_window_size
+
+                if max_span is None:
+                    logger.warning(
+                        "Rule span can not be bounded, using a stream window of %s instructions",
+                        DEFAULT_STREAM_WINDOW_SIZE,
+                    )
+                    return DEFAULT_STREAM_WINDOW_SIZE
+
+                return max(max_span, 1)
+
+            # The mask and automaton consumers fall back to the complete one for the rules they do
+            # not support
+            case ConsumerType.complete | ConsumerType.mask | ConsumerType.automaton:
+                # The whole stringified instructions are needed when returning them
+                if self.match_config.return_mode == MatchingReturnMode.all_instructions_string:
+                    return None
+
+                if max_span is None:
+                    if self.match_config.jobs > 1:
+                        logger.warning("Rule span can not be bounded, matching with a single job")
+                    return None
+
+                # Parallel matching needs the window for overlapping the chunks
+                if not self.match_config.windowed_matching and self.match_config.jobs <= 1:
+                    return None
+
+                return max(max_span, 1)
+
+        raise ValueError("Invalid consumer type")
+
     def prepare_observers(self) -> List[IInstructionObserver]:
         """Prepare the observers for the matching."""
 
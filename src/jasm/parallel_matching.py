@@ -0,0 +1,293 @@
+"Parallel matching of the stringified instructions module"
+
+import mmap
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Sequence, TypeAlias
+
+import regex
+
+from jasm.global_definitions import PARALLEL_MATCHING_CHUNKS_PER_JOB, WINDOWED_MATCHING_CHUNK_SIZE
+from jasm.instruction_starts import finditer_at_instruction_starts, search_at_instruction_starts
+from jasm.literal_prefilter import LiteralPrefilter
+
+
+# Bytes like objects, as memory maps
+Buffer: TypeAlias = bytes | bytearray | memoryview | mmap.mmap
+
+
+class ChunkMatch(NamedTuple):
+    """Match found in a chunk, with offsets relative to the whole stringified instructions"""
+
+    start: int
+    end: int
+    matched_string: str
+
+
+@dataclass
+class InstructionsChunk:
+    """
+    Chunk of stringified instructions.
+
+    `text`: the instructions of the chunk followed by the overlap instructions
+    `offset`: offset of the chunk in the whole stringified instructions
+    `starts_limit`: only matches starting before this offset of `text` belong to the chunk
+    """
+
+    text: str
+    offset: int
+    starts_limit: int
+
+
+def find_matches_in_chunk(
+    regex_rule: str,
+    chunk: InstructionsChunk,
+    search_position: int,
+    timeout: int,
+    prefilter: Optional[LiteralPrefilter] = None,
+) -> List[ChunkMatch]:
+    """Find all the matches starting in the chunk. This runs in the worker processes"""
+
+    start_ranges = prefilter.get_start_ranges(chunk.text, search_position) if prefilter else None
+    chunk_matches: List[ChunkMatch] = []
+    for match_result in finditer_at_instruction_starts(
+        regex.compile(regex_rule),
+        chunk.text,
+        search_position,
+        timeout=timeout,
+        start_ranges=start_ranges,
+    ):
+        if match_result.start() >= chunk.starts_limit:
+            break
+
+        chunk_matches.append(
+            ChunkMatch(
+                start=chunk.offset + match_result.start(),
+                end=chunk.offset + match_result.end(),
+                matched_string=match_result.group(0),
+            )
+        )
+    return chunk_matches
+
+
+def find_first_match_in_chunk(
+    regex_rule: str,
+    chunk: InstructionsChunk,
+    timeout: int,
+    prefilter: Optional[LiteralPrefilter] = None,
+) -> Optional[ChunkMatch]:
+    """Find the first match starting in the chunk. This runs in the worker processes"""
+
+    start_ranges = prefilter.get_start_ranges(chunk.text) if prefilter else None
+    match_result = search_at_instruction_starts(
+        regex.compile(regex_rule), chunk.text, timeout=timeout, start_ranges=start_ranges
+    )
+    if not match_result or match_result.start() >= chunk.starts_limit:
+        return None
+
+    return ChunkMatch(
+        start=chunk.offset + match_result.start(),
+        end=chunk.offset + match_result.end(),
+        matched_string=match_result.group(0),
+    )
+
+
+class ParallelMatcher:
+    """
+    Match a regex rule over the stringified instructions using several processes.
+
+    The instructions are split in chunks on instruction boundaries. Each chunk overlaps the next one by
+    `window_size` instructions, an upper bound of the instructions spanned by a match, so every match
+    starting in a chunk can be completed inside it. The chunk results are merged in address order so
+    the findings are the same as a single finditer_at_instruction_starts (or
+    search_at_instruction_starts for the first finding) over the whole stringified instructions.
+    """
+
+    def __init__(
+        self,
+        regex_rule: str,
+        window_size: int,
+        jobs: int,
+        timeout: int,
+        min_chunk_size: int = WINDOWED_MATCHING_CHUNK_SIZE,
+        prefilter: Optional[LiteralPrefilter] = None,
+    ) -> None:
+        if jobs < 1:
+            raise ValueError("jobs must be greater than 0")
+
+        self.regex_rule = regex_rule
+        self.prefilter = prefilter
+        self.window_size = max(window_size, 1)
+        self.jobs = jobs
+        self.timeout = timeout
+        self.min_chunk_size = min_chunk_size
+
+    def split_in_chunks(self, instructions: List[str]) -> List[InstructionsChunk]:
+        """Split the stringified instructions in overlapping chunks"""
+
+        chunk_size = self._get_chunk_size(number_of_instructions=len(instructions))
+
+        chunks: List[InstructionsChunk] = []
+        offset = 0
+        for chunk_start in range(0, len(instructions), chunk_size):
+            chunk_end = chunk_start + chunk_size
+            chunk_instructions = instructions[chunk_start:chunk_end]
+            overlap_instructions = instructions[chunk_end:chunk_end + self.window_size]
+
+            starts_limit = sum(len(inst_str) for inst_str in chunk_instructions)
+            chunks.append(
+                InstructionsChunk(
+                    text="".join(chunk_instructions + overlap_instructions),
+                    offset=offset,
+                    starts_limit=starts_limit,
+                )
+            )
+            offset += starts_limit
+
+        return chunks
+
+    def split_stream_in_chunks(self, stream: Buffer, offsets: Sequence[int]) -> List[InstructionsChunk]:
+        """
+        Split an encoded stream of stringified instructions in overlapping chunks.
+
+        `offsets` has the offset in `stream` of every instruction followed by the stream length.
+        """
+
+        number_of_instructions = len(offsets) - 1
+        chunk_size = self._get_chunk_size(number_of_instructions=number_of_instructions)
+
+        chunks: List[InstructionsChunk] = []
+        offset = 0
+        for chunk_start in range(0, number_of_instructions, chunk_size):
+            chunk_end = min(chunk_start + chunk_size, number_of_instructions)
+            overlap_end = min(chunk_end + self.window_size, number_of_instructions)
+
+            chunk_text = bytes(stream[offsets[chunk_start]:offsets[chunk_end]]).decode("utf-8")
+            overlap_text = bytes(stream[offsets[chunk_end]:offsets[overlap_end]]).decode("utf-8")
+            chunks.append(
+                InstructionsChunk(
+                    text=chunk_text + overlap_text, offset=offset, starts_limit=len(chunk_text)
+                )
+            )
+            offset += len(chunk_text)
+
+        return chunks
+
+    def _get_chunk_size(self, number_of_instructions: int) -> int:
+        wanted_chunks = self.jobs * PARALLEL_MATCHING_CHUNKS_PER_JOB
+        chunk_size = max(-(-number_of_instructions // wanted_chunks), self.min_chunk_size)
+
+        # Keep the overlap small compared with the chunk, the overlap is matched twice
+        return max(chunk_size, 4 * self.window_size)
+
+    def find_all(self, instructions: List[str]) -> List[ChunkMatch]:
+        """Find all the non overlapping matches, in address order"""
+        return self.find_all_in_chunks(self.split_in_chunks(instructions))
+
+    def find_all_in_chunks(self, chunks: List[InstructionsChunk]) -> List[ChunkMatch]:
+        """Find all the non overlapping matches of the chunks, in address order"""
+
+        if len(chunks) <= 1 or self.jobs == 1:
+            return self._merge_chunk_results(chunks=chunks, chunk_results=None)
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            chunk_results = [
+                executor.submit(
+                    find_matches_in_chunk, self.regex_rule, chunk, 0, self.timeout, self.prefilter
+                )
+                for chunk in chunks
+            ]
+            return self._merge_chunk_results(chunks=chunks, chunk_results=chunk_results)
+
+    def find_first(self, instructions: List[str]) -> Optional[ChunkMatch]:
+        """Find the first match, the same one a serial search returns"""
+        return self.find_first_in_chunks(self.split_in_chunks(instructions))
+
+    def find_first_in_chunks(self, chunks: List[InstructionsChunk]) -> Optional[ChunkMatch]:
+        """
+        Find the first match of the chunks, the same one a serial search returns.
+
+        The chunks are searched concurrently. Once a chunk has a match and every previous chunk
+        is known to have none, the match is returned and the workers not yet started are
+        cancelled. Chunks after a chunk with a match are cancelled too, as they can not hold an
+        earlier match.
+        """
+
+        if len(chunks) <= 1 or self.jobs == 1:
+            for chunk in chunks:
+                chunk_match = find_first_match_in_chunk(
+                    self.regex_rule, chunk, self.timeout, self.prefilter
+                )
+                if chunk_match:
+                    return chunk_match
+            return None
+
+        executor = ProcessPoolExecutor(max_workers=self.jobs)
+        try:
+            # Submitted in address order, so the earliest chunks are searched first
+            futures_index: Dict["Future[Optional[ChunkMatch]]", int] = {
+                executor.submit(
+                    find_first_match_in_chunk, self.regex_rule, chunk, self.timeout, self.prefilter
+                ): index
+                for index, chunk in enumerate(chunks)
+            }
+
+            chunk_results: Dict[int, Optional[ChunkMatch]] = {}
+            next_index = 0
+            for future in as_completed(futures_index):
+                index = futures_index[future]
+                if future.cancelled():
+                    continue
+
+                chunk_results[index] = future.result()
+                if chunk_results[index] is not None:
+                    self._cancel_chunks_after(futures_index, index)
+
+                # Return once every chunk up to the first one with a match was searched
+                while next_index in chunk_results:
+                    if chunk_results[next_index] is not None:
+                        return chunk_results[next_index]
+                    next_index += 1
+
+            return None
+
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _cancel_chunks_after(
+        futures_index: Dict["Future[Optional[ChunkMatch]]", int], index: int
+    ) -> None:
+        for future, future_index in futures_index.items():
+            if future_index > index:
+                future.cancel()
+
+    def _merge_chunk_results(
+        self, chunks: List[InstructionsChunk],
+        chunk_results: Optional[List["Future[List[ChunkMatch]]"]]
+    ) -> List[ChunkMatch]:
+        """Merge the chunk results, solving the matches that overlap a match of a previous chunk"""
+
+        all_matches: List[ChunkMatch] = []
+        last_match_end = 0
+
+        for index, chunk in enumerate(chunks):
+            chunk_matches = chunk_results[index].result() if chunk_results else None
+
+            if chunk_matches is None or (chunk_matches and chunk_matches[0].start < last_match_end):
+                # A previous match reaches into this chunk, search again from its end as serial search does
+                search_position = max(0, last_match_end - chunk.offset)
+                if search_position >= chunk.starts_limit:
+                    continue
+                chunk_matches = find_matches_in_chunk(
+                    self.regex_rule, chunk, search_position, self.timeout, self.prefilter
+                )
+
+            for chunk_match in chunk_matches:
+                if all_matches and chunk_match[:2] == all_matches[-1][:2]:
+                    # Same match found from two chunks
+                    continue
+                all_matches.append(chunk_match)
+                last_match_end = chunk_match.end
+
+        return all_matches
@@ -1,12 +1,24 @@
 "Parse arguments module"
 import argparse
+from typing import List, Optional
 
+from jasm.global_definitions import (
+    DEFAULT_DISASSEMBLY_CACHE_MAX_SIZE,
+    DEFAULT_INSTRUCTION_STREAM_CACHE_MAX_SIZE,
+    DEFAULT_RULE_CACHE_MAX_SIZE,
+)
 
-def parse_args_from_console() -> argparse.Namespace:
-    "Get and parse user arguments"
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument("-p", "--pattern", required=True, help="Input pattern for parsing")
+def add_matching_arguments(parser: argparse.ArgumentParser) -> None:
+    "Add the arguments shared by every matching entry point"
+
+    parser.add_argument(
+        "-p",
+        "--pattern",
+        required=True,
+        action="append",
+        help="Input pattern for parsing. Repeat it for matching several patterns over the same input",
+    )
     parser.add_argument("--debug", default=False, action="store_true", help="Set debugging level")
     parser.add_argument("--info", default=True, action="store_true", help="Set info level")
     parser.add_argument("--dissasemble-program", default="objdump", help="Set the program to use as dissasembler")
@@ -24,6 +36,99 @@ def parse_args_from_console() -> argparse.Namespace:
         help="Return only matched addresses",
     )
 
+    # A single consumer matches the rules
+    consumer_group = parser.add_mutually_exclusive_group()
+    consumer_group.add_argument(
+        "--stream",
+        default=False,
+        action="store_true",
+        help="Match instructions while they are parsed, keeping only a bounded window in memory",
+    )
+    parser.add_argument(
+        "--stream-window-size",
+        default=None,
+        type=int,
+        help="Number of instructions kept ahead of every match attempt by the --stream mode. "
+        "By default it is the maximum span of the rule",
+    )
+    consumer_group.add_argument(
+        "--mask",
+        default=False,
+        action="store_true",
+        help="Match the rule with boolean masks over a table of the instructions, instead of its regex. "
+        "Needs numpy, rules it does not support are matched with their regex",
+    )
+    consumer_group.add_argument(
+        "--automaton",
+        default=False,
+        action="store_true",
+        help="Match the rule with an automaton over the instructions, instead of its regex. "
+        "Rules it does not support are matched with their regex",
+    )
+    parser.add_argument(
+        "--no-windowed-matching",
+        default=False,
+        action="store_true",
+        help="Match the whole disassembly at once instead of in windows bounded by the rule span",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        default=1,
+        type=int,
+        help="Number of processes used for matching the instructions of a binary",
+    )
+
+    parser.add_argument(
+        "--disassembly-cache",
+        default=None,
+        help="Directory where binaries disassembly is cached, for not disassembling them again",
+    )
+    parser.add_argument(
+        "--disassembly-cache-max-size",
+        default=DEFAULT_DISASSEMBLY_CACHE_MAX_SIZE // 1024**2,
+        type=int,
+        help="Maximum size in MiB of the disassembly cache, least recently used entries are removed",
+    )
+
+    parser.add_argument(
+        "--instruction-stream-cache",
+        default=None,
+        help="Directory where the parsed instructions of every input are cached, for matching them "
+        "again without disassembling nor parsing the input",
+    )
+    parser.add_argument(
+        "--instruction-stream-cache-max-size",
+        default=DEFAULT_INSTRUCTION_STREAM_CACHE_MAX_SIZE // 1024**2,
+        type=int,
+        help="Maximum size in MiB of the instruction stream cache, least recently used entries are "
+        "removed",
+    )
+
+    parser.add_argument(
+        "--rule-cache",
+        default=None,
+        help="Directory where the compiled pattern files are cached, for not generating their regex "
+        "again until the pattern or its macros files change",
+    )
+    parser.add_argument(
+        "--rule-cache-max-size",
+        default=DEFAULT_RULE_CACHE_MAX_SIZE // 1024**2,
+        type=int,
+        help="Maximum size in MiB of the compiled rules cache, least recently used entries are removed",
+    )
+
+    # New argument for file paths list
+    parser.add_argument("--macros", nargs="+", help="List of extra macros file to use")
+
+
+def parse_args_from_console() -> argparse.Namespace:
+    "Get and parse user arguments"
+
+    parser = argparse.ArgumentParser()
+    add_matching_arguments(parser)
+
     # Create a mutually exclusive group for the two arguments
     group = parser.add_mutually_exclusive_group(required=True)
 
@@ -33,9 +138,59 @@ def parse_args_from_console() -> argparse.Namespace:
 
     # Return only a file_type argument
 
-    # New argument for file paths list
-    parser.add_argument("--macros", nargs="+", help="List of extra macros file to use")
+    parsed_args = parser.parse_args()
+
+    return parsed_args
+
+
+def parse_batch_args_from_console() -> argparse.Namespace:
+    "Get and parse user arguments for the batch mode"
+
+    parser = argparse.ArgumentParser(description="Match one rule over many files")
+    add_matching_arguments(parser)
+
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="Input files, directories (searched recursively) or glob patterns",
+    )
+    parser.add_argument(
+        "-0",
+        "--null-stdin",
+        default=False,
+        action="store_true",
+        help="Also read a NUL separated list of files from stdin (as printed by `find -print0`)",
+    )
+    parser.add_argument(
+        "--assembly",
+        default=False,
+        action="store_true",
+        help="Inputs are assembly files instead of binaries",
+    )
 
     parsed_args = parser.parse_args()
 
     return parsed_args
+
+
+def parse_compile_args_from_console(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    "Get and parse user arguments for compiling rules"
+
+    parser = argparse.ArgumentParser(
+        prog="jasm compile", description="Compile pattern files into artifacts matching runs can load"
+    )
+    parser.add_argument("patterns", nargs="+", help="Pattern files to compile")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Path of the artifact when compiling a single pattern. By default every artifact is "
+        "written next to its pattern file, with the .jasmc suffix",
+    )
+    parser.add_argument("--macros", nargs="+", help="List of extra macros file to use")
+    parser.add_argument("--debug", default=False, action="store_true", help="Set debugging level")
+    parser.add_argument("--enable_logging_to_file", default=True, action="store_true", help="Enable logging to logfile")
+
+    parsed_args = parser.parse_args(argv)
+
+    return parsed_args
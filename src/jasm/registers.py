@@ -0,0 +1,145 @@
+"""
+Canonical families of the x86-64 registers.
+
+Every register name is an access of some width to a register family: `rax`, `eax`, `ax`, `ah` and `al`
+are the 64, 32, 16, high 8 and low 8 bits of the `a` family. The register operands are annotated with
+their family and width while parsing (see OperandsParser), so the register captures can be compared
+as family numbers instead of matching the names of the registers character by character.
+"""
+
+from enum import IntEnum
+from functools import lru_cache
+from typing import Dict, Final, List, NamedTuple, Optional, Sequence, Tuple
+
+from jasm.global_definitions import Instruction, RegisterCapturePrefix, RegisterCaptureSuffixs
+
+
+class RegisterFamily(IntEnum):
+    "Canonical ID of a register family, shared by all the widths of the register"
+
+    A = 0
+    B = 1
+    C = 2
+    D = 3
+    SI = 4
+    DI = 5
+    SP = 6
+    BP = 7
+    R8 = 8
+    R9 = 9
+    R10 = 10
+    R11 = 11
+    R12 = 12
+    R13 = 13
+    R14 = 14
+    R15 = 15
+    IP = 16
+
+
+class RegisterAccess(NamedTuple):
+    "Register family and width accessed by a register operand"
+
+    family: RegisterFamily
+    width: RegisterCaptureSuffixs
+
+
+def _build_register_accesses() -> Dict[str, RegisterAccess]:
+    accesses: Dict[str, RegisterAccess] = {}
+
+    def add(family: RegisterFamily, names: Dict[RegisterCaptureSuffixs, str]) -> None:
+        for width, name in names.items():
+            accesses[name] = RegisterAccess(family, width)
+
+    for family, letter in zip(
+        (RegisterFamily.A, RegisterFamily.B, RegisterFamily.C, RegisterFamily.D), "abcd"
+    ):
+        add(family, {
+            RegisterCaptureSuffixs.SUFFIX_64: f"r{letter}x",
+            RegisterCaptureSuffixs.SUFFIX_32: f"e{letter}x",
+            RegisterCaptureSuffixs.SUFFIX_16: f"{letter}x",
+            RegisterCaptureSuffixs.SUFFIX_8H: f"{letter}h",
+            RegisterCaptureSuffixs.SUFFIX_8L: f"{letter}l",
+        })
+
+    for family, name in (
+        (RegisterFamily.SI, "si"), (RegisterFamily.DI, "di"), (RegisterFamily.SP, "sp"), (RegisterFamily.BP, "bp")
+    ):
+        add(family, {
+            RegisterCaptureSuffixs.SUFFIX_64: f"r{name}",
+            RegisterCaptureSuffixs.SUFFIX_32: f"e{name}",
+            RegisterCaptureSuffixs.SUFFIX_16: name,
+            RegisterCaptureSuffixs.SUFFIX_8L: f"{name}l",
+        })
+
+    for number in range(8, 16):
+        add(RegisterFamily(number), {
+            RegisterCaptureSuffixs.SUFFIX_64: f"r{number}",
+            RegisterCaptureSuffixs.SUFFIX_32: f"r{number}d",
+            RegisterCaptureSuffixs.SUFFIX_16: f"r{number}w",
+            RegisterCaptureSuffixs.SUFFIX_8L: f"r{number}b",
+        })
+
+    add(RegisterFamily.IP, {RegisterCaptureSuffixs.SUFFIX_64: "rip", RegisterCaptureSuffixs.SUFFIX_32: "eip"})
+    return accesses
+
+
+# Maximum number of distinct operand lists whose families are remembered
+FAMILY_MASKS_CACHE_SIZE: Final = 16384
+
+# Access of every register name, without the `%` of the AT&T syntax
+REGISTER_ACCESSES: Final = _build_register_accesses()
+
+# Values captured by the capture groups of the register captures (see
+# SpecialRegisterCaptureGroupTypeBuilder), by the family of the captured register
+CAPTURED_VALUES: Final[Dict[RegisterCapturePrefix, Dict[RegisterFamily, str]]] = {
+    RegisterCapturePrefix.genreg: {
+        RegisterFamily.A: "a", RegisterFamily.B: "b", RegisterFamily.C: "c", RegisterFamily.D: "d"
+    },
+    RegisterCapturePrefix.indreg: {RegisterFamily.SI: "s", RegisterFamily.DI: "d"},
+    RegisterCapturePrefix.stackreg: {RegisterFamily.SP: "sp"},
+    RegisterCapturePrefix.basereg: {RegisterFamily.BP: "bp"},
+}
+
+
+@lru_cache(maxsize=None)
+def get_register_access(operand: str) -> Optional[RegisterAccess]:
+    """Get the register accessed by a parsed operand, None if it is not a register"""
+    return REGISTER_ACCESSES.get(operand.removeprefix("%"))
+
+
+def get_capture_prefix(pattern_name: str) -> RegisterCapturePrefix:
+    """Get the register capture of a pattern name as `&genreg-1.32`"""
+
+    for prefix in RegisterCapturePrefix:
+        if pattern_name.startswith(f"&{prefix.name}"):
+            return prefix
+    raise ValueError(f"{pattern_name} is not a register capture")
+
+
+class RegisterIndex:
+    """
+    Families of the register operands of every instruction of a disassembly, whatever their widths.
+
+    The families of the operands are memoized, so the index of a disassembly is computed once and
+    the indexes built again by the rules matched over it only look them up.
+    """
+
+    def __init__(self, instructions: Sequence[Instruction]) -> None:
+        # Families of every instruction as a bit mask
+        self.family_masks: List[int] = [get_families_mask(inst.operands) for inst in instructions]
+
+    def has_family(self, position: int, family: RegisterFamily) -> bool:
+        """Check if an operand of the instruction at the position is a register of the family"""
+        return bool(self.family_masks[position] >> family & 1)
+
+
+@lru_cache(maxsize=FAMILY_MASKS_CACHE_SIZE)
+def get_families_mask(operands: Tuple[str, ...]) -> int:
+    """Get the families of the register operands as a bit mask"""
+
+    mask = 0
+    for operand in operands:
+        access = get_register_access(operand)
+        if access is not None:
+            mask |= 1 << access.family
+    return mask
@@ -0,0 +1,165 @@
+"""
+Precompiled rules.
+
+Generating the regex of a rule parses its YAML, expands its macros and builds its rule trees, for
+every match run. `jasm compile` runs it once and writes the results to a versioned artifact. Given as
+the pattern of a match run (`-p rule.jasmc`), the artifact is loaded without running the front end
+again.
+"""
+
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Final, List, Optional
+
+import regex
+
+from jasm.global_definitions import JASMConfig, get_jasm_version, get_regex_generator_hash
+from jasm.jasm_regex.tree_analysis.max_span import MaxSpanAnalyzer
+from jasm.jasm_regex.tree_analysis.required_literals import RequiredLiteralsAnalyzer
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+from jasm.literal_prefilter import LiteralPrefilter
+from jasm.logging_config import configure_logger, logger
+from jasm.parse_arguments import parse_compile_args_from_console
+
+# Change it when the fields of the artifacts change
+RULE_ARTIFACT_FORMAT_VERSION: Final = 2
+
+RULE_ARTIFACT_SUFFIX: Final = ".jasmc"
+
+
+def is_rule_artifact(pattern_pathstr: str) -> bool:
+    """Check if a pattern file is a precompiled rule"""
+    return Path(pattern_pathstr).suffix == RULE_ARTIFACT_SUFFIX
+
+
+@dataclass
+class RuleArtifact:
+    """
+    Results of the front end for a rule.
+
+    `config` is the configuration of the rule, written as the `config` of a pattern file (see
+    JASMConfig.get_config). `required_literals` are the clauses of its literal prefilter and
+    `capture_groups` and `capture_names` the number of capture groups of the regex and the numbers of
+    the named ones. `jasm_version` and `generator_hash` (see get_regex_generator_hash) are the ones of
+    the JASM that compiled it.
+    """
+
+    pattern_pathstr: str
+    regex_rule: str
+    max_span: Optional[int]
+    required_literals: List[List[str]]
+    capture_groups: int
+    capture_names: Dict[str, int]
+    config: Dict[str, Any]
+    jasm_version: str = field(default_factory=get_jasm_version)
+    generator_hash: str = field(default_factory=get_regex_generator_hash)
+
+    @classmethod
+    def from_pattern_file(cls, pattern_pathstr: str, macros: Optional[List[str]] = None) -> "RuleArtifact":
+        """Compile a pattern file. The configuration of the rule is left loaded"""
+
+        yaml_2_regex = Yaml2Regex(pattern_pathstr, macros_from_terminal=macros)
+        regex_rule = yaml_2_regex.produce_regex()
+        rule_tree = yaml_2_regex.produce_rule_tree()
+        compiled_regex = regex.compile(regex_rule)
+
+        return cls(
+            pattern_pathstr=pattern_pathstr,
+            regex_rule=regex_rule,
+            max_span=MaxSpanAnalyzer().get_max_span(rule_tree),
+            required_literals=[
+                sorted(clause) for clause in RequiredLiteralsAnalyzer().get_required_literals(rule_tree)
+            ],
+            capture_groups=compiled_regex.groups,
+            capture_names=dict(compiled_regex.groupindex),
+            config=JASMConfig.get_instance().get_config(),
+        )
+
+    def to_json(self) -> str:
+        """Serialize the artifact, with the version of its format"""
+        return json.dumps({"format_version": RULE_ARTIFACT_FORMAT_VERSION, **asdict(self)}, indent=2)
+
+    @classmethod
+    def from_json(cls, contents: str, path: str | Path) -> "RuleArtifact":
+        """Deserialize an artifact read from `path`, raises ValueError as `load`"""
+
+        fields = json.loads(contents)
+        if not isinstance(fields, dict) or fields.pop("format_version", None) != RULE_ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled rule format in {path}")
+
+        artifact = cls(**fields)
+        if artifact.jasm_version != get_jasm_version():
+            raise ValueError(
+                f"{path} was compiled with JASM {artifact.jasm_version}, compile {artifact.pattern_pathstr} again"
+            )
+        if artifact.generator_hash != get_regex_generator_hash():
+            raise ValueError(
+                f"{path} was compiled with another regex generator, compile {artifact.pattern_pathstr} again"
+            )
+        return artifact
+
+    def save(self, path: str | Path) -> None:
+        """Write the artifact, replacing the previous one at once"""
+
+        contents = self.to_json()
+        directory = Path(path).parent
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as temporary_file:
+                temporary_file.write(contents)
+            os.replace(temporary_path, path)
+        except OSError:
+            Path(temporary_path).unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def load(cls, path: str | Path) -> "RuleArtifact":
+        """Read an artifact, raises ValueError if it was written by another version of JASM"""
+
+        with open(path, "r", encoding="utf-8") as artifact_file:
+            return cls.from_json(artifact_file.read(), path)
+
+    def load_config(self) -> Dict[str, Any]:
+        """Load the configuration of the rule into the singleton, and get it as JASMConfig.get_all_info"""
+        global_config = JASMConfig.get_instance()
+        global_config.load_config(self.config)
+        all_info: Dict[str, Any] = global_config.get_all_info()
+        return all_info
+
+    def get_prefilter(self) -> Optional[LiteralPrefilter]:
+        """Get the literal prefilter of the rule, None if it has no required literals or unbounded span"""
+        if not self.required_literals or self.max_span is None:
+            return None
+        return LiteralPrefilter([frozenset(clause) for clause in self.required_literals], self.max_span)
+
+
+def get_artifact_path(pattern_pathstr: str) -> Path:
+    """Get the default path of the artifact of a pattern file, next to it"""
+    return Path(pattern_pathstr).with_suffix(RULE_ARTIFACT_SUFFIX)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    "Compile main function. Writes an artifact for every pattern file"
+
+    args = parse_compile_args_from_console(argv)
+    configure_logger(
+        debug=args.debug,
+        info=True,
+        enable_log_to_file=args.enable_logging_to_file,
+        enable_log_to_terminal=True,
+    )
+
+    if args.output is not None and len(args.patterns) > 1:
+        raise ValueError("--output can only be given when compiling a single pattern")
+
+    for pattern_pathstr in args.patterns:
+        artifact_path = Path(args.output) if args.output is not None else get_artifact_path(pattern_pathstr)
+        RuleArtifact.from_pattern_file(pattern_pathstr, macros=args.macros).save(artifact_path)
+        logger.info("Compiled %s into %s", pattern_pathstr, artifact_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"Content-addressed on-disk cache of compiled rules"
+import hashlib
+from typing import BinaryIO, List, Optional
+
+from jasm.global_definitions import get_jasm_version, get_regex_generator_hash
+from jasm.logging_config import logger
+from jasm.rule_artifact import RULE_ARTIFACT_FORMAT_VERSION, RULE_ARTIFACT_SUFFIX, RuleArtifact
+from jasm.stringify_asm.implementations.disassembly_cache import get_file_hash
+from jasm.stringify_asm.implementations.file_cache import LRUFileCache
+
+
+class RuleCache(LRUFileCache):
+    """
+    Size bounded on-disk cache of the artifacts of the pattern files (see RuleArtifact).
+
+    Entries are keyed by the content of the pattern file and of its macros files, the version of JASM
+    and the hash of the regex generator, so an entry is only reused when the front end would generate
+    the same rule.
+    """
+
+    ENTRY_SUFFIX = RULE_ARTIFACT_SUFFIX
+
+    def get(self, key: str) -> Optional[RuleArtifact]:
+        """Get the cached artifact, None if it is not cached"""
+
+        entry_path = self._get_entry_path(key)
+        try:
+            artifact = RuleArtifact.load(entry_path)
+
+        except FileNotFoundError:
+            return None
+
+        except (OSError, ValueError, TypeError) as exc:
+            logger.warning("Invalid rule cache entry %s: %s", entry_path, exc)
+            return None
+
+        self._mark_used(entry_path)
+        return artifact
+
+    def put(self, key: str, artifact: RuleArtifact) -> None:
+        """Store an artifact and evict the least recently used entries if needed"""
+
+        def write_entry(entry_file: BinaryIO) -> None:
+            entry_file.write(artifact.to_json().encode("utf-8"))
+
+        self._write_entry(key, write_entry)
+
+    def get_artifact(self, pattern_pathstr: str, macros: Optional[List[str]] = None) -> RuleArtifact:
+        """Get the artifact of a pattern file, compiling and caching it if it is not cached"""
+
+        key = self.get_cache_key(pattern_pathstr, macros)
+        artifact = self.get(key)
+        if artifact is not None:
+            logger.debug("Rule %s read from cache", pattern_pathstr)
+            return artifact
+
+        artifact = RuleArtifact.from_pattern_file(pattern_pathstr, macros=macros)
+        self.put(key, artifact)
+        return artifact
+
+    @staticmethod
+    def get_cache_key(pattern_pathstr: str, macros: Optional[List[str]] = None) -> str:
+        """Get the cache key of a pattern file, compiled with the given macros files in order"""
+
+        key_parts = [
+            str(RULE_ARTIFACT_FORMAT_VERSION),
+            get_jasm_version(),
+            get_regex_generator_hash(),
+            get_file_hash(pattern_pathstr),
+            *(get_file_hash(macros_file) for macros_file in macros or []),
+        ]
+        return hashlib.sha256("\0".join(key_parts).encode("utf-8")).hexdigest()
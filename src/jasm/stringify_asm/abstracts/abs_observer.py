@@ -57,6 +57,11 @@ class IConsumer(ABC):
     def consume_instruction(self, inst: Instruction) -> None:
         "Main consumer method"
 
+    @property
+    def done(self) -> bool:
+        "True once consuming more instructions can not change the result"
+        return False
+
     @abstractmethod
     def finalize(self) -> None:
         "Finalize consumer"
@@ -1,8 +1,16 @@
 from abc import ABC, abstractmethod
+from contextlib import closing
+from typing import TYPE_CHECKING
 
+from jasm.logging_config import logger
 from jasm.stringify_asm.abstracts.abs_observer import IConsumer
 from jasm.stringify_asm.abstracts.asm_parser import AsmParser
 from jasm.stringify_asm.abstracts.disassembler import Disassembler
+from jasm.stringify_asm.implementations.gnu_objdump.gnu_objdump_parser_manual import ObjdumpParserManual
+from jasm.stringify_asm.implementations.shell_disassembler import ShellDisassembler
+
+if TYPE_CHECKING:
+    from jasm.stringify_asm.implementations.instruction_table import InstructionTable
 
 
 class IInstructionProducer(ABC):
@@ -25,3 +33,37 @@ class ComposableProducer(IInstructionProducer):
         # Parse the assembly
         self.parser.parse(assembly_file, iConsumer)
         iConsumer.finalize()
+
+    def process_file_to_table(self, file: str) -> "InstructionTable":
+        """
+        Disassemble and parse a file into a columnar instruction table, instead of consuming every
+        instruction. It needs numpy installed and an ObjdumpParserManual parser.
+        """
+
+        if not isinstance(self.parser, ObjdumpParserManual):
+            raise TypeError(f"{type(self.parser).__name__} can not build instruction tables")
+
+        return self.parser.parse_table(self.disassembler.disassemble(file))
+
+
+class StreamingProducer(IInstructionProducer):
+    """
+    Producer that parses the output of a shell disassembler while it is running.
+
+    Disassembling, parsing and consuming overlap, and the whole disassembly is never held in memory.
+    Once the consumer is done (e.g. the first finding was reported) the disassembler is terminated.
+    """
+
+    def __init__(self, disassembler: ShellDisassembler, parser: ObjdumpParserManual) -> None:
+        self.disassembler = disassembler
+        self.parser = parser
+
+    def process_file(self, file: str, iConsumer: IConsumer) -> None:
+        with closing(self.disassembler.disassemble_lines(file)) as assembly_lines:
+            for instruction in self.parser.parse_lines(assembly_lines):
+                iConsumer.consume_instruction(instruction)
+                if iConsumer.done:
+                    logger.debug("Consumer done, skipping the rest of the file")
+                    break
+
+        iConsumer.finalize()
@@ -0,0 +1,111 @@
+"Content-addressed on-disk cache of disassembler outputs"
+import gzip
+import hashlib
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Final, Optional
+
+from jasm.logging_config import logger
+from jasm.stringify_asm.abstracts.disassembler import Disassembler
+from jasm.stringify_asm.implementations.file_cache import LRUFileCache
+from jasm.stringify_asm.implementations.shell_disassembler import ShellDisassembler
+
+HASH_BLOCK_SIZE: Final = 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def get_program_version(program: str) -> str:
+    """Get the version line of a shell program, as printed by `--version`"""
+    try:
+        result = subprocess.run([program, "--version"], capture_output=True, text=True, check=False)
+    except FileNotFoundError:
+        # The disassembler reports the missing program
+        return ""
+
+    version_lines = result.stdout.splitlines()
+    return version_lines[0].strip() if version_lines else ""
+
+
+def get_file_hash(input_file: str) -> str:
+    """Get the sha256 hash of the content of a file"""
+    file_hash = hashlib.sha256()
+    with open(input_file, "rb") as file_descriptor:
+        for block in iter(lambda: file_descriptor.read(HASH_BLOCK_SIZE), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+class DisassemblyCache(LRUFileCache):
+    """
+    Size bounded on-disk cache of disassemblies, stored gzip compressed.
+
+    Reading an entry marks it as recently used. When the cache grows over `max_size` bytes the least
+    recently used entries are removed.
+    """
+
+    ENTRY_SUFFIX = ".s.gz"
+
+    def get(self, key: str) -> Optional[str]:
+        """Get the cached disassembly, None if it is not cached"""
+
+        entry_path = self._get_entry_path(key)
+        try:
+            with gzip.open(entry_path, "rt", encoding="utf-8") as entry_file:
+                disassembly: str = entry_file.read()
+
+        except (OSError, EOFError) as exc:
+            if entry_path.exists():
+                logger.warning("Invalid disassembly cache entry %s: %s", entry_path, exc)
+            return None
+
+        self._mark_used(entry_path)
+        return disassembly
+
+    def put(self, key: str, disassembly: str) -> None:
+        """Store a disassembly and evict the least recently used entries if needed"""
+
+        def write_entry(entry_file: BinaryIO) -> None:
+            with gzip.GzipFile(fileobj=entry_file, mode="wb", compresslevel=6) as gzip_file:
+                gzip_file.write(disassembly.encode("utf-8"))
+
+        self._write_entry(key, write_entry)
+
+
+class CachedDisassembler(Disassembler):
+    """
+    Disassembler that reuses the cached outputs of a shell disassembler.
+
+    Entries are keyed by the hash of the binary, the program flags and the program version, so a
+    cached disassembly is only reused when the program would output the same disassembly.
+    """
+
+    def __init__(self, disassembler: ShellDisassembler, cache: DisassemblyCache) -> None:
+        self.disassembler = disassembler
+        self.cache = cache
+
+    def disassemble(self, input_file: str) -> str:
+        if not Path(input_file).is_file():
+            # Let the disassembler report the error
+            return self.disassembler.disassemble(input_file)
+
+        key = self.get_cache_key(input_file)
+        cached_disassembly = self.cache.get(key)
+        if cached_disassembly is not None:
+            logger.info("File binary disassembly read from cache")
+            return cached_disassembly
+
+        disassembly = self.disassembler.disassemble(input_file)
+        self.cache.put(key, disassembly)
+        return disassembly
+
+    def get_cache_key(self, input_file: str) -> str:
+        """Get the cache key of the disassembly of the given file"""
+
+        key_parts = [
+            get_file_hash(input_file),
+            self.disassembler.program,
+            get_program_version(self.disassembler.program),
+            *self.disassembler.flags,
+        ]
+        return hashlib.sha256("\0".join(key_parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,122 @@
+"Size bounded on-disk cache of files"
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Callable, List, Optional, Tuple
+
+from jasm.logging_config import logger
+
+
+class LRUFileCache:
+    """
+    Size bounded on-disk cache with one file per entry, named after its key.
+
+    The modification time of an entry is the last time it was used. When the cache grows over
+    `max_size` bytes the least recently used entries are removed.
+    """
+
+    ENTRY_SUFFIX: str = ".cache"
+
+    def __init__(self, cache_dir: str, max_size: int) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+
+        # Size of the cache entries, computed on the first write
+        self._current_size: Optional[int] = None
+
+    def _get_entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{self.ENTRY_SUFFIX}"
+
+    @staticmethod
+    def _mark_used(entry_path: Path) -> None:
+        try:
+            os.utime(entry_path)
+        except OSError:
+            # Removed by another process
+            pass
+
+    def _write_entry(self, key: str, write_entry: Callable[[BinaryIO], None]) -> bool:
+        """
+        Write an entry with the given function and evict the least recently used entries if needed.
+
+        Returns False if the entry could not be written.
+        """
+
+        temporary_path: Optional[str] = None
+        try:
+            temporary_file, temporary_path = self.create_temporary_file(key)
+            with temporary_file:
+                write_entry(temporary_file)
+
+        except OSError as exc:
+            logger.warning("Could not write cache entry %s: %s", self._get_entry_path(key), exc)
+            if temporary_path is not None:
+                Path(temporary_path).unlink(missing_ok=True)
+            return False
+
+        return self.commit_temporary_file(key, temporary_path)
+
+    def create_temporary_file(self, key: str) -> Tuple[BinaryIO, str]:
+        """
+        Create the temporary file an entry is written to, next to the entry.
+
+        The entry is written to a temporary file first, so concurrent readers never see a partial
+        entry.
+        """
+
+        entry_path = self._get_entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=entry_path.parent, suffix=".tmp")
+        return os.fdopen(file_descriptor, "wb"), temporary_path
+
+    def commit_temporary_file(self, key: str, temporary_path: str) -> bool:
+        """Replace the entry with the written temporary file. Returns False if it failed"""
+
+        entry_path = self._get_entry_path(key)
+        try:
+            os.replace(temporary_path, entry_path)
+
+        except OSError as exc:
+            logger.warning("Could not write cache entry %s: %s", entry_path, exc)
+            Path(temporary_path).unlink(missing_ok=True)
+            return False
+
+        self._entry_added(entry_path)
+        return True
+
+    def _entry_added(self, entry_path: Path) -> None:
+        if self._current_size is None:
+            self._current_size = sum(size for _, size, _ in self._get_entries())
+        else:
+            self._current_size += entry_path.stat().st_size
+
+        if self._current_size > self.max_size:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in its maximum size"""
+
+        entries = sorted(self._get_entries(), key=lambda entry: entry[2])
+        current_size = sum(size for _, size, _ in entries)
+
+        for entry_path, size, _ in entries:
+            if current_size <= self.max_size:
+                break
+            entry_path.unlink(missing_ok=True)
+            current_size -= size
+            logger.debug("Evicted cache entry %s", entry_path)
+
+        self._current_size = current_size
+
+    def _get_entries(self) -> List[Tuple[Path, int, float]]:
+        """Get the path, size and last use time of every entry"""
+
+        entries: List[Tuple[Path, int, float]] = []
+        for entry_path in self.cache_dir.glob(f"*/*{self.ENTRY_SUFFIX}"):
+            try:
+                entry_stat = entry_path.stat()
+            except FileNotFoundError:
+                # Removed by another process
+                continue
+            entries.append((entry_path, entry_stat.st_size, entry_stat.st_mtime))
+        return entries
@@ -1,9 +1,12 @@
 import re
 from dataclasses import dataclass
-from typing import List, Optional, TypeAlias
+from functools import _CacheInfo, lru_cache
+from typing import Dict, Final, List, Optional, Tuple, TypeAlias
 
+from jasm.derefs import DerefRecord, get_deref_record
 from jasm.global_definitions import Instruction
 from jasm.logging_config import logger
+from jasm.registers import RegisterAccess, get_register_access
 
 
 @dataclass
@@ -55,6 +58,34 @@ LINE_IS_LABER = rf"^({HEX_NUMBER}+) <(.*)>:$"
 
 LINE_IS_TITLE = r"^.*file format.*$"
 
+LINE_IS_SECTION = "disassembly of section (.*)"
+
+SPLIT_OPERANDS = r",(?![^\(]*\))"
+
+# Single pattern for classifying the usual lines of objdump with one match. The alternatives are
+# tried in the same order as the patterns above, so it classifies a line as matching them one by one
+LINE_CLASSIFIER = (
+    rf"(?P<instruction>{FIRST_PADDING}(?P<inst_addr>{HEX_NUMBER}+):{TAB}{INSTRUCTION_CODE}{SPACES}"
+    rf"{TAB}(?P<inst_mnemonic>[^ ]+){SPACES}{POSIBLE_TAB}(?P<inst_operands>[^# ]+){ANYTHING_ELSE})"
+    rf"|(?P<no_operands>{FIRST_PADDING}(?P<no_operands_addr>{HEX_NUMBER}+):{TAB}{INSTRUCTION_CODE}"
+    rf"{SPACES}{TAB}(?P<no_operands_mnemonic>[^ ]+){ANYTHING_ELSE})"
+    rf"|(?P<label>^(?P<label_addr>{HEX_NUMBER}+) <(?P<label_name>.*)>:$)"
+    rf"|(?P<nop_padding>{FIRST_PADDING}(?P<nop_addr>{HEX_NUMBER}+):{TAB}{INSTRUCTION_CODE}$)"
+)
+
+COMPILED_LINE_CLASSIFIER: Final = re.compile(LINE_CLASSIFIER)
+COMPILED_INSTRUCTION_W_OPERANDS: Final = re.compile(INSTRUCTION_W_OPERANDS)
+COMPILED_INSTRUCION_NO_OPERANDS: Final = re.compile(INSTRUCION_NO_OPERANDS)
+COMPILED_LINE_NOP_PADDING: Final = re.compile(LINE_NOP_PADDING)
+COMPILED_LINE_IS_LABER: Final = re.compile(LINE_IS_LABER)
+COMPILED_LINE_IS_TITLE: Final = re.compile(LINE_IS_TITLE)
+COMPILED_LINE_IS_SECTION: Final = re.compile(LINE_IS_SECTION)
+COMPILED_SPLIT_OPERANDS: Final = re.compile(SPLIT_OPERANDS)
+
+# Maximum number of distinct operands remembered. Binaries repeat a small set of operands, so a
+# bounded cache gets most of the hits without growing with the disassembly
+OPERANDS_CACHE_SIZE: Final = 16384
+
 
 class LineParser:
     def __init__(self, line: str) -> None:
@@ -63,6 +94,23 @@ class LineParser:
     def parse(self) -> ParsedElement:
         """Parse a single line of the objdump output."""
 
+        # Inst has a data16 prefix. Remove it
+        if "data16" in self.line:
+            self.line = self.line.replace("data16 ", "")
+
+        line_match = COMPILED_LINE_CLASSIFIER.match(self.line)
+        if line_match:
+            return self._build_classified_element(line_match)
+
+        return self.parse_other_lines()
+
+    def parse_sequentially(self) -> ParsedElement:
+        """
+        Parse a single line of the objdump output trying every line format one after the other.
+
+        Slower than `parse`, kept as its reference implementation.
+        """
+
         # Inst has a data16 prefix. Remove it
         if "data16" in self.line:
             self.line = self.line.replace("data16 ", "")
@@ -83,6 +131,32 @@ class LineParser:
         if line:
             return line
 
+        return self.parse_other_lines()
+
+    def _build_classified_element(self, line_match: re.Match[str]) -> ParsedElement:
+        """Build the element of a line classified by the line classifier"""
+
+        match line_match.lastgroup:
+            case "instruction":
+                return self._build_instruction(
+                    addr=line_match["inst_addr"],
+                    mnemonic=line_match["inst_mnemonic"],
+                    operands=line_match["inst_operands"],
+                )
+            case "no_operands":
+                return self._build_instruction_no_operands(
+                    addr=line_match["no_operands_addr"], mnemonic=line_match["no_operands_mnemonic"]
+                )
+            case "label":
+                return Label(addr=line_match["label_addr"], name=line_match["label_name"])
+            case "nop_padding":
+                return Instruction(addr=line_match["nop_addr"], mnemonic="empty", operands=[])
+            case _:
+                raise ValueError(f"Unknown line class {line_match.lastgroup}")
+
+    def parse_other_lines(self) -> ParsedElement:
+        """Parse a line that is not an instruction nor a label."""
+
         if self.is_line_broken():
             return self.line
 
@@ -105,7 +179,7 @@ class LineParser:
 
     def line_is_title(self) -> bool:
         """Check if the line is a title."""
-        return bool(re.match(LINE_IS_TITLE, self.line))
+        return bool(COMPILED_LINE_IS_TITLE.match(self.line))
 
     def is_empty_line(self) -> bool:
         """Check if the line is empty."""
@@ -117,44 +191,45 @@ class LineParser:
 
     def parse_instruction(self) -> Optional[Instruction]:
         """Parse a single instruction."""
-        match = re.match(INSTRUCTION_W_OPERANDS, self.line)
+        match = COMPILED_INSTRUCTION_W_OPERANDS.match(self.line)
 
         if match:
-            addrs = match.group(1)
-            mnemonic = match.group(2)
-            operands = match.group(3)
-
-            operands_list = self.get_splitted_operands(operands=operands)
-
-            operands_parsed = OperandsParser(operands=operands_list).parse()
-            return Instruction(addr=addrs, mnemonic=mnemonic, operands=operands_parsed)
+            return self._build_instruction(
+                addr=match.group(1), mnemonic=match.group(2), operands=match.group(3)
+            )
         return None
 
+    @staticmethod
+    def _build_instruction(addr: str, mnemonic: str, operands: str) -> Instruction:
+        # Same as OperandsParser(operands=get_splitted_operands(operands)).parse(), without building
+        # the intermediate list and parser for every instruction
+        operands_parsed = [normalize_operand(operand) for operand in split_operands(operands)]
+        return Instruction(addr=addr, mnemonic=mnemonic, operands=operands_parsed)
+
     @staticmethod
     def get_splitted_operands(operands: str) -> List[str]:
         """Get splitted operands."""
-        # Will split between commans only if this commas are not inside a parenthesis
-        operands_list = re.split(r",(?![^\(]*\))", operands)
-        return operands_list
+        return list(split_operands(operands))
 
     def parse_instruction_no_operands(self) -> Optional[Instruction]:
         """Parse a single instruction without operands."""
-        match = re.match(INSTRUCION_NO_OPERANDS, self.line)
+        match = COMPILED_INSTRUCION_NO_OPERANDS.match(self.line)
         if match:
-            addrs = match.group(1)
-            mnemonic = match.group(2)
+            return self._build_instruction_no_operands(addr=match.group(1), mnemonic=match.group(2))
+        return None
 
-            # TODO: check if this is needed or this worst the performance
-            # If instruction is bad return a bad instruction
-            if mnemonic == "(bad)":
-                return Instruction(addr=addrs, mnemonic="bad", operands=[])
+    @staticmethod
+    def _build_instruction_no_operands(addr: str, mnemonic: str) -> Instruction:
+        # TODO: check if this is needed or this worst the performance
+        # If instruction is bad return a bad instruction
+        if mnemonic == "(bad)":
+            return Instruction(addr=addr, mnemonic="bad", operands=[])
 
-            return Instruction(addr=match.group(1), mnemonic=match.group(2), operands=[])
-        return None
+        return Instruction(addr=addr, mnemonic=mnemonic, operands=[])
 
     def parse_section(self) -> Optional[Section]:
         """Parse a single section."""
-        match = re.match("disassembly of section (.*)", self.line.lower())
+        match = COMPILED_LINE_IS_SECTION.match(self.line.lower())
         if match:
             return Section(name=match.group(1))
 
@@ -162,7 +237,7 @@ class LineParser:
 
     def parse_label(self) -> Optional[Label]:
         """Parse a single label."""
-        match = re.match(LINE_IS_LABER, self.line)
+        match = COMPILED_LINE_IS_LABER.match(self.line)
         if match:
             return Label(addr=match.group(1), name=match.group(2))
         return None
@@ -171,7 +246,7 @@ class LineParser:
         """Parse a single nop padding."""
         # This is a line that is not an instruction but is a line that is used to pad the output of objdump
 
-        match = re.match(LINE_NOP_PADDING, self.line)
+        match = COMPILED_LINE_NOP_PADDING.match(self.line)
         if match:
             return Instruction(addr=match.group(1), mnemonic="empty", operands=[])
         return None
@@ -180,14 +255,27 @@ class LineParser:
 class OperandsParser:
     """Parse the operands of an instruction."""
 
-    def __init__(self, operands: List[str]) -> None:
+    def __init__(
+        self, operands: List[str], annotate_registers: bool = False, annotate_derefs: bool = False
+    ) -> None:
         self.operands = operands
+        self.annotate_registers = annotate_registers
+        self.annotate_derefs = annotate_derefs
+
+        # Family and width of every parsed operand that is a register, None for the other ones.
+        # Only filled by `parse` when annotating the registers
+        self.register_accesses: List[Optional[RegisterAccess]] = []
+
+        # Fields of every parsed operand that is a memory access, None for the other ones. Only
+        # filled by `parse` when annotating the derefs
+        self.deref_records: List[Optional[DerefRecord]] = []
 
     def parse_operands(self) -> List[str]:
         """Parse the operands of an instruction."""
-        return [self._process_operand_elem(operand_elem=operand) for operand in self.operands]
+        return [normalize_operand(operand) for operand in self.operands]
 
-    def _process_operand_elem(self, operand_elem: str) -> str:
+    @classmethod
+    def _process_operand_elem(cls, operand_elem: str) -> str:
         "Process operand element"
 
         # Operand is memory access
@@ -195,7 +283,7 @@ class OperandsParser:
         if operand_elem.startswith("(") and operand_elem.endswith(")"):
             if "," in operand_elem:
                 # Operand is of form (%rax,%rax,1)
-                return self.form_full_operand_with_3_elements(operand_elem)
+                return cls.form_full_operand_with_3_elements(operand_elem)
 
             # Operand is of form (%rip)
             operand_elem = "[" + operand_elem[1:-1] + "]"
@@ -205,10 +293,10 @@ class OperandsParser:
         if "(" in operand_elem and ")" in operand_elem:
             if "," in operand_elem:
                 # Operand is of form 0x0(%rax,%rax,1)
-                return self.form_full_operand_with_4_elements(operand_elem)
+                return cls.form_full_operand_with_4_elements(operand_elem)
 
             # Operand is of form *0x1dc59(%rip)
-            return self.form_full_operand_with_1_element(operand_elem)
+            return cls.form_full_operand_with_1_element(operand_elem)
 
         # Remove $ from inmediate
         if operand_elem.startswith("$"):
@@ -224,20 +312,21 @@ class OperandsParser:
         #     return f"{''.join(operand_elem[1])}+{operand_elem[0]}"
 
         # Parse operand types with reduced complexity
-        result = self.parse_operand_types(operand_elem)
+        result = cls.parse_operand_types(operand_elem)
         if result is not None:
             return result
 
         # Operand_elem passed all filters, returning it
         return operand_elem
 
-    def parse_operand_types(self, operand_elem: str) -> Optional[str]:
+    @classmethod
+    def parse_operand_types(cls, operand_elem: str) -> Optional[str]:
         """Parse various operand types with reduced complexity."""
         for parse_method in [
-            self.operand_is_int,
-            self.operand_is_hex,
-            self.label_or_reference,
-            self.parse_special_cases,
+            cls.operand_is_int,
+            cls.operand_is_hex,
+            cls.label_or_reference,
+            cls.parse_special_cases,
         ]:
             result = parse_method(operand_elem)
             if result is not None:
@@ -339,4 +428,47 @@ class OperandsParser:
         """Main class method.
         Parse the operands of an instruction."""
         operands_list = self.parse_operands()
+        if self.annotate_registers:
+            self.register_accesses = [get_register_access(operand) for operand in operands_list]
+        if self.annotate_derefs:
+            self.deref_records = [get_deref_record(operand) for operand in operands_list]
         return operands_list
+
+
+@lru_cache(maxsize=OPERANDS_CACHE_SIZE)
+def split_operands(operands: str) -> Tuple[str, ...]:
+    """Split the operands of an instruction. Memoized, see get_operands_cache_info"""
+    # Will split between commans only if this commas are not inside a parenthesis
+    return tuple(COMPILED_SPLIT_OPERANDS.split(operands))
+
+
+@lru_cache(maxsize=OPERANDS_CACHE_SIZE)
+def normalize_operand(operand_elem: str) -> str:
+    """Normalize a single operand. Memoized, see get_operands_cache_info"""
+    # pylint: disable-next=protected-access
+    return OperandsParser._process_operand_elem(operand_elem)
+
+
+def get_operands_cache_info() -> Dict[str, _CacheInfo]:
+    """Get the hits, misses and size of the operands caches"""
+    return {
+        "split_operands": split_operands.cache_info(),
+        "normalize_operand": normalize_operand.cache_info(),
+    }
+
+
+def get_cache_hit_rate(cache_info: _CacheInfo) -> float:
+    """Get the ratio of calls answered from the cache"""
+    calls = cache_info.hits + cache_info.misses
+    return cache_info.hits / calls if calls else 0.0
+
+
+def log_operands_cache_info() -> None:
+    for cache_name, cache_info in get_operands_cache_info().items():
+        logger.debug(
+            "Cache %s: %s hits, %s misses, hit rate %.1f%%",
+            cache_name,
+            cache_info.hits,
+            cache_info.misses,
+            get_cache_hit_rate(cache_info) * 100,
+        )
@@ -2,15 +2,27 @@
 Parser Implementation module
 """
 
-from jasm.stringify_asm.implementations.gnu_objdump.asm_manual_parser_w_regex import parse_file_lines
+from typing import TYPE_CHECKING, Final, Iterable, Iterator
+
+from jasm.stringify_asm.implementations.gnu_objdump.asm_manual_parser_w_regex import (
+    log_operands_cache_info,
+    parse_file_lines,
+    parse_line,
+)
 from jasm.stringify_asm.abstracts.abs_observer import IConsumer
 from jasm.stringify_asm.abstracts.asm_parser import AsmParser
 from jasm.global_definitions import Instruction
 
+if TYPE_CHECKING:
+    from jasm.stringify_asm.implementations.instruction_table import InstructionTable
+
 
 class ObjdumpParserManual(AsmParser):  # type: ignore
     """Implementation for parsing assembly instructions."""
 
+    # Change it when the parsed instructions change, it invalidates the instruction stream cache
+    PARSER_VERSION: Final = "2"
+
     def parse(self, file: str, iConsumer: IConsumer) -> None:
         """Main function to parse the assembly."""
 
@@ -23,3 +35,29 @@ class ObjdumpParserManual(AsmParser):  # type: ignore
         only_instructions = [elem for elem in parsed_file_lines if isinstance(elem, Instruction)]
         for elem in only_instructions:
             iConsumer.consume_instruction(elem)
+
+        log_operands_cache_info()
+
+    def parse_lines(self, lines: Iterable[str]) -> Iterator[Instruction]:
+        """
+        Parse the assembly lazily, yielding every instruction as soon as its line is read.
+
+        The lines are read one at a time, so they can come from a running disassembler.
+        """
+
+        for line in lines:
+            parsed_line = parse_line(line)
+            if isinstance(parsed_line, Instruction):
+                yield parsed_line
+
+        log_operands_cache_info()
+
+    def parse_table(self, file: str) -> "InstructionTable":
+        """Parse the assembly into a columnar instruction table. It needs numpy installed"""
+
+        # pylint: disable-next=import-outside-toplevel
+        from jasm.stringify_asm.implementations.instruction_table import InstructionTable
+
+        table = InstructionTable.from_parsed_elements(parse_file_lines(file.split("\n")))
+        log_operands_cache_info()
+        return table
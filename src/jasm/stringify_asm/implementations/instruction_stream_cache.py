@@ -0,0 +1,197 @@
+"Persistent cache of stringified instruction streams, read through memory maps"
+import hashlib
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO, Final, List, Optional, Tuple, Type
+
+from jasm.logging_config import logger
+from jasm.stringify_asm.implementations.disassembly_cache import get_file_hash
+from jasm.stringify_asm.implementations.file_cache import LRUFileCache
+
+# Change it when the stringified instructions or the entry layout change
+INSTRUCTION_STREAM_FORMAT_VERSION: Final = 1
+
+# Magic, format version, number of instructions and stream length
+TRAILER_FORMAT: Final = "<8sIQQ"
+TRAILER_MAGIC: Final = b"JASMSTRM"
+TRAILER_SIZE: Final = struct.calcsize(TRAILER_FORMAT)
+OFFSET_TYPECODE: Final = "Q"
+
+
+def get_instruction_stream_key(input_file: str, source_parts: List[str]) -> str:
+    """
+    Get the cache key of the instruction stream of a file.
+
+    `source_parts` must identify everything the stream depends on besides the file content: the
+    disassembler and its flags, the parser version and the instruction observers.
+    """
+
+    key_parts = [get_file_hash(input_file), str(INSTRUCTION_STREAM_FORMAT_VERSION), *source_parts]
+    return hashlib.sha256("\0".join(key_parts).encode("utf-8")).hexdigest()
+
+
+class CachedInstructionStream:
+    """
+    Stringified instructions read from the cache through a memory map.
+
+    An entry is the stream of stringified instructions, as built by CompleteConsumer, followed by the
+    offset table and a trailer. `stream` is the memory map of the whole entry, the stringified
+    instructions are its first `stream_length` bytes. `offsets` has the offset of every instruction
+    followed by `stream_length`.
+    """
+
+    def __init__(self, entry_file: BinaryIO) -> None:
+        self.stream = mmap.mmap(entry_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.stream_length, number_of_instructions = self._read_trailer()
+            offsets_size = (number_of_instructions + 1) * array(OFFSET_TYPECODE).itemsize
+            if self.stream_length + offsets_size + TRAILER_SIZE != len(self.stream):
+                raise ValueError("Invalid instruction stream size")
+
+            self.offsets = array(OFFSET_TYPECODE)
+            self.offsets.frombytes(self.stream[self.stream_length:self.stream_length + offsets_size])
+
+        except ValueError:
+            self.stream.close()
+            raise
+
+    def _read_trailer(self) -> Tuple[int, int]:
+        if len(self.stream) < TRAILER_SIZE:
+            raise ValueError("Invalid instruction stream trailer")
+
+        magic, format_version, number_of_instructions, stream_length = struct.unpack(
+            TRAILER_FORMAT, self.stream[-TRAILER_SIZE:]
+        )
+        if magic != TRAILER_MAGIC or format_version != INSTRUCTION_STREAM_FORMAT_VERSION:
+            raise ValueError("Invalid instruction stream trailer")
+
+        return stream_length, number_of_instructions
+
+    @property
+    def number_of_instructions(self) -> int:
+        return len(self.offsets) - 1
+
+    def get_instructions(self, start: int, end: int) -> str:
+        """Get the stringified instructions from index `start` to `end` (not included)"""
+        return self.stream[self.offsets[start]:self.offsets[end]].decode("utf-8")
+
+    def close(self) -> None:
+        self.stream.close()
+
+    def __enter__(self) -> "CachedInstructionStream":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class InstructionStreamRecorder:
+    """Write the stringified instructions of an input to the cache while they are consumed"""
+
+    def __init__(self, cache: "InstructionStreamCache", key: str) -> None:
+        self.cache = cache
+        self.key = key
+        self.offsets = array(OFFSET_TYPECODE)
+        self._stream_length = 0
+        self._temporary_file: Optional[BinaryIO] = None
+        self._temporary_path: Optional[str] = None
+
+        try:
+            self._temporary_file, self._temporary_path = cache.create_temporary_file(key)
+        except OSError as exc:
+            logger.warning("Could not record instruction stream %s: %s", key, exc)
+
+    def add(self, stringified_instruction: str) -> None:
+        """Add the next stringified instruction"""
+
+        if self._temporary_file is None:
+            return
+
+        encoded_instruction = stringified_instruction.encode("utf-8")
+        self.offsets.append(self._stream_length)
+        self._stream_length += len(encoded_instruction)
+
+        try:
+            self._temporary_file.write(encoded_instruction)
+        except OSError as exc:
+            logger.warning("Could not record instruction stream %s: %s", self.key, exc)
+            self.discard()
+
+    def commit(self) -> None:
+        """Store the recorded instructions in the cache"""
+
+        if self._temporary_file is None or self._temporary_path is None:
+            return
+
+        number_of_instructions = len(self.offsets)
+        self.offsets.append(self._stream_length)
+        try:
+            with self._temporary_file:
+                self._temporary_file.write(self.offsets.tobytes())
+                self._temporary_file.write(
+                    struct.pack(
+                        TRAILER_FORMAT,
+                        TRAILER_MAGIC,
+                        INSTRUCTION_STREAM_FORMAT_VERSION,
+                        number_of_instructions,
+                        self._stream_length,
+                    )
+                )
+        except OSError as exc:
+            logger.warning("Could not record instruction stream %s: %s", self.key, exc)
+            self.discard()
+            return
+
+        self._temporary_file = None
+        self.cache.commit_temporary_file(self.key, self._temporary_path)
+        self._temporary_path = None
+
+    def discard(self) -> None:
+        """Drop the recorded instructions"""
+
+        if self._temporary_file is not None:
+            self._temporary_file.close()
+            self._temporary_file = None
+        if self._temporary_path is not None:
+            Path(self._temporary_path).unlink(missing_ok=True)
+            self._temporary_path = None
+
+
+class InstructionStreamCache(LRUFileCache):
+    """
+    Size bounded on-disk cache of stringified instruction streams.
+
+    Entries are not compressed, so they can be memory mapped and matched without copying them.
+    """
+
+    ENTRY_SUFFIX = ".jstream"
+
+    def open(self, key: str) -> Optional[CachedInstructionStream]:
+        """Open the cached instruction stream, None if it is not cached"""
+
+        entry_path = self._get_entry_path(key)
+        try:
+            with open(entry_path, "rb") as entry_file:
+                cached_stream = CachedInstructionStream(entry_file)
+
+        except FileNotFoundError:
+            return None
+
+        except (OSError, ValueError) as exc:
+            logger.warning("Invalid instruction stream cache entry %s: %s", entry_path, exc)
+            return None
+
+        self._mark_used(entry_path)
+        return cached_stream
+
+    def create_recorder(self, key: str) -> InstructionStreamRecorder:
+        """Create a recorder for storing the instruction stream of the given key"""
+        return InstructionStreamRecorder(cache=self, key=key)
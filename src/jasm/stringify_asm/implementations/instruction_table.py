@@ -0,0 +1,383 @@
+"""
+Columnar table of parsed instructions, backed by NumPy arrays.
+
+It needs the optional `numpy` dependency (`pip install jasm[table]`).
+"""
+from pathlib import Path
+from typing import Dict, Final, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from jasm.derefs import MAX_DEREF_TERMS, DerefPattern, DerefRecord, get_deref_record
+from jasm.global_definitions import Instruction, ValidAddrRange
+from jasm.stringify_asm.implementations.gnu_objdump.asm_manual_parser_w_regex import (
+    Label,
+    ParsedElement,
+)
+
+# Change it when the arrays stored in the .npz files change
+INSTRUCTION_TABLE_FORMAT_VERSION: Final = 2
+
+# Value of the operands that are not an address
+NOT_AN_ADDRESS: Final = -1
+
+
+class Vocabulary:
+    """Interns strings as consecutive integer ids"""
+
+    def __init__(self, strings: Iterable[str] = ()) -> None:
+        self.strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+        for string in strings:
+            self.get_id(string)
+
+    def get_id(self, string: str) -> int:
+        string_id = self._ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._ids[string] = string_id
+            self.strings.append(string)
+        return string_id
+
+    def find_id(self, string: str) -> Optional[int]:
+        """Get the id of a string, None if it was never interned"""
+        return self._ids.get(string)
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class DerefTable:
+    """
+    Fields of the memory operands of a vocabulary, by operand id.
+
+    `records` has the DerefRecord of every operand, None for the operands that are not memory
+    accesses, and `unparsed_ids` the ids of the memory operands whose fields can not be told apart
+    (see get_deref_record). The terms of the records (see DerefRecord.get_terms) are stored by
+    column: operand `i` has `term_counts[i]` terms, the text of its term `j` is
+    `fields.strings[term_ids[j, i]]` and its scale `term_scales[j, i]`, -1 when the operand has fewer
+    terms or the term has no scale.
+    """
+
+    def __init__(self, operands: List[str]) -> None:
+        self.records: List[Optional[DerefRecord]] = [get_deref_record(operand) for operand in operands]
+        self.unparsed_ids = [
+            operand_id for operand_id, (operand, record) in enumerate(zip(operands, self.records))
+            if record is None and operand.startswith("[")
+        ]
+        self.fields = Vocabulary()
+
+        self.term_counts = np.zeros(len(operands), dtype=np.int8)
+        self.term_ids = np.full((MAX_DEREF_TERMS, len(operands)), -1, dtype=np.int32)
+        self.term_scales = np.full((MAX_DEREF_TERMS, len(operands)), -1, dtype=np.int64)
+
+        deref_ids = [operand_id for operand_id, record in enumerate(self.records) if record is not None]
+        records = [record for record in self.records if record is not None]
+        if not records:
+            return
+
+        get_field_id = self.fields.get_id
+        base_ids = [get_field_id(record.base) for record in records]
+        index_ids = np.array(
+            [-1 if record.index_register is None else get_field_id(record.index_register) for record in records]
+        )
+        scales = np.array([-1 if record.scale is None else record.scale for record in records])
+        displacement_ids = np.array(
+            [-1 if record.displacement is None else get_field_id(record.displacement) for record in records]
+        )
+
+        # The displacement follows the index term, or the base when there is no index
+        has_index = index_ids != -1
+        self.term_counts[deref_ids] = 1 + has_index + (displacement_ids != -1)
+        self.term_ids[0, deref_ids] = base_ids
+        self.term_ids[1, deref_ids] = np.where(has_index, index_ids, displacement_ids)
+        self.term_ids[2, deref_ids] = np.where(has_index, displacement_ids, -1)
+        self.term_scales[1, deref_ids] = scales
+
+    def get_mask(self, pattern: DerefPattern) -> npt.NDArray[np.bool_]:
+        """Get which operands have a record matching the pattern"""
+
+        mask = self.term_counts == len(pattern.terms)
+        for position, term in enumerate(pattern.terms):
+            field_ids = [self.fields.find_id(value) for value in term.values]
+            mask &= np.isin(self.term_ids[position], [field_id for field_id in field_ids if field_id is not None])
+
+            if term.scales is None:
+                mask &= self.term_scales[position] == -1
+            else:
+                scales = [int(scale) for scale in term.scales if scale.isdecimal() and str(int(scale)) == scale]
+                mask &= np.isin(self.term_scales[position], scales)
+        deref_mask: npt.NDArray[np.bool_] = mask
+        return deref_mask
+
+
+class InstructionTable:
+    """
+    Parsed instructions stored by column.
+
+    `addresses` has the address of every instruction and `mnemonic_ids` the id of its mnemonic in
+    `mnemonics`. The operands of instruction `i` are the ids in `operands` of
+    `operand_ids[operand_offsets[i]:operand_offsets[i + 1]]`. `addr_digits` keeps the number of
+    digits of every printed address and `addr_texts` the addresses with uppercase hex digits by
+    instruction index (see Instruction.addr_text), so the instructions can be rebuilt exactly. The labels of the
+    disassembly (functions) are kept as the index of the first instruction following them in
+    `label_starts`. The fields of the memory operands of the vocabulary are kept in a side table,
+    see get_deref_table.
+
+    Filters, histograms and slicing by function are done with vectorized NumPy operations.
+    """
+
+    def __init__(
+        self,
+        addresses: npt.NDArray[np.uint64],
+        addr_digits: npt.NDArray[np.uint8],
+        mnemonic_ids: npt.NDArray[np.int32],
+        operand_ids: npt.NDArray[np.int32],
+        operand_offsets: npt.NDArray[np.int64],
+        mnemonics: Vocabulary,
+        operands: Vocabulary,
+        label_names: Optional[List[str]] = None,
+        label_starts: Optional[npt.NDArray[np.int64]] = None,
+        addr_texts: Optional[Dict[int, str]] = None,
+    ) -> None:
+        self.addresses = addresses
+        self.addr_digits = addr_digits
+        self.addr_texts: Dict[int, str] = addr_texts if addr_texts is not None else {}
+        self.mnemonic_ids = mnemonic_ids
+        self.operand_ids = operand_ids
+        self.operand_offsets = operand_offsets
+        self.mnemonics = mnemonics
+        self.operands = operands
+        self.label_names: List[str] = label_names if label_names is not None else []
+        if label_starts is None:
+            label_starts = np.zeros(0, dtype=np.int64)
+        self.label_starts = label_starts
+
+        # Address value of every operand in the vocabulary, computed when first needed
+        self._operand_addresses: Optional[npt.NDArray[np.int64]] = None
+
+        # Side table with the fields of the memory operands in the vocabulary, built when first needed
+        self._deref_table: Optional[DerefTable] = None
+
+    @classmethod
+    def from_parsed_elements(cls, parsed_elements: Iterable[ParsedElement]) -> "InstructionTable":
+        """Build the table in bulk from the elements of a parsed assembly (see parse_file_lines)"""
+
+        mnemonics = Vocabulary()
+        operands = Vocabulary()
+        addresses: List[int] = []
+        addr_digits: List[int] = []
+        addr_texts: Dict[int, str] = {}
+        mnemonic_ids: List[int] = []
+        operand_ids: List[int] = []
+        operand_offsets: List[int] = [0]
+        label_names: List[str] = []
+        label_starts: List[int] = []
+
+        for element in parsed_elements:
+            if isinstance(element, Instruction):
+                addresses.append(element.address)
+                addr_digits.append(element.addr_digits)
+                if element.addr_text is not None:
+                    addr_texts[len(addresses) - 1] = element.addr_text
+                mnemonic_ids.append(mnemonics.get_id(element.mnemonic))
+                operand_ids.extend(operands.get_id(operand) for operand in element.operands)
+                operand_offsets.append(len(operand_ids))
+
+            elif isinstance(element, Label):
+                label_names.append(element.name)
+                label_starts.append(len(addresses))
+
+        return cls(
+            addresses=np.array(addresses, dtype=np.uint64),
+            addr_digits=np.array(addr_digits, dtype=np.uint8),
+            mnemonic_ids=np.array(mnemonic_ids, dtype=np.int32),
+            operand_ids=np.array(operand_ids, dtype=np.int32),
+            operand_offsets=np.array(operand_offsets, dtype=np.int64),
+            mnemonics=mnemonics,
+            operands=operands,
+            label_names=label_names,
+            label_starts=np.array(label_starts, dtype=np.int64),
+            addr_texts=addr_texts,
+        )
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def get_instruction(self, index: int) -> Instruction:
+        operands = self.operand_ids[self.operand_offsets[index]:self.operand_offsets[index + 1]]
+        addr_text = self.addr_texts.get(index)
+        return Instruction(
+            addr=addr_text or f"{int(self.addresses[index]):0{int(self.addr_digits[index])}x}",
+            mnemonic=self.mnemonics.strings[self.mnemonic_ids[index]],
+            operands=[self.operands.strings[operand_id] for operand_id in operands],
+        )
+
+    def iter_instructions(self) -> Iterator[Instruction]:
+        for index in range(len(self)):
+            yield self.get_instruction(index)
+
+    def get_operand_counts(self) -> npt.NDArray[np.int64]:
+        """Get the number of operands of every instruction"""
+        return np.diff(self.operand_offsets)
+
+    def select(self, mask: npt.NDArray[np.bool_]) -> "InstructionTable":
+        """Get a table with the instructions where `mask` is True. Labels are dropped"""
+
+        operand_mask = np.repeat(mask, self.get_operand_counts())
+        operand_offsets = np.zeros(np.count_nonzero(mask) + 1, dtype=np.int64)
+        np.cumsum(self.get_operand_counts()[mask], out=operand_offsets[1:])
+
+        # Index of every selected instruction in the new table
+        new_indexes = np.cumsum(mask) - 1
+
+        return InstructionTable(
+            addresses=self.addresses[mask],
+            addr_digits=self.addr_digits[mask],
+            mnemonic_ids=self.mnemonic_ids[mask],
+            operand_ids=self.operand_ids[operand_mask],
+            operand_offsets=operand_offsets,
+            mnemonics=self.mnemonics,
+            operands=self.operands,
+            addr_texts={int(new_indexes[index]): text for index, text in self.addr_texts.items() if mask[index]},
+        )
+
+    def slice(self, start: int, end: int) -> "InstructionTable":
+        """Get the table of the instructions from index `start` to `end` (not included)"""
+
+        first_operand, last_operand = self.operand_offsets[start], self.operand_offsets[end]
+        label_indexes = np.flatnonzero((self.label_starts >= start) & (self.label_starts < end))
+
+        return InstructionTable(
+            addresses=self.addresses[start:end],
+            addr_digits=self.addr_digits[start:end],
+            mnemonic_ids=self.mnemonic_ids[start:end],
+            operand_ids=self.operand_ids[first_operand:last_operand],
+            operand_offsets=self.operand_offsets[start:end + 1] - first_operand,
+            mnemonics=self.mnemonics,
+            operands=self.operands,
+            label_names=[self.label_names[index] for index in label_indexes],
+            label_starts=self.label_starts[label_indexes] - start,
+            addr_texts={index - start: text for index, text in self.addr_texts.items() if start <= index < end},
+        )
+
+    def get_address_range_mask(self, valid_addr_range: ValidAddrRange) -> npt.NDArray[np.bool_]:
+        """Get which instructions are inside the address range"""
+        return (self.addresses >= valid_addr_range.min.hex) & (
+            self.addresses <= valid_addr_range.max.hex
+        )
+
+    def get_first_operand_range_mask(
+        self, valid_addr_range: ValidAddrRange
+    ) -> npt.NDArray[np.bool_]:
+        """
+        Get which instructions have as first operand an address inside the range, the check done
+        by ValidAddrObserver on jumps and calls
+        """
+
+        operand_addresses = self._get_operand_addresses()
+        has_operands = self.get_operand_counts() > 0
+        first_operand_ids = self.operand_ids[self.operand_offsets[:-1][has_operands]]
+
+        first_operand_addresses = np.full(len(self), NOT_AN_ADDRESS, dtype=np.int64)
+        first_operand_addresses[has_operands] = operand_addresses[first_operand_ids]
+
+        is_address = first_operand_addresses != NOT_AN_ADDRESS
+        range_mask: npt.NDArray[np.bool_] = (
+            is_address
+            & (first_operand_addresses >= valid_addr_range.min.hex)
+            & (first_operand_addresses <= valid_addr_range.max.hex)
+        )
+        return range_mask
+
+    def _get_operand_addresses(self) -> npt.NDArray[np.int64]:
+        if self._operand_addresses is None or len(self._operand_addresses) != len(self.operands):
+            self._operand_addresses = np.array(
+                [get_operand_address(operand) for operand in self.operands.strings], dtype=np.int64
+            )
+        return self._operand_addresses
+
+    def get_deref_table(self) -> "DerefTable":
+        """Get the fields of the operands of the vocabulary that are memory accesses"""
+        if self._deref_table is None or len(self._deref_table.records) != len(self.operands):
+            self._deref_table = DerefTable(self.operands.strings)
+        return self._deref_table
+
+    def get_mnemonic_mask(self, mnemonics: Iterable[str]) -> npt.NDArray[np.bool_]:
+        """Get which instructions have one of the given mnemonics"""
+        mnemonic_ids = [self.mnemonics.find_id(mnemonic) for mnemonic in mnemonics]
+        known_ids = [mnemonic_id for mnemonic_id in mnemonic_ids if mnemonic_id is not None]
+        return np.isin(self.mnemonic_ids, known_ids)
+
+    def get_mnemonic_histogram(self) -> Dict[str, int]:
+        """Get the number of instructions of every mnemonic, most frequent first"""
+        counts = np.bincount(self.mnemonic_ids, minlength=len(self.mnemonics))
+        order = np.argsort(-counts, kind="stable")
+        return {
+            self.mnemonics.strings[index]: int(counts[index]) for index in order if counts[index]
+        }
+
+    def get_function_bounds(self) -> Dict[str, Tuple[int, int]]:
+        """Get the index of the first and next to last instruction of every label (function)"""
+        ends = np.append(self.label_starts[1:], len(self))
+        return {
+            name: (int(start), int(end))
+            for name, start, end in zip(self.label_names, self.label_starts, ends)
+        }
+
+    def get_function(self, name: str) -> "InstructionTable":
+        """Get the table of the instructions of a label (function)"""
+        start, end = self.get_function_bounds()[name]
+        return self.slice(start, end)
+
+    def save(self, path: str | Path) -> None:
+        """Store the table as an uncompressed .npz file"""
+        np.savez(
+            path,
+            format_version=np.array(INSTRUCTION_TABLE_FORMAT_VERSION),
+            addresses=self.addresses,
+            addr_digits=self.addr_digits,
+            mnemonic_ids=self.mnemonic_ids,
+            operand_ids=self.operand_ids,
+            operand_offsets=self.operand_offsets,
+            mnemonics=np.array(self.mnemonics.strings, dtype=np.str_),
+            operands=np.array(self.operands.strings, dtype=np.str_),
+            label_names=np.array(self.label_names, dtype=np.str_),
+            label_starts=self.label_starts,
+            addr_text_indexes=np.array(list(self.addr_texts), dtype=np.int64),
+            addr_texts=np.array(list(self.addr_texts.values()), dtype=np.str_),
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "InstructionTable":
+        """Load a table stored with `save`"""
+        with np.load(path, allow_pickle=False) as arrays:
+            if int(arrays["format_version"]) != INSTRUCTION_TABLE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported instruction table format in {path}")
+
+            return cls(
+                addresses=arrays["addresses"],
+                addr_digits=arrays["addr_digits"],
+                mnemonic_ids=arrays["mnemonic_ids"],
+                operand_ids=arrays["operand_ids"],
+                operand_offsets=arrays["operand_offsets"],
+                mnemonics=Vocabulary(arrays["mnemonics"].tolist()),
+                operands=Vocabulary(arrays["operands"].tolist()),
+                label_names=arrays["label_names"].tolist(),
+                label_starts=arrays["label_starts"],
+                addr_texts=dict(zip(arrays["addr_text_indexes"].tolist(), arrays["addr_texts"].tolist())),
+            )
+
+
+def get_operand_address(operand: str) -> int:
+    """Get the address an operand refers to, NOT_AN_ADDRESS if it is not a plain hex address"""
+    try:
+        address = int(operand.removeprefix("0x"), 16)
+    except ValueError:
+        return NOT_AN_ADDRESS
+
+    # Addresses that do not fit the int64 operand addresses are never in a valid range
+    if not 0 <= address <= np.iinfo(np.int64).max:
+        return NOT_AN_ADDRESS
+    return address
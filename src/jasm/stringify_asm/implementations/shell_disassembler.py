@@ -1,6 +1,8 @@
 import subprocess
+import tempfile
 from pathlib import Path
 from subprocess import CalledProcessError
+from typing import Generator
 
 from jasm.global_definitions import BinaryFileFormatNotSupported
 from jasm.logging_config import logger
@@ -14,11 +16,16 @@ class ShellDisassembler(Disassembler):  # type: ignore
         self.program = program
         self.flags = flags
 
+    @staticmethod
+    def _check_input_file(input_file: str) -> None:
+        if not Path(input_file).exists():
+            raise FileNotFoundError(f"File '{input_file}' does not exist")
+
     # @overrides
     def disassemble(self, input_file: str) -> str:
         """Run the shell program to disassemble the binary."""
+        self._check_input_file(input_file)
         try:
-            assert Path(input_file).exists(), f"File '{input_file}' does not exist"
             result = subprocess.run(
                 [self.program] + self.flags + [input_file],
                 capture_output=True,
@@ -43,3 +50,49 @@ class ShellDisassembler(Disassembler):  # type: ignore
         except Exception as exc:
             logger.error("Error while disassembling file: %s", exc)
             raise exc
+
+    def disassemble_lines(self, input_file: str) -> Generator[str, None, None]:
+        """
+        Run the shell program and yield its output line by line while it is running.
+
+        Closing the generator before the end terminates the program, so the rest of the binary is
+        not disassembled.
+        """
+        self._check_input_file(input_file)
+
+        # stderr goes to a file, a full stderr pipe would block the program while stdout is read
+        with tempfile.TemporaryFile(mode="w+") as stderr_file:
+            try:
+                process = subprocess.Popen(  # pylint: disable=consider-using-with
+                    [self.program] + self.flags + [input_file],
+                    stdout=subprocess.PIPE,
+                    stderr=stderr_file,
+                    text=True,
+                )
+            except FileNotFoundError as exc:
+                logger.error(
+                    "Error: program '%s' not found. Ensure it's installed and in your system PATH.",
+                    self.program,
+                )
+                raise FileNotFoundError() from exc
+
+            assert process.stdout is not None
+            try:
+                for line in process.stdout:
+                    yield line.rstrip("\n")
+
+            except GeneratorExit:
+                logger.info("Stopped disassembling file before the end")
+                process.terminate()
+                raise
+
+            finally:
+                process.stdout.close()
+                return_code = process.wait()
+
+            if return_code != 0:
+                # Error when calling decompliler, probably due to binary file format not supported
+                stderr_file.seek(0)
+                raise BinaryFileFormatNotSupported(stderr_file.read())
+
+            logger.info("File binary successfully disassembled")
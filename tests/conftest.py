@@ -1,9 +1,24 @@
 # conftest.py
+import os
 from pathlib import Path
-from typing import Any
+from random import Random
+from typing import Any, Iterator, List
 
+import pytest
+import regex
 import yaml
 
+from jasm.global_definitions import Instruction, MatchingSearchMode
+from jasm.instruction_starts import finditer_at_instruction_starts
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+from jasm.logging_config import logger
+
+RANDOM_MNEMONICS = ["push", "pop", "mov", "movl", "add", "call", "ret", "nop", "jmp"]
+RANDOM_OPERANDS = ["%rax", "%rbx", "%rbp", "%rsp", "$0x0", "$0x10", "0x10(%rax)", "0x1234", "rex"]
+RANDOM_DEREF_OPERANDS = [
+    "[%rax+0x10]", "[%rbp+-0x8]", "[%rbp+%rbx*8]", "[%rsp+%rbx*8+0x8]", "[rsp+rbx]", "[%rbp+%rbx*08]"
+]
+
 
 def load_test_configs(file_path: str, yaml_config_field: str) -> Any:
     """Load test configurations from a YAML file."""
@@ -12,5 +27,54 @@ def load_test_configs(file_path: str, yaml_config_field: str) -> Any:
         return yaml.safe_load(file_descriptor)[yaml_config_field]
 
 
+def get_random_instructions() -> List[Instruction]:
+    """Random instructions, the same ones on every call, for comparing the matchers with the regex."""
+    random = Random(0)
+    instructions: List[Instruction] = []
+    for index in range(6000):
+        number_of_operands = random.choice([0, 1, 2, 2, 3])
+        operands = [random.choice(RANDOM_OPERANDS) for _ in range(number_of_operands)]
+        if operands and random.random() < 0.2:
+            operands[0] = random.choice(RANDOM_DEREF_OPERANDS)
+        instructions.append(
+            Instruction(addr=f"{0x1000 + index * 4:x}", mnemonic=random.choice(RANDOM_MNEMONICS), operands=operands)
+        )
+    return instructions
+
+
+def get_rule(tmp_path: Path, rule: str) -> Yaml2Regex:
+    """Write a rule to a pattern file and load it."""
+    pattern_file = tmp_path / "rule.yaml"
+    pattern_file.write_text(rule, encoding="utf-8")
+    return Yaml2Regex(str(pattern_file))
+
+
+def get_regex_matched_strings(
+    regex_rule: str, instructions: List[Instruction], matching_mode: MatchingSearchMode
+) -> List[str]:
+    """Get the strings the regex of a rule matches in the stringified instructions."""
+    all_instructions = "".join(inst.stringify() + ",|" for inst in instructions)
+    matched_strings = [
+        match.group(0) for match in finditer_at_instruction_starts(regex.compile(regex_rule), all_instructions)
+    ]
+    if matching_mode == MatchingSearchMode.first_find:
+        return matched_strings[:1]
+    return matched_strings
+
+
 def pytest_addoption(parser):
     parser.addoption("--update-baseline", action="store_true", help="Update baseline on runned tests")
+
+
+@pytest.fixture(autouse=True)
+def restore_cwd_and_logger() -> Iterator[None]:
+    """Undo the changes of a test to the working directory and the global logger."""
+    previous_cwd = os.getcwd()
+    previous_level = logger.level
+    previous_handlers = list(logger.handlers)
+
+    yield
+
+    logger.handlers = previous_handlers
+    logger.setLevel(previous_level)
+    os.chdir(previous_cwd)
@@ -47,7 +47,7 @@ def test_macro_from_args() -> None:
 
     assert (
         regex ==
-        r"(?:[\dabcedf]+::(?:[^,|]{0,1000}replace_1[^,|]{0,1000},[^|]{0,1000}\|)[\dabcedf]+::(?:[^,|]{0,1000}replace_2[^,|]{0,1000},[^|]{0,1000}\|)[\dabcedf]+::(?:[^,|]{0,1000}replace_3[^,|]{0,1000},[^|]{0,1000}\|)[\dabcedf]+::(?:[^,|]{0,1000}replace_4[^,|]{0,1000},[^|]{0,1000}\|))"
+        r"[\dabcedf]++::[^,|]{0,1000}replace_1[^,|]{0,1000}+,[^|]{0,1000}+\|[\dabcedf]++::[^,|]{0,1000}replace_2[^,|]{0,1000}+,[^|]{0,1000}+\|[\dabcedf]++::[^,|]{0,1000}replace_3[^,|]{0,1000}+,[^|]{0,1000}+\|[\dabcedf]++::[^,|]{0,1000}replace_4[^,|]{0,1000}+,[^|]{0,1000}+\|"
     )
 
     with pytest.raises(ValueError, match="The following macros are not defined: {'@macro_unknown'}"):
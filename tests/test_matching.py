@@ -1,13 +1,39 @@
 # test_matching.py
-from typing import Any, Tuple
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
 
 import pytest
 from conftest import load_test_configs
 from ruamel import yaml
 
-from jasm.global_definitions import (InputFileType, MatchConfig,
-                                     MatchingReturnMode, MatchingSearchMode)
+from jasm.global_definitions import (WINDOWED_MATCHING_CHUNK_SIZE, ConsumerType, InputFileType,
+                                     MatchConfig, MatchingReturnMode, MatchingSearchMode)
 from jasm.match import MasterOfPuppets
+from jasm.rule_artifact import RuleArtifact
+
+
+def use_complete_consumer(match_config: MatchConfig, tmp_path: Path) -> None:
+    """Match with the default options of the configuration."""
+
+
+def use_stream_consumer(match_config: MatchConfig, tmp_path: Path) -> None:
+    match_config.consumer_type = ConsumerType.stream
+
+
+def use_automaton_consumer(match_config: MatchConfig, tmp_path: Path) -> None:
+    match_config.consumer_type = ConsumerType.automaton
+
+
+def use_instruction_stream_cache(match_config: MatchConfig, tmp_path: Path) -> None:
+    match_config.instruction_stream_cache_dir = str(tmp_path)
+
+
+def use_precompiled_rule(match_config: MatchConfig, tmp_path: Path) -> None:
+    """Match the rule compiled by `jasm compile`."""
+    artifact_path = tmp_path / "rule.jasmc"
+    RuleArtifact.from_pattern_file(match_config.pattern_pathstr, macros=match_config.macros).save(artifact_path)
+    match_config.pattern_pathstr = str(artifact_path)
 
 
 @pytest.mark.parametrize(
@@ -15,12 +41,31 @@ from jasm.match import MasterOfPuppets
     load_test_configs(file_path="configuration.yaml", yaml_config_field="test_matching"),
     ids=lambda config: config["title"],
 )
-def test_all_patterns(config: dict):
-    """Unified test function for all configurations in configuration.yaml."""
+@pytest.mark.parametrize(
+    "config_variant",
+    [
+        use_complete_consumer,
+        use_stream_consumer,
+        use_automaton_consumer,
+        use_instruction_stream_cache,
+        use_precompiled_rule,
+    ],
+    ids=lambda config_variant: config_variant.__name__,
+)
+def test_all_patterns(config: dict, config_variant: Callable[[MatchConfig, Path], None], tmp_path: Path):
+    """Unified test function for all configurations in configuration.yaml, with every config variant."""
     match_config, expected_result = config_builder(config)
-    mop = MasterOfPuppets(match_config=match_config)
-    result = mop.perform_matching()
-    assert result == expected_result
+    config_variant(match_config, tmp_path)
+
+    # With the instruction stream cache, the second run matches the stream recorded by the first one
+    runs = 1 if match_config.instruction_stream_cache_dir is None else 2
+    for _ in range(runs):
+        mop = MasterOfPuppets(match_config=match_config)
+        result = mop.perform_matching()
+        assert result == expected_result
+
+    if match_config.instruction_stream_cache_dir is not None:
+        assert list(tmp_path.glob("*/*.jstream"))
 
 
 def config_builder(config: dict[str, Any]) -> Tuple[MatchConfig, Any]:
@@ -69,3 +114,77 @@ def config_builder(config: dict[str, Any]) -> Tuple[MatchConfig, Any]:
         ),
         expected_result,
     )
+
+
+def build_multi_rule_groups() -> List[Tuple[MatchConfig, Dict[str, Any]]]:
+    """Group the configurations matching the same input with the same options, one pattern each."""
+
+    groups: Dict[Tuple[Any, ...], Tuple[MatchConfig, Dict[str, Any]]] = {}
+    for config in load_test_configs(file_path="configuration.yaml", yaml_config_field="test_matching"):
+        match_config, expected_result = config_builder(config)
+        key = (
+            match_config.input_file,
+            match_config.return_mode,
+            match_config.matching_mode,
+            match_config.return_only_address,
+            tuple(match_config.macros or []),
+        )
+        group_config, expected_results = groups.setdefault(
+            key, (replace(match_config, pattern_pathstr=[]), {})
+        )
+        if match_config.pattern_pathstr not in expected_results:
+            assert isinstance(group_config.pattern_pathstr, list)
+            group_config.pattern_pathstr.append(match_config.pattern_pathstr)
+            expected_results[match_config.pattern_pathstr] = expected_result
+
+    return [group for group in groups.values() if len(group[1]) > 1]
+
+
+@pytest.mark.parametrize(
+    "match_config, expected_results",
+    build_multi_rule_groups(),
+    ids=lambda value: value.input_file if isinstance(value, MatchConfig) else "",
+)
+def test_all_patterns_multi_rule(match_config: MatchConfig, expected_results: Dict[str, Any]):
+    """Same configurations as test_all_patterns but matching every pattern of an input at once."""
+    mop = MasterOfPuppets(match_config=match_config)
+    assert mop.perform_matching_all_rules() == expected_results
+
+
+def write_raw_regex_listing(tmp_path: Path) -> Tuple[str, str]:
+    """A raw regex rule and a listing where its only match spans the first chunk boundary"""
+
+    pattern_path = tmp_path / "raw_regex.yaml"
+    pattern_path.write_text('pattern:\n  - "push.{0,1000}retq"\n', encoding="utf-8")
+
+    push_index = WINDOWED_MATCHING_CHUNK_SIZE - 2
+    lines = []
+    for index in range(WINDOWED_MATCHING_CHUNK_SIZE + 16):
+        if index == push_index:
+            instruction = "push   %rbp"
+        elif index == push_index + 6:
+            instruction = "retq"
+        else:
+            instruction = "nop"
+        lines.append(f"    {index:x}:\t90                   \t{instruction}")
+    assembly_path = tmp_path / "raw_regex.s"
+    assembly_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(pattern_path), str(assembly_path)
+
+
+@pytest.mark.parametrize("windowed_matching, jobs", [(True, 1), (False, 1), (True, 2)])
+def test_raw_regex_match_across_chunk_boundary(tmp_path: Path, windowed_matching: bool, jobs: int):
+    """A raw regex can consume any number of instructions, so it is not matched in windows."""
+    pattern_pathstr, assembly_pathstr = write_raw_regex_listing(tmp_path)
+    match_config = MatchConfig(
+        pattern_pathstr=pattern_pathstr,
+        input_file=assembly_pathstr,
+        input_file_type=InputFileType.assembly,
+        return_mode=MatchingReturnMode.matched_addrs_list,
+        matching_mode=MatchingSearchMode.all_finds,
+        return_only_address=True,
+        windowed_matching=windowed_matching,
+        jobs=jobs,
+    )
+    mop = MasterOfPuppets(match_config=match_config)
+    assert mop.perform_matching() == [f"{WINDOWED_MATCHING_CHUNK_SIZE - 2:x}"]
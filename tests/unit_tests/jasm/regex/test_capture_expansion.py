@@ -0,0 +1,96 @@
+import glob
+from random import Random
+
+import pytest
+import regex
+
+from jasm.jasm_regex.capture_expansion import CaptureExpander, get_values
+from jasm.jasm_regex.regex_optimizer import RegexParser
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+
+MNEMONICS = ["add", "mov", "movl", "test", "push", "pop", "jmp", "xor"]
+OPERANDS = ["1", "$0x1", "%eax", "%rax", "%ax", "%al", "%ebx", "%bl", "%rdi", "%edi", "%di", "%sil", "%esi",
+            "%rsp", "%esp", "%bpl", "%ebp", "%rbp", "%cx", "%edx", "0x8(%rsp)"]
+
+# Instructions matching the register capture examples, or only differing in the captured registers
+PLANTED_INSTRUCTIONS = [
+    ["add,1,%edi", "mov,%di,%edi", "jmp,0x10"],
+    ["add,1,%esi", "mov,%di,%edi", "jmp,0x10"],
+    ["add,1,%ecx", "mov,%cx,%ecx", "jmp,0x10"],
+    ["add,1,%ecx", "mov,%dx,%edx", "jmp,0x10"],
+    ["add,1,%rsp", "mov,%sp,%esp", "jmp,0x10"],
+    ["add,1,%bpl", "mov,%bp,%ebp", "jmp,0x10"],
+    ["push,%rbx", "push,%rbx"],
+]
+
+
+def get_instructions_string() -> str:
+    random = Random(0)
+    instructions = []
+    while len(instructions) < 3000:
+        if random.random() < 0.05:
+            instructions.extend(random.choice(PLANTED_INSTRUCTIONS))
+            continue
+        operands = [random.choice(OPERANDS) for _ in range(random.choice([0, 1, 2, 2, 2]))]
+        instructions.append(",".join([random.choice(MNEMONICS)] + operands))
+    return "".join(f"{0x1000 + index * 4:x}::{instruction},|" for index, instruction in enumerate(instructions))
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        # Small domains
+        (r"([sd])x\1", "(?|(d)xd|(s)xs)"),
+        (r"(sp)a\1", "(sp)asp"),
+        (r"(x(?:y|zz))-\1", "(?|(xy)-xy|(xzz)-xzz)"),
+        (r"([ab])\1?", "(?|(a)a?|(b)b?)"),
+        (r"([ab])(?P<n>[cd])\1(?P=n)", "(?|(a)(?P<n>c)ac|(a)(?P<n>d)ad|(b)(?P<n>c)bc|(b)(?P<n>d)bd)"),
+        # Only up to the last backreference
+        (r"([ab])(.)\1\2", r"(?|(a)(.)a|(b)(.)b)\2"),
+        (r"(?:([ab])\1)+", "(?:(?|(a)a|(b)b))+"),
+        # Open domains and too many values
+        (r"([^,]+),\1", r"([^,]+),\1"),
+        (r"([a-q])\1", r"([a-q])\1"),
+        # References that are not later in the same branch
+        (r"(?:([ab])|c)\1", r"(?:([ab])|c)\1"),
+        (r"([ab])*\1", r"([ab])*\1"),
+        (r"(?P<g>[ab])(?(g)x|y)\1", r"(?P<g>[ab])(?(g)x|y)\1"),
+        (r"(?|(a)|(b))\1", r"(?|(a)|(b))\1"),
+    ],
+)
+def test_expand(pattern: str, expected: str) -> None:
+    assert CaptureExpander().expand(pattern) == expected
+
+
+def test_values_in_the_order_they_are_tried() -> None:
+    assert get_values(RegexParser("(?:b|a)[c-e]").parse(), 16) == ["bc", "bd", "be", "ac", "ad", "ae"]
+    assert get_values(RegexParser("a+").parse(), 16) is None
+    assert get_values(RegexParser(r"[\d]").parse(), 16) is None
+
+
+@pytest.mark.parametrize(
+    "yaml_file", sorted(glob.glob("tests/yamls/*capture_group*.yaml"))
+)
+def test_same_matches_with_the_expanded_captures(yaml_file: str) -> None:
+    yaml2regex = Yaml2Regex(yaml_file, macros_from_terminal=["tests/macros/jasm_macros.yaml"])
+    expanded_regex = yaml2regex.produce_regex()
+    original_regex = yaml2regex.produce_rule_tree().get_regex()
+
+    text = get_instructions_string()
+    expected = [(m.span(), m.groups()) for m in regex.finditer(original_regex, text)]
+    assert [(m.span(), m.groups()) for m in regex.finditer(expanded_regex, text)] == expected
+
+
+def test_register_captures_have_no_backreferences() -> None:
+    expanded_regex = Yaml2Regex(
+        "tests/yamls/register_capture_group_example_2.yaml", macros_from_terminal=["tests/macros/jasm_macros.yaml"]
+    ).produce_regex()
+
+    assert "\\1" not in expanded_regex
+    assert expanded_regex.count("(?|") == 1
+
+
+def test_instantiate_part_of_a_regex() -> None:
+    # The group of the part is the second one of the whole regex
+    pattern = r"add,%?[re]?([a-d])[xhl],?%?\2x,?%?\1h"
+    assert CaptureExpander().instantiate(pattern, [2], {1: "c", 2: "a"}) == r"add,%?[re]?(a)[xhl],?%?ax,?%?ch"
@@ -0,0 +1,92 @@
+import glob
+from random import Random
+
+import pytest
+import regex
+
+from jasm.global_definitions import IGNORE_INST_ADDR
+from jasm.jasm_regex.regex_optimizer import RegexOptimizer, RegexParser, join_branches
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+
+MNEMONICS = ["push", "pop", "mov", "and", "xor", "add", "sub", "call", "ret", "nop", "rol", "shr", "movb"]
+OPERANDS = ["%rax", "%eax", "%rsp", "$0x0", "0", "0x10(%rax)", "0x0(%rip)", "0xa1b2", "%rbx"]
+
+
+def get_instructions_string() -> str:
+    random = Random(0)
+    instructions = []
+    for index in range(2000):
+        operands = [random.choice(OPERANDS) for _ in range(random.choice([0, 1, 2, 2, 3]))]
+        instructions.append(f"{0x1000 + index * 4:x}::{','.join([random.choice(MNEMONICS)] + operands)},|")
+    return "".join(instructions)
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        # Redundant groups
+        ("(?:(?:a)(?:bc))", "abc"),
+        ("(?:(?:a)|(?:(?:b)|(?:c)))", "(?:a|b|c)"),
+        # Repeated groups of a single atom
+        ("(?:a)?b", "a?+b"),
+        ("(?:ab)?", "(?:ab)?"),
+        # Adjacent repetitions
+        ("%?%r", "%{1,2}+r"),
+        # Possessive only before characters the repetition can not match
+        (r"[^|]{0,1000}\|", r"[^|]{0,1000}+\|"),
+        ("[^,|]{0,1000}add", "[^,|]{0,1000}add"),
+        # Common prefixes that can only match in one way
+        (r"(?:[\d]+::a|[\d]+::b|c)", r"(?:[\d]++::(?:a|b)|c)"),
+        ("(?:x+a|x+b)", "x++(?:a|b)"),
+        ("(?:[a-z]+a|[a-z]+b)", "(?:[a-z]+a|[a-z]+b)"),
+        # Capture groups and conditionals are kept
+        ("(?:(a)|(?:b))", "(?:(a)|b)"),
+        ("(?:(?(g)(?!)|(?P<g>(?:a))))", "(?(g)(?!)|(?P<g>a))"),
+    ],
+)
+def test_optimize(pattern: str, expected: str) -> None:
+    assert RegexOptimizer().optimize(pattern) == expected
+
+
+@pytest.mark.parametrize("pattern", ["(?i)abc", "[[:alpha:]][a", "(?:abc"])
+def test_unsupported_regex_is_not_optimized(pattern: str) -> None:
+    assert RegexOptimizer().optimize(pattern) == pattern
+
+
+def test_parser_round_trip() -> None:
+    pattern = r"(?:(?P<a>[\dabcedf]+::)(?P=a)\1\x41[^\]|]{0,10}?(?<=x)(?>y)|z*+)"
+    assert join_branches(RegexParser(pattern).parse()) == pattern
+
+
+@pytest.mark.parametrize("yaml_file", sorted(glob.glob("tests/yamls/*.yaml")))
+def test_same_matches_with_the_optimized_regex(yaml_file: str) -> None:
+    try:
+        yaml2regex = Yaml2Regex(yaml_file, macros_from_terminal=["tests/macros/jasm_macros.yaml"])
+        rule_tree = yaml2regex.produce_rule_tree()
+    except (TypeError, ValueError):
+        pytest.skip("The rule can not be built with these macros")
+
+    original_regex = rule_tree.get_regex()
+    optimized_regex = RegexOptimizer().optimize(original_regex)
+    assert len(optimized_regex) <= len(original_regex) + original_regex.count("{")
+
+    text = get_instructions_string()
+    expected = [(m.span(), m.groups()) for m in regex.finditer(original_regex, text)]
+    assert [(m.span(), m.groups()) for m in regex.finditer(optimized_regex, text)] == expected
+
+
+def test_instruction_address_is_matched_once_for_alternatives() -> None:
+    optimized_regex = Yaml2Regex(
+        "tests/yamls/2_zero_reg.yaml", macros_from_terminal=["tests/macros/jasm_macros.yaml"]
+    ).produce_regex()
+
+    # Once for every `$or` of the rule, instead of once for every mnemonic
+    assert optimized_regex.count(IGNORE_INST_ADDR.replace("+", "++")) == 2
+
+
+def test_bound_skips() -> None:
+    pattern = r"[\dabcedf]++::[^,|]{0,1000}add[^,|]{0,1000}+,[^, ]{1,1000}x*?[^|]{2000,}\|"
+    assert RegexOptimizer().bound_skips(pattern, 46) == (
+        # Sets matching the separator and repetitions longer than the instructions are kept
+        r"[\dabcedf]{1,46}+::[^,|]{0,46}add[^,|]{0,46}+,[^, ]{1,1000}x{0,46}?[^|]{2000,}\|"
+    )
@@ -0,0 +1,138 @@
+from pathlib import Path
+from random import Random
+from typing import List, Optional
+
+import pytest
+import regex
+
+from jasm.global_definitions import Instruction
+from jasm.jasm_regex.tree_analysis.any_order import MAX_UNROLLED_ANY_ORDER_TIMES, FixedLengthAnalyzer
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.node_branch_root import NodeAndAnyOrder
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+
+MNEMONICS = ["push", "pop", "mov", "add", "call", "ret", "nop", "xor"]
+
+
+def get_rule_tree(tmp_path: Path, rule: str) -> PatternNode:
+    pattern_file = tmp_path / "rule.yaml"
+    pattern_file.write_text(rule, encoding="utf-8")
+    return Yaml2Regex(str(pattern_file)).produce_rule_tree()
+
+
+def get_any_order_nodes(node: PatternNode) -> List[NodeAndAnyOrder]:
+    nodes = [node] if isinstance(node, NodeAndAnyOrder) else []
+    for child in node.children or []:
+        nodes.extend(get_any_order_nodes(child))
+    return nodes
+
+
+def get_instructions_string() -> str:
+    random = Random(0)
+    return "".join(
+        Instruction(addr=f"{0x1000 + index * 2:x}", mnemonic=random.choice(MNEMONICS), operands=[]).stringify()
+        + ",|"
+        for index in range(4000)
+    )
+
+
+@pytest.mark.parametrize(
+    "rule, expected_length",
+    [
+        ("pattern:\n  - push\n  - mov\n", 2),
+        ("pattern:\n  - push:\n      times: 3\n  - $not:\n      - $and:\n          - pop\n          - ret\n", 4),
+        ("pattern:\n  - $and:\n      - push\n      - pop\n    times: 2\n", 6),
+        ("pattern:\n  - $or:\n      - push\n      - $and:\n          - pop\n          - ret\n", None),
+        ("pattern:\n  - push:\n      times:\n        min: 1\n        max: 2\n", None),
+        ("pattern:\n  - 'j.*'\n", None),
+    ],
+)
+def test_fixed_length_of_rules(tmp_path: Path, rule: str, expected_length: Optional[int]) -> None:
+    rule_tree = get_rule_tree(tmp_path, rule)
+    assert FixedLengthAnalyzer().get_fixed_length(rule_tree) == expected_length
+
+
+@pytest.mark.parametrize(
+    "rule, expected_marks",
+    [
+        ("pattern:\n  - $and_any_order:\n      - push\n      - pop\n", [True]),
+        # The inner node is inside the repeated outer one
+        (
+            "pattern:\n  - $and_any_order:\n      - push\n      - $and_any_order:\n          - pop\n"
+            "          - ret\n    times: 2\n",
+            [True, False],
+        ),
+        ("pattern:\n  - $and:\n      - $and_any_order:\n          - push\n          - pop\n    times: 2\n", [False]),
+        # Lookaheads drop their groups
+        ("pattern:\n  - $not:\n      - $and_any_order:\n          - push\n          - pop\n    times: 2\n", [True]),
+        ("pattern:\n  - $and_any_order:\n      - push\n      - mov:\n          times:\n            max: 2\n", [False]),
+        ("pattern:\n  - push:\n      - '&cc-1'\n  - $and_any_order:\n      - pop\n      - ret\n", [False]),
+    ],
+)
+def test_any_order_nodes_using_groups(tmp_path: Path, rule: str, expected_marks: List[bool]) -> None:
+    rule_tree = get_rule_tree(tmp_path, rule)
+    marks = [node.used_groups_prefix is not None for node in get_any_order_nodes(rule_tree)]
+    assert marks == expected_marks
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        "pattern:\n  - $and_any_order:\n      - push\n      - pop\n      - mov\n",
+        "pattern:\n  - call\n  - $and_any_order:\n      - $or:\n          - push\n          - pop\n"
+        "      - $not:\n          - ret\n      - mov\n",
+        "pattern:\n  - $and_any_order:\n      - push\n      - $and:\n          - pop\n          - add\n"
+        "    times:\n      min: 1\n      max: 2\n",
+        "pattern:\n  - $and_any_order:\n      - $and_any_order:\n          - push\n          - pop\n"
+        "      - mov\n",
+        "pattern:\n  - $not:\n      - $and_any_order:\n          - push\n          - pop\n    times: 3\n  - ret\n",
+    ],
+)
+def test_groups_regex_finds_the_permutations_regex_matches(tmp_path: Path, rule: str) -> None:
+    rule_tree = get_rule_tree(tmp_path, rule)
+    any_order_nodes = get_any_order_nodes(rule_tree)
+    groups_regex = rule_tree.get_regex()
+    for node in any_order_nodes:
+        node.used_groups_prefix = None
+    permutations_regex = rule_tree.get_regex()
+
+    instructions = get_instructions_string()
+    expected = [match.group(0) for match in regex.finditer(permutations_regex, instructions)]
+    found = [match.group(0) for match in regex.finditer(groups_regex, instructions)]
+
+    assert groups_regex != permutations_regex
+    assert expected
+    assert found == expected
+
+
+@pytest.mark.parametrize(
+    "times, uses_groups",
+    [(MAX_UNROLLED_ANY_ORDER_TIMES, True), (MAX_UNROLLED_ANY_ORDER_TIMES + 1, False), (1000, False)],
+)
+def test_repeated_any_order_unroll_is_capped(tmp_path: Path, times: int, uses_groups: bool) -> None:
+    rule_tree = get_rule_tree(
+        tmp_path, f"pattern:\n  - $and_any_order:\n      - push\n      - pop\n    times:\n      max: {times}\n"
+    )
+    (node,) = get_any_order_nodes(rule_tree)
+    assert (node.used_groups_prefix is not None) == uses_groups
+
+    # Above the cap the regex does not grow with the times
+    rule_regex = rule_tree.get_regex()
+    assert rule_regex.count("push") <= (MAX_UNROLLED_ANY_ORDER_TIMES if uses_groups else 2)
+    regex.compile(rule_regex)
+
+
+def test_groups_regex_size_is_linear(tmp_path: Path) -> None:
+    children = "".join(f"      - {mnemonic}\n" for mnemonic in MNEMONICS)
+    rule_tree = get_rule_tree(tmp_path, f"pattern:\n  - $and_any_order:\n{children}")
+
+    # Every child appears once instead of 8! times
+    rule_regex = rule_tree.get_regex()
+    assert rule_regex.count("push") == 1
+
+    # Every match has each mnemonic once
+    found = [match.group(0) for match in regex.finditer(rule_regex, get_instructions_string())]
+    assert found
+    for match in found:
+        mnemonics = [instruction.split("::")[1].split(",")[0] for instruction in match.split("|")[:-1]]
+        assert sorted(mnemonics) == sorted(MNEMONICS)
@@ -0,0 +1,81 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+import regex
+
+from jasm.derefs import get_deref_record
+from jasm.jasm_regex.tree_analysis.deref_fields import get_deref_pattern
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
+from jasm.jasm_regex.tree_generators.pattern_node_implementations.deref import PatternNodeDeref
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+
+OPERANDS = [
+    "[%rax]", "[%rip]", "[rbp]", "[%rax+%rbx*1+0x0]", "[%rax+%rbx*1+0]", "[%rax+rbx*0x1+0x0]",
+    "[%rax+%rbx*1]", "[%rax+%rbx*2+0x0]", "[%rax+%rbx*1+0x10]", "[%rsp+rbx]", "[%rbp+0xrbx]", "[rsp+rbx]",
+    "[%rsp+%rbx*1]", "[%rbp+-0x8]", "[%rbp+0x8]", "[%rsp+8]", "[%rsp+0x8+%rbx*1]", "[%rip+*0x8]",
+    "[+%rbx*8+0x8]", "[%rbp+%rbx*8]", "[%rbp+%rbx]", "[%rax+8]", "[%rax+0x8]", "[%rax+8+0x8]", "%rax", "0x8",
+    "rbx",
+]
+
+RULES = [
+    "pattern:\n  - mov:\n      - $deref:\n          main_reg: rsp\n          constant_offset: 8\n",
+    "pattern:\n  - mov:\n      - $deref:\n          main_reg: rbp\n          register_multiplier: rbx\n"
+    "          constant_multiplier: 8\n",
+    "pattern:\n  - mov:\n      - $deref:\n          main_reg: rbp\n          register_multiplier: '%rbx'\n",
+    "pattern:\n  - mov:\n      - $deref:\n          main_reg: '%rax'\n          constant_multiplier: 8\n",
+]
+
+
+def get_deref_nodes(rule_tree: PatternNode) -> List[PatternNodeDeref]:
+    if isinstance(rule_tree, PatternNodeDeref):
+        return [rule_tree]
+    return [deref for child in rule_tree.children or [] for deref in get_deref_nodes(child)]
+
+
+def get_rule_derefs(tmp_path: Path, rule: str) -> List[PatternNodeDeref]:
+    pattern_file = tmp_path / "rule.yaml"
+    pattern_file.write_text(rule, encoding="utf-8")
+    return get_deref_nodes(Yaml2Regex(str(pattern_file)).produce_rule_tree())
+
+
+@pytest.mark.parametrize(
+    "yaml_file", ["tests/yamls/deref_simple_example.yaml", "tests/yamls/logic_operators_inside_deref2.yaml"]
+)
+def test_fields_match_like_the_regex(yaml_file: str) -> None:
+    rule_tree = Yaml2Regex(yaml_file, macros_from_terminal=["tests/macros/jasm_macros.yaml"]).produce_rule_tree()
+    check_fields_match_like_the_regex(get_deref_nodes(rule_tree))
+
+
+@pytest.mark.parametrize("rule", RULES)
+def test_layouts_match_like_the_regex(tmp_path: Path, rule: str) -> None:
+    check_fields_match_like_the_regex(get_rule_derefs(tmp_path, rule))
+
+
+def check_fields_match_like_the_regex(deref_nodes: List[PatternNodeDeref]) -> None:
+    assert deref_nodes
+    for deref_node in deref_nodes:
+        deref_pattern = get_deref_pattern(deref_node)
+        assert deref_pattern is not None
+        deref_regex = regex.compile(deref_node.get_regex())
+
+        # The operands without a record are matched with the regex
+        matched = []
+        for operand in OPERANDS:
+            record = get_deref_record(operand)
+            if record is not None:
+                assert deref_pattern.matches(record) == (deref_regex.fullmatch(f"{operand},") is not None), operand
+                matched.append(deref_pattern.matches(record))
+        assert any(matched)
+
+
+def test_captures_are_not_compared() -> None:
+    rule_tree = Yaml2Regex(
+        "tests/yamls/logic_operators_inside_deref.yaml", macros_from_terminal=["tests/macros/jasm_macros.yaml"]
+    ).produce_rule_tree()
+    assert get_deref_pattern(get_deref_nodes(rule_tree)[0]) is None
+
+
+def test_raw_regex_fields_are_not_compared(tmp_path: Path) -> None:
+    (deref_node,) = get_rule_derefs(tmp_path, "pattern:\n  - mov:\n      - $deref:\n          main_reg: 'r.x'\n")
+    assert get_deref_pattern(deref_node) is None
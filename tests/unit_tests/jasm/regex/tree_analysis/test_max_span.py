@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from jasm.global_definitions import TimesType
+from jasm.jasm_regex.tree_analysis.max_span import MaxSpanAnalyzer
+from jasm.jasm_regex.tree_generators.capture_manager import CapturesManager
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNodeData
+from jasm.jasm_regex.tree_generators.pattern_node_tmp_untyped import PatternNodeTmpUntyped
+from jasm.jasm_regex.tree_generators.shared_context import SharedContext
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+
+
+@pytest.mark.parametrize(
+    "yaml_file, macros, expected_span",
+    [
+        ("tests/yamls/1_call_plain.yaml", None, 1),
+        ("tests/yamls/9_calls.yaml", None, 9),
+        ("tests/yamls/not_call.yaml", None, 12),
+        ("tests/yamls/call_between_3_and_9.yaml", None, 34),
+        ("tests/yamls/moonbounce_regex_matcher.yaml", ["tests/macros/jasm_macros.yaml"], 22),
+        ("tests/yamls/arx.yaml", ["tests/macros/jasm_macros.yaml"], 4),
+        ("tests/yamls/capture_group_2_push_with_same_reg.yaml", None, 2),
+    ],
+)
+def test_max_span_of_rules(yaml_file: str, macros: Optional[List[str]], expected_span: int) -> None:
+    rule_tree = Yaml2Regex(yaml_file, macros_from_terminal=macros).produce_rule_tree()
+    assert MaxSpanAnalyzer().get_max_span(rule_tree) == expected_span
+
+
+@pytest.mark.parametrize(
+    "name, expected_span",
+    [
+        ("push.{0,1000}retq", None),
+        ("[^ ]+", None),
+        ("[a-~]{1,10}", None),
+        ("[^, ]{1,1000}_op", 1),
+        ("j[a-z]+", 1),
+    ],
+)
+def test_max_span_of_raw_regex_names(tmp_path: Path, name: str, expected_span: Optional[int]) -> None:
+    pattern_file = tmp_path / "rule.yaml"
+    pattern_file.write_text(f"pattern:\n  - '{name}'\n", encoding="utf-8")
+    rule_tree = Yaml2Regex(str(pattern_file)).produce_rule_tree()
+    assert MaxSpanAnalyzer().get_max_span(rule_tree) == expected_span
+
+
+def test_max_span_of_untyped_node_is_unbounded() -> None:
+    untyped_node = PatternNodeTmpUntyped(
+        PatternNodeData(
+            name="test",
+            times=TimesType(_min_times=1, _max_times=1),
+            children=None,
+            parent=None,
+            shared_context=SharedContext(CapturesManager()),
+        )
+    )
+    assert MaxSpanAnalyzer().get_max_span(untyped_node) is None
@@ -0,0 +1,41 @@
+from typing import List, Optional
+
+import pytest
+
+from jasm.jasm_regex.tree_analysis.required_literals import RequiredLiteralsAnalyzer
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+
+
+@pytest.mark.parametrize(
+    "yaml_file, macros, expected_literals",
+    [
+        ("tests/yamls/1_call_plain.yaml", None, [{"call"}]),
+        # `$not` adds no literals
+        ("tests/yamls/not_call.yaml", None, [{"call"}, {"endbr64"}]),
+        # Every option of `$or`
+        ("tests/yamls/2_zero_reg.yaml", ["tests/macros/jasm_macros.yaml"], [{"and", "mov", "xor"}]),
+        (
+            "tests/yamls/arx.yaml",
+            ["tests/macros/jasm_macros.yaml"],
+            [{"add"}, {"rol", "ror", "sal", "sar", "shl", "shr"}, {"xor"}],
+        ),
+        # Hex operands are written as they are in the regex
+        ("tests/yamls/partial_operator_jasm.yaml", ["tests/macros/jasm_macros.yaml"], [{"mov"}, {"0xa1b2"}]),
+        # Macros with regex metacharacters and `$deref` add no literals
+        ("tests/yamls/smc.yaml", None, [{"movb"}]),
+    ],
+)
+def test_required_literals_of_rules(
+    yaml_file: str, macros: Optional[List[str]], expected_literals: List[set]
+) -> None:
+    rule_tree = Yaml2Regex(yaml_file, macros_from_terminal=macros).produce_rule_tree()
+    assert RequiredLiteralsAnalyzer().get_required_literals(rule_tree) == expected_literals
+
+
+def test_literals_are_in_every_match() -> None:
+    yaml2regex = Yaml2Regex("tests/yamls/arx.yaml", macros_from_terminal=["tests/macros/jasm_macros.yaml"])
+    required_literals = RequiredLiteralsAnalyzer().get_required_literals(yaml2regex.produce_rule_tree())
+
+    matched = "1000::add,%eax,%ebx,|1001::rol,$0x3,%eax,|1002::xor,%eax,%ecx,|"
+    for clause in required_literals:
+        assert any(literal in matched for literal in clause)
@@ -0,0 +1,87 @@
+from typing import Iterator, List
+
+from jasm.global_definitions import Instruction
+from jasm.stringify_asm.abstracts.abs_observer import IConsumer
+from jasm.stringify_asm.implementations.composable_producer import StreamingProducer
+from jasm.stringify_asm.implementations.gnu_objdump.gnu_objdump_parser_manual import ObjdumpParserManual
+from jasm.stringify_asm.implementations.shell_disassembler import ShellDisassembler
+
+ASSEMBLY_LINES = [
+    "",
+    "test:     file format elf64-x86-64",
+    "",
+    "Disassembly of section .text:",
+    "",
+    "0000000000001000 <main>:",
+    "    1000:\t55                   \tpush   %rbp",
+    "    1001:\t48 89 e5             \tmov    %rsp,%rbp",
+    "    1004:\tc3                   \tret",
+]
+
+
+class FakeShellDisassembler(ShellDisassembler):  # type: ignore
+    def __init__(self) -> None:
+        super().__init__(program="fake", flags=[])
+        self.lines_read = 0
+        self.closed = False
+
+    def disassemble_lines(self, input_file: str) -> Iterator[str]:
+        try:
+            for line in ASSEMBLY_LINES:
+                self.lines_read += 1
+                yield line
+        finally:
+            self.closed = True
+
+
+class ListConsumer(IConsumer):  # type: ignore
+    def __init__(self, stop_after: int = 0) -> None:  # pylint: disable=super-init-not-called
+        self.instructions: List[Instruction] = []
+        self.stop_after = stop_after
+        self.finalized = False
+
+    @property
+    def done(self) -> bool:
+        return self.stop_after > 0 and len(self.instructions) >= self.stop_after
+
+    def consume_instruction(self, inst: Instruction) -> None:
+        self.instructions.append(inst)
+
+    def finalize(self) -> None:
+        self.finalized = True
+
+
+def test_streaming_producer_consumes_every_instruction() -> None:
+    disassembler = FakeShellDisassembler()
+    consumer = ListConsumer()
+
+    producer = StreamingProducer(disassembler=disassembler, parser=ObjdumpParserManual())
+    producer.process_file("f", consumer)
+
+    assert [inst.mnemonic for inst in consumer.instructions] == ["push", "mov", "ret"]
+    assert consumer.finalized
+    assert disassembler.closed
+
+
+def test_streaming_producer_stops_when_consumer_is_done() -> None:
+    disassembler = FakeShellDisassembler()
+    consumer = ListConsumer(stop_after=1)
+
+    producer = StreamingProducer(disassembler=disassembler, parser=ObjdumpParserManual())
+    producer.process_file("f", consumer)
+
+    assert [inst.mnemonic for inst in consumer.instructions] == ["push"]
+    assert consumer.finalized
+    assert disassembler.closed
+    assert disassembler.lines_read < len(ASSEMBLY_LINES)
+
+
+def test_streaming_producer_same_instructions_as_parse() -> None:
+    consumer = ListConsumer()
+    producer = StreamingProducer(disassembler=FakeShellDisassembler(), parser=ObjdumpParserManual())
+    producer.process_file("f", consumer)
+
+    expected_consumer = ListConsumer()
+    ObjdumpParserManual().parse("\n".join(ASSEMBLY_LINES), expected_consumer)
+
+    assert consumer.instructions == expected_consumer.instructions
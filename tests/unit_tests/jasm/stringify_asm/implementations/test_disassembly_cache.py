@@ -0,0 +1,88 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from jasm.stringify_asm.implementations.disassembly_cache import CachedDisassembler, DisassemblyCache
+from jasm.stringify_asm.implementations.shell_disassembler import ShellDisassembler
+
+
+@pytest.fixture
+def binary_file(tmp_path: Path) -> str:
+    binary_path = tmp_path / "binary.bin"
+    binary_path.write_bytes(b"\x7fELF fake binary")
+    return str(binary_path)
+
+
+def test_cache_get_and_put(tmp_path: Path) -> None:
+    cache = DisassemblyCache(cache_dir=str(tmp_path / "cache"), max_size=1024**2)
+    assert cache.get("ab12") is None
+
+    cache.put("ab12", "disassembled content")
+    assert cache.get("ab12") == "disassembled content"
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    # Random content, so every compressed entry takes about the same size
+    disassemblies = {key: os.urandom(3000).hex() for key in ["aa01", "bb02", "cc03"]}
+
+    cache = DisassemblyCache(cache_dir=str(tmp_path / "cache"), max_size=1024**2)
+    cache.put("aa01", disassemblies["aa01"])
+    cache.put("bb02", disassemblies["bb02"])
+    entries_size = sum(size for _, size, _ in cache._get_entries())  # pylint: disable=protected-access
+
+    # Use the first entry again, so the second one is the least recently used
+    for key, last_use in [("aa01", 2000), ("bb02", 1000)]:
+        os.utime(cache._get_entry_path(key), (last_use, last_use))  # pylint: disable=protected-access
+    # Room for two entries only
+    cache.max_size = entries_size + entries_size // 4
+
+    cache.put("cc03", disassemblies["cc03"])
+
+    assert cache.get("aa01") == disassemblies["aa01"]
+    assert cache.get("bb02") is None
+    assert cache.get("cc03") == disassemblies["cc03"]
+
+
+def test_cache_ignores_invalid_entry(tmp_path: Path) -> None:
+    cache = DisassemblyCache(cache_dir=str(tmp_path / "cache"), max_size=1024**2)
+    entry_path = cache._get_entry_path("dd04")  # pylint: disable=protected-access
+    entry_path.parent.mkdir(parents=True)
+    entry_path.write_bytes(b"not gzip")
+
+    assert cache.get("dd04") is None
+
+
+@patch("jasm.stringify_asm.implementations.disassembly_cache.get_program_version", return_value="objdump 2.42")
+def test_cached_disassembler_disassembles_once(
+    mock_version: MagicMock, tmp_path: Path, binary_file: str
+) -> None:
+    shell_disassembler = ShellDisassembler(program="objdump", flags=["-d", "-M", "att"])
+    cache = DisassemblyCache(cache_dir=str(tmp_path / "cache"), max_size=1024**2)
+
+    with patch.object(shell_disassembler, "disassemble", return_value="disassembled content") as mock_disassemble:
+        cached_disassembler = CachedDisassembler(shell_disassembler, cache)
+        assert cached_disassembler.disassemble(binary_file) == "disassembled content"
+        assert cached_disassembler.disassemble(binary_file) == "disassembled content"
+
+    mock_disassemble.assert_called_once_with(binary_file)
+
+
+@patch("jasm.stringify_asm.implementations.disassembly_cache.get_program_version", return_value="objdump 2.42")
+def test_cache_key_depends_on_content_and_flags(
+    mock_version: MagicMock, tmp_path: Path, binary_file: str
+) -> None:
+    cache = DisassemblyCache(cache_dir=str(tmp_path / "cache"), max_size=1024**2)
+    att_disassembler = CachedDisassembler(ShellDisassembler("objdump", ["-d", "-M", "att"]), cache)
+    intel_disassembler = CachedDisassembler(ShellDisassembler("objdump", ["-d", "-M", "Intel"]), cache)
+
+    att_key = att_disassembler.get_cache_key(binary_file)
+    assert att_key != intel_disassembler.get_cache_key(binary_file)
+
+    Path(binary_file).write_bytes(b"\x7fELF other binary")
+    assert att_key != att_disassembler.get_cache_key(binary_file)
+
+    mock_version.return_value = "objdump 2.43"
+    Path(binary_file).write_bytes(b"\x7fELF fake binary")
+    assert att_key != att_disassembler.get_cache_key(binary_file)
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+from jasm.stringify_asm.implementations.instruction_stream_cache import (
+    InstructionStreamCache,
+    get_instruction_stream_key,
+)
+
+STRINGIFIED_INSTRUCTIONS = ["1000::push,%rbp,|", "1001::call,2000,|", "1006::ret,|"]
+
+
+def test_record_and_open(tmp_path: Path) -> None:
+    cache = InstructionStreamCache(cache_dir=str(tmp_path), max_size=1024**2)
+    assert cache.open("ab12") is None
+
+    recorder = cache.create_recorder("ab12")
+    for stringified_instruction in STRINGIFIED_INSTRUCTIONS:
+        recorder.add(stringified_instruction)
+    recorder.commit()
+
+    cached_stream = cache.open("ab12")
+    assert cached_stream is not None
+    with cached_stream:
+        assert cached_stream.number_of_instructions == 3
+        assert cached_stream.stream[:cached_stream.stream_length] == "".join(STRINGIFIED_INSTRUCTIONS).encode()
+        assert cached_stream.get_instructions(1, 3) == "".join(STRINGIFIED_INSTRUCTIONS[1:])
+
+
+def test_record_empty_stream(tmp_path: Path) -> None:
+    cache = InstructionStreamCache(cache_dir=str(tmp_path), max_size=1024**2)
+    cache.create_recorder("cd34").commit()
+
+    cached_stream = cache.open("cd34")
+    assert cached_stream is not None
+    with cached_stream:
+        assert cached_stream.number_of_instructions == 0
+        assert cached_stream.get_instructions(0, 0) == ""
+
+
+def test_discarded_recording_is_not_cached(tmp_path: Path) -> None:
+    cache = InstructionStreamCache(cache_dir=str(tmp_path), max_size=1024**2)
+    recorder = cache.create_recorder("ef56")
+    recorder.add(STRINGIFIED_INSTRUCTIONS[0])
+    recorder.discard()
+
+    assert cache.open("ef56") is None
+    assert not list(tmp_path.glob("*/*"))
+
+
+def test_invalid_entry_is_ignored(tmp_path: Path) -> None:
+    cache = InstructionStreamCache(cache_dir=str(tmp_path), max_size=1024**2)
+    recorder = cache.create_recorder("ab12")
+    recorder.add(STRINGIFIED_INSTRUCTIONS[0])
+    recorder.commit()
+
+    entry_path = next(tmp_path.glob("*/*.jstream"))
+    entry_path.write_bytes(entry_path.read_bytes()[:-1])
+
+    assert cache.open("ab12") is None
+
+
+def test_key_depends_on_content_and_source(tmp_path: Path) -> None:
+    input_file = tmp_path / "input.s"
+    input_file.write_text("assembly")
+
+    key = get_instruction_stream_key(str(input_file), ["objdump", "-M", "att"])
+    assert key == get_instruction_stream_key(str(input_file), ["objdump", "-M", "att"])
+    assert key != get_instruction_stream_key(str(input_file), ["objdump", "-M", "Intel"])
+
+    input_file.write_text("other assembly")
+    assert key != get_instruction_stream_key(str(input_file), ["objdump", "-M", "att"])
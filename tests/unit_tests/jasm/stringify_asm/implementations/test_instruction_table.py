@@ -0,0 +1,138 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from jasm.derefs import DerefPattern, DerefTerm
+from jasm.global_definitions import Instruction, ValidAddrRange
+from jasm.stringify_asm.implementations.composable_producer import ComposableProducer
+from jasm.stringify_asm.implementations.gnu_objdump.asm_manual_parser_w_regex import parse_file_lines
+from jasm.stringify_asm.implementations.gnu_objdump.gnu_objdump_parser_manual import ObjdumpParserManual
+from jasm.stringify_asm.implementations.null_disassembler import NullDisassembler
+
+np = pytest.importorskip("numpy")
+
+# pylint: disable-next=wrong-import-position
+from jasm.stringify_asm.implementations.instruction_table import InstructionTable
+
+ASSEMBLY = "\n".join(
+    [
+        "0000000000001000 <main>:",
+        "    1000:\t55                   \tpush   %rbp",
+        "    1001:\t48 89 e5             \tmov    %rsp,%rbp",
+        "    1004:\te8 07 00 00 00       \tcall   2000 <helper>",
+        "    1009:\tc3                   \tret",
+        "",
+        "0000000000002000 <helper>:",
+        "    2000:\t31 c0                \txor    %eax,%eax",
+        "    2002:\tc3                   \tret",
+    ]
+)
+
+
+def get_instructions() -> List[Instruction]:
+    parsed_elements = parse_file_lines(ASSEMBLY.split("\n"))
+    return [elem for elem in parsed_elements if isinstance(elem, Instruction)]
+
+
+@pytest.fixture
+def table() -> InstructionTable:
+    return ObjdumpParserManual().parse_table(ASSEMBLY)
+
+
+def test_table_rebuilds_the_parsed_instructions(table: InstructionTable) -> None:
+    assert len(table) == 6
+    assert list(table.iter_instructions()) == get_instructions()
+    assert table.addresses.dtype == np.uint64
+    assert table.mnemonic_ids.dtype == np.int32
+
+
+def test_save_and_load(table: InstructionTable, tmp_path: Path) -> None:
+    table_file = tmp_path / "table.npz"
+    table.save(table_file)
+
+    loaded_table = InstructionTable.load(table_file)
+
+    assert list(loaded_table.iter_instructions()) == get_instructions()
+    assert loaded_table.get_function_bounds() == table.get_function_bounds()
+
+
+def test_table_keeps_uppercase_addresses(tmp_path: Path) -> None:
+    instructions = [
+        Instruction(addr=addr, mnemonic="nop", operands=[]) for addr in ["0FFE", "0fff", "1000", "100A", "100b"]
+    ]
+    table = InstructionTable.from_parsed_elements(instructions)
+    table_file = tmp_path / "table.npz"
+    table.save(table_file)
+
+    assert list(table.iter_instructions()) == instructions
+    assert list(InstructionTable.load(table_file).iter_instructions()) == instructions
+    assert list(table.slice(1, 4).iter_instructions()) == instructions[1:4]
+    assert list(table.select(np.array([True, False, False, True, True])).iter_instructions()) == [
+        instructions[0], instructions[3], instructions[4]
+    ]
+
+
+def test_address_range_filter(table: InstructionTable) -> None:
+    mask = table.get_address_range_mask(ValidAddrRange("0x1001", "0x1009"))
+    selected = table.select(mask)
+
+    assert [inst.addr for inst in selected.iter_instructions()] == ["1001", "1004", "1009"]
+    assert next(selected.iter_instructions()).operands == ("%rsp", "%rbp")
+
+
+def test_first_operand_range_filter(table: InstructionTable) -> None:
+    mask = table.get_first_operand_range_mask(ValidAddrRange("0x2000", "0x2fff"))
+    assert mask.tolist() == [False, False, True, False, False, False]
+
+
+def test_mnemonic_histogram_and_mask(table: InstructionTable) -> None:
+    assert table.get_mnemonic_histogram() == {"ret": 2, "push": 1, "mov": 1, "call": 1, "xor": 1}
+    assert table.get_mnemonic_mask(["ret", "unknown"]).tolist() == [
+        False, False, False, True, False, True
+    ]
+
+
+def test_deref_side_table() -> None:
+    operands = ["[%rbp+-0x8]", "%rax", "[%rax+%rbx*8+0x10]", "[%rbp+%rbx*8]", "[%rax+%rbx*08]", "[%rbp]"]
+    instructions = [Instruction(addr=f"{0x1000 + index:x}", mnemonic="mov", operands=[operand])
+                    for index, operand in enumerate(operands)]
+    deref_table = InstructionTable.from_parsed_elements(instructions).get_deref_table()
+
+    assert deref_table.records[1] is None
+    assert deref_table.unparsed_ids == [4]
+    assert list(deref_table.term_counts) == [2, 0, 3, 2, 0, 1]
+
+    rbp = DerefTerm(frozenset({"%rbp"}))
+    patterns = [
+        DerefPattern((rbp,)),
+        DerefPattern((rbp, DerefTerm(frozenset({"-0x8"})))),
+        DerefPattern((rbp, DerefTerm(frozenset({"%rbx"}), frozenset({"8", "0x8"})))),
+        DerefPattern((DerefTerm(frozenset({"%rax"})), DerefTerm(frozenset({"%rbx"}), frozenset({"8"})),
+                      DerefTerm(frozenset({"0x10", "0x0x10"})))),
+    ]
+    for pattern in patterns:
+        expected = [record is not None and pattern.matches(record) for record in deref_table.records]
+        assert list(deref_table.get_mask(pattern)) == expected
+        assert sum(expected) == 1
+
+
+def test_slice_by_function(table: InstructionTable) -> None:
+    assert table.get_function_bounds() == {"main": (0, 4), "helper": (4, 6)}
+
+    helper = table.get_function("helper")
+
+    assert [inst.stringify() for inst in helper.iter_instructions()] == [
+        "2000::xor,%eax,%eax", "2002::ret,"
+    ]
+    assert helper.get_function_bounds() == {"helper": (0, 2)}
+
+
+def test_composable_producer_table(tmp_path: Path) -> None:
+    assembly_file = tmp_path / "input.s"
+    assembly_file.write_text(ASSEMBLY)
+
+    producer = ComposableProducer(disassembler=NullDisassembler(), parser=ObjdumpParserManual())
+    table = producer.process_file_to_table(str(assembly_file))
+
+    assert list(table.iter_instructions()) == get_instructions()
@@ -1,5 +1,8 @@
+from pathlib import Path
+
 import pytest
 from unittest.mock import patch, MagicMock
+from jasm.global_definitions import BinaryFileFormatNotSupported
 from jasm.stringify_asm.implementations.shell_disassembler import ShellDisassembler
 
 
@@ -45,7 +48,7 @@ def test_disassemble_success_log(
 @patch("jasm.stringify_asm.implementations.shell_disassembler.Path.exists", return_value=False)
 def test_disassemble_file_not_found(mock_exists: MagicMock, shell_disassembler: ShellDisassembler) -> None:
     input_file = "nonexistent/path"
-    with pytest.raises(AssertionError):
+    with pytest.raises(FileNotFoundError, match="does not exist"):
         shell_disassembler.disassemble(input_file)
 
 
@@ -74,3 +77,52 @@ def test_disassemble_general_error(
         shell_disassembler.disassemble(input_file)
     assert "General error" in str(exc_info.value)
     mock_error.assert_called_with("Error while disassembling file: %s", exc_info.value)
+
+
+# Streaming disassembly
+def test_disassemble_lines(tmp_path: Path) -> None:
+    input_file = tmp_path / "input"
+    input_file.write_text("first line\nsecond line\n")
+
+    lines = ShellDisassembler("cat", []).disassemble_lines(str(input_file))
+    assert list(lines) == ["first line", "second line"]
+
+
+def test_disassemble_lines_error(tmp_path: Path) -> None:
+    input_file = tmp_path / "input"
+    input_file.write_text("")
+
+    with pytest.raises(BinaryFileFormatNotSupported):
+        list(ShellDisassembler("false", []).disassemble_lines(str(input_file)))
+
+
+@patch("jasm.stringify_asm.implementations.shell_disassembler.Path.exists", return_value=False)
+def test_disassemble_lines_file_not_found(mock_exists: MagicMock, shell_disassembler: ShellDisassembler) -> None:
+    with pytest.raises(FileNotFoundError, match="does not exist"):
+        list(shell_disassembler.disassemble_lines("nonexistent/path"))
+
+
+def test_disassemble_lines_program_not_found(tmp_path: Path) -> None:
+    input_file = tmp_path / "input"
+    input_file.write_text("")
+
+    with pytest.raises(FileNotFoundError):
+        list(ShellDisassembler("fake_disassembler", []).disassemble_lines(str(input_file)))
+
+
+@patch("subprocess.Popen")
+def test_disassemble_lines_terminates_program_when_closed(
+    mock_popen: MagicMock, tmp_path: Path
+) -> None:
+    input_file = tmp_path / "input"
+    input_file.write_text("")
+    process = mock_popen.return_value
+    process.stdout = MagicMock()
+    process.stdout.__iter__.return_value = iter(["line\n", "another line\n"])
+
+    lines = ShellDisassembler("fake_disassembler", []).disassemble_lines(str(input_file))
+    assert next(lines) == "line"
+    lines.close()
+
+    process.terminate.assert_called_once()
+    process.wait.assert_called_once()
@@ -0,0 +1,99 @@
+import glob
+from pathlib import Path
+from random import Random
+from typing import List
+
+import pytest
+from conftest import RANDOM_MNEMONICS, get_regex_matched_strings, get_rule
+
+from jasm.automaton_matching import AutomatonMatcher, get_matched_string
+from jasm.global_definitions import (
+    ConsumerType,
+    InputFileType,
+    Instruction,
+    MatchConfig,
+    MatchingReturnMode,
+    MatchingSearchMode,
+    UnsupportedRuleError,
+)
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+from jasm.match import MasterOfPuppets
+
+
+def get_register_instructions() -> List[Instruction]:
+    """Instructions matching the register capture examples, or only differing in the captured registers"""
+
+    planted = [
+        ["add,1,%edi", "mov,%di,%edi", "jmp"],
+        ["add,1,%esi", "mov,%di,%edi", "jmp"],
+        ["add,1,%ecx", "mov,%cx,%ecx", "jmp"],
+        ["add,1,%ecx", "mov,%dx,%edx", "jmp"],
+        ["add,1,%rsp", "mov,%sp,%esp", "jmp"],
+        ["add,1,%bpl", "mov,%bp,%ebp", "jmp"],
+    ]
+    random = Random(0)
+    instructions: List[Instruction] = []
+    while len(instructions) < 3000:
+        sequence = random.choice(planted) if random.random() < 0.1 else [random.choice(RANDOM_MNEMONICS)]
+        for text in sequence:
+            mnemonic, *operands = text.split(",")
+            instructions.append(Instruction(addr=f"{0x1000 + len(instructions) * 4:x}", mnemonic=mnemonic,
+                                            operands=operands))
+    return instructions
+
+
+@pytest.mark.parametrize("pattern_file", sorted(glob.glob("tests/yamls/register_capture_group_example_*.yaml")))
+def test_automaton_matcher_binds_the_register_captures(pattern_file: str) -> None:
+    yaml_2_regex = Yaml2Regex(pattern_file)
+    automaton_matcher = AutomatonMatcher.from_rule_tree(yaml_2_regex.produce_rule_tree())
+
+    instructions = get_register_instructions()
+    expected = get_regex_matched_strings(yaml_2_regex.produce_regex(), instructions, MatchingSearchMode.all_finds)
+
+    spans = automaton_matcher.get_match_spans(instructions, MatchingSearchMode.all_finds)
+    assert expected
+    assert [get_matched_string(instructions, span) for span in spans] == expected
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        "pattern:\n  - 'j.*'\n",
+        "pattern:\n  - push:\n      - '&cc-2'\n  - pop:\n      - '&cc-2'\n",
+        "pattern:\n  - push:\n      - '&genreg-1'\n  - $not:\n      - pop:\n          - '&genreg-1.64'\n",
+        "pattern:\n  - $and_any_order:\n      - push:\n          - '&genreg-1'\n      - pop:\n"
+        "          - '&genreg-1.64'\n",
+        "pattern:\n  - push:\n      times:\n        min: 0\n        max: 2\n",
+    ],
+)
+def test_unsupported_rules(tmp_path: Path, rule: str) -> None:
+    rule_tree = get_rule(tmp_path, rule).produce_rule_tree()
+    with pytest.raises(UnsupportedRuleError):
+        AutomatonMatcher.from_rule_tree(rule_tree)
+
+
+@pytest.mark.parametrize(
+    "pattern_file, macros",
+    [
+        ("tests/yamls/9_calls.yaml", None),
+        ("tests/yamls/moonbounce_regex_matcher.yaml", ["tests/macros/jasm_macros.yaml"]),
+        # Operand captures are matched with the regex, register captures with the automaton
+        ("tests/yamls/capture_group_2_push_with_same_reg.yaml", None),
+        ("tests/yamls/register_capture_group_example_2.yaml", None),
+    ],
+)
+def test_automaton_consumer_results_are_the_complete_ones(pattern_file: str, macros: List[str]) -> None:
+    results = []
+    for consumer_type in (ConsumerType.complete, ConsumerType.automaton):
+        match_config = MatchConfig(
+            pattern_pathstr=pattern_file,
+            input_file="tests/assembly/moonbounce_malware_truncated_11518_lines.s",
+            input_file_type=InputFileType.assembly,
+            return_mode=MatchingReturnMode.matched_addrs_list,
+            matching_mode=MatchingSearchMode.all_finds,
+            macros=macros,
+            consumer_type=consumer_type,
+        )
+        results.append(MasterOfPuppets(match_config).perform_matching())
+
+    assert results[0] == results[1]
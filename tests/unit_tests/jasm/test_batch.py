@@ -0,0 +1,68 @@
+import io
+from pathlib import Path
+
+from jasm.batch import iter_input_files, match_files, read_null_separated_paths
+from jasm.global_definitions import InputFileType, MatchConfig, MatchingReturnMode, MatchingSearchMode
+from jasm.match import MasterOfPuppets
+
+
+def test_read_null_separated_paths() -> None:
+    stream = io.BytesIO(b"a.efi\0dir/b.bin\0\0c")
+    assert list(read_null_separated_paths(stream)) == ["a.efi", "dir/b.bin", "c"]
+
+
+def test_iter_input_files(tmp_path: Path) -> None:
+    (tmp_path / "sub").mkdir()
+    for name in ["a.efi", "b.bin", "sub/c.efi"]:
+        (tmp_path / name).write_text("")
+
+    files = list(
+        iter_input_files(
+            inputs=[str(tmp_path / "*.efi"), str(tmp_path)],
+            null_separated_stream=io.BytesIO(f"{tmp_path / 'b.bin'}\0extra.bin".encode()),
+        )
+    )
+
+    assert files == [
+        str(tmp_path / "a.efi"),
+        str(tmp_path / "b.bin"),
+        str(tmp_path / "sub" / "c.efi"),
+        "extra.bin",
+    ]
+
+
+def test_match_files_same_as_single_file_matching() -> None:
+    files = [str(path) for path in sorted(Path("tests/assembly").glob("*.s"))[:6]]
+
+    def build_match_config(input_file: str) -> MatchConfig:
+        return MatchConfig(
+            pattern_pathstr="tests/yamls/1_call_plain.yaml",
+            input_file=input_file,
+            input_file_type=InputFileType.assembly,
+            return_mode=MatchingReturnMode.matched_addrs_list,
+            matching_mode=MatchingSearchMode.all_finds,
+        )
+
+    master_of_puppets = MasterOfPuppets(match_config=build_match_config(""))
+    batch_results = list(
+        match_files(master_of_puppets, files + ["missing.s"], InputFileType.assembly)
+    )
+
+    for file, batch_result in zip(files, batch_results):
+        expected = MasterOfPuppets(match_config=build_match_config(file)).perform_matching()
+        assert batch_result.file == file
+        assert batch_result.matches == expected
+        assert batch_result.error is None
+
+    assert batch_results[-1].file == "missing.s"
+    assert batch_results[-1].error is not None
+
+
+def test_match_files_reports_missing_binaries() -> None:
+    master_of_puppets = MasterOfPuppets(
+        match_config=MatchConfig(pattern_pathstr="tests/yamls/1_call_plain.yaml", input_file="")
+    )
+    (batch_result,) = match_files(master_of_puppets, ["missing.bin"], InputFileType.binary)
+
+    assert batch_result.error is not None
+    assert "does not exist" in batch_result.error
@@ -0,0 +1,207 @@
+from typing import List, Optional
+
+import pytest
+
+from jasm.consumer import CompleteConsumer, MultiConsumer, StreamConsumer
+from jasm.global_definitions import IGNORE_INST_ADDR, Instruction, MatchingSearchMode
+from jasm.matched_observers import MatchedObserver
+
+CALL_THEN_RET = rf"{IGNORE_INST_ADDR}call,[^|]*\|{IGNORE_INST_ADDR}ret,[^|]*\|"
+OPTIONAL_NOP_OR_RET = rf"(?:{IGNORE_INST_ADDR}nop,[^|]*\|)?|{IGNORE_INST_ADDR}ret,[^|]*\|"
+
+
+def build_instructions(mnemonics: List[str]) -> List[Instruction]:
+    return [
+        Instruction(addr=f"{0x1000 + i:x}", mnemonic=mnemonic, operands=[])
+        for i, mnemonic in enumerate(mnemonics)
+    ]
+
+
+def run_stream_consumer(
+    mnemonics: List[str],
+    matching_mode: MatchingSearchMode,
+    window_size: int = 2,
+    regex_rule: str = CALL_THEN_RET,
+) -> MatchedObserver:
+    matched_observer = MatchedObserver()
+    consumer = StreamConsumer(
+        regex_rule=regex_rule,
+        matched_observer=matched_observer,
+        matching_mode=matching_mode,
+        return_only_address=True,
+        window_size=window_size,
+    )
+    for inst in build_instructions(mnemonics):
+        consumer.consume_instruction(inst)
+    consumer.finalize()
+    return matched_observer
+
+
+def test_stream_consumer_all_finds() -> None:
+    mnemonics = [
+        "nop", "call", "ret", "nop", "nop", "call", "ret", "call", "nop", "ret", "call", "ret"
+    ]
+    observer = run_stream_consumer(mnemonics, MatchingSearchMode.all_finds)
+    assert observer.addr_list == ["1001", "1005", "100a"]
+
+
+def test_stream_consumer_first_find_stops_after_match() -> None:
+    mnemonics = ["call", "ret", "call", "ret"]
+    observer = run_stream_consumer(mnemonics, MatchingSearchMode.first_find)
+    assert observer.addr_list == ["1000"]
+
+
+def test_stream_consumer_reports_match_before_finalize() -> None:
+    matched_observer = MatchedObserver()
+    consumer = StreamConsumer(
+        regex_rule=CALL_THEN_RET,
+        matched_observer=matched_observer,
+        matching_mode=MatchingSearchMode.first_find,
+        return_only_address=True,
+        window_size=2,
+    )
+    for inst in build_instructions(["call", "ret", "nop", "nop"]):
+        consumer.consume_instruction(inst)
+
+    assert matched_observer.addr_list == ["1000"]
+    assert consumer.done
+
+
+def test_stream_consumer_match_at_end_of_stream() -> None:
+    observer = run_stream_consumer(
+        ["nop"] * 9 + ["call", "ret"], MatchingSearchMode.all_finds, window_size=3
+    )
+    assert observer.addr_list == ["1009"]
+
+
+def test_stream_consumer_non_empty_match_after_an_empty_match() -> None:
+    observer = run_stream_consumer(
+        ["push", "ret", "nop", "ret"], MatchingSearchMode.all_finds, regex_rule=OPTIONAL_NOP_OR_RET
+    )
+    assert [addr for addr in observer.addr_list if addr] == ["1001", "1002", "1003"]
+
+
+def test_stream_consumer_invalid_window_size() -> None:
+    with pytest.raises(ValueError):
+        StreamConsumer(
+            regex_rule=CALL_THEN_RET,
+            matched_observer=MatchedObserver(),
+            matching_mode=MatchingSearchMode.all_finds,
+            return_only_address=True,
+            window_size=0,
+        )
+
+
+@pytest.mark.parametrize(
+    "matching_mode", [MatchingSearchMode.first_find, MatchingSearchMode.all_finds]
+)
+def test_complete_consumer_windowed_matching_same_as_whole_matching(
+    matching_mode: MatchingSearchMode
+) -> None:
+    mnemonics = ["nop", "call", "ret", "call"
+                 ] * 50 + ["ret", "call", "nop", "ret", "call", "ret"] * 20
+
+    results = []
+    for window_size in (None, 2):
+        matched_observer = MatchedObserver()
+        consumer = CompleteConsumer(
+            regex_rule=CALL_THEN_RET,
+            matched_observer=matched_observer,
+            matching_mode=matching_mode,
+            return_only_address=False,
+            window_size=window_size,
+            chunk_size=7,
+        )
+        for inst in build_instructions(mnemonics):
+            consumer.consume_instruction(inst)
+        consumer.finalize()
+        results.append(matched_observer.addr_list)
+
+    assert results[0]
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize(
+    "matching_mode", [MatchingSearchMode.first_find, MatchingSearchMode.all_finds]
+)
+def test_complete_consumer_parallel_matching_same_as_whole_matching(
+    matching_mode: MatchingSearchMode
+) -> None:
+    mnemonics = ["nop"] * 100 + ["nop", "call", "ret", "call"
+                                 ] * 50 + ["ret", "call", "nop", "ret", "call", "ret"] * 20
+
+    results = []
+    for window_size, jobs in ((None, 1), (2, 3)):
+        matched_observer = MatchedObserver()
+        consumer = CompleteConsumer(
+            regex_rule=CALL_THEN_RET,
+            matched_observer=matched_observer,
+            matching_mode=matching_mode,
+            return_only_address=False,
+            window_size=window_size,
+            chunk_size=8,
+            jobs=jobs,
+        )
+        for inst in build_instructions(mnemonics):
+            consumer.consume_instruction(inst)
+        consumer.finalize()
+        results.append(matched_observer.addr_list)
+
+    assert results[0]
+    assert results[0] == results[1]
+
+
+def test_complete_consumer_done_after_first_find() -> None:
+    consumer = CompleteConsumer(
+        regex_rule=CALL_THEN_RET,
+        matched_observer=MatchedObserver(),
+        matching_mode=MatchingSearchMode.first_find,
+        return_only_address=True,
+        window_size=2,
+        chunk_size=2,
+    )
+    for inst in build_instructions(["call", "ret"] + ["nop"] * 8):
+        consumer.consume_instruction(inst)
+
+    assert consumer.done
+
+
+def test_multi_consumer_done_when_every_consumer_is_done() -> None:
+    consumers = [
+        StreamConsumer(
+            regex_rule=CALL_THEN_RET,
+            matched_observer=MatchedObserver(),
+            matching_mode=matching_mode,
+            return_only_address=True,
+            window_size=2,
+        )
+        for matching_mode in (MatchingSearchMode.first_find, MatchingSearchMode.all_finds)
+    ]
+    multi_consumer = MultiConsumer(consumers)
+    for inst in build_instructions(["call", "ret", "nop", "nop"]):
+        multi_consumer.consume_instruction(inst)
+
+    assert consumers[0].done
+    assert not multi_consumer.done
+
+
+@pytest.mark.parametrize("window_size", [None, 2])
+def test_complete_consumer_skips_bounded_by_the_longest_instruction(window_size: Optional[int]) -> None:
+    instructions = build_instructions(["call", "ret", "nop"] * 10 + ["call", "ret"])
+    # Longer than every instruction matched before it
+    instructions[-2].operands = ["0x" + "a" * 2000]
+
+    matched_observer = MatchedObserver()
+    consumer = CompleteConsumer(
+        regex_rule=CALL_THEN_RET,
+        matched_observer=matched_observer,
+        matching_mode=MatchingSearchMode.all_finds,
+        return_only_address=True,
+        window_size=window_size,
+        chunk_size=7,
+    )
+    for inst in instructions:
+        consumer.consume_instruction(inst)
+    consumer.finalize()
+
+    assert matched_observer.addr_list == [f"{0x1000 + i:x}" for i in range(0, 31, 3)]
@@ -0,0 +1,39 @@
+import pytest
+
+from jasm.derefs import DerefPattern, DerefRecord, DerefTerm, get_deref_record
+from jasm.stringify_asm.implementations.gnu_objdump.asm_manual_parser_w_regex import normalize_operand
+
+
+@pytest.mark.parametrize(
+    "operand, expected",
+    [
+        ("(%rip)", DerefRecord("%rip")),
+        ("0x8(%rsp)", DerefRecord("%rsp", displacement="0x8")),
+        ("-0x8(%rbp)", DerefRecord("%rbp", displacement="-0x8")),
+        ("(%rax,%rbx,4)", DerefRecord("%rax", "%rbx", 4)),
+        ("0x0(%rax,%rax,1)", DerefRecord("%rax", "%rax", 1, "0x0")),
+        ("0x10(,%rbx,8)", DerefRecord("", "%rbx", 8, "0x10")),
+        ("*0x1dc59(%rip)", DerefRecord("%rip", displacement="*0x1dc59")),
+        ("%rax", None),
+        ("$0x8", None),
+    ],
+)
+def test_get_deref_record(operand: str, expected: DerefRecord) -> None:
+    assert get_deref_record(normalize_operand(operand)) == expected
+
+
+@pytest.mark.parametrize("operand", ["[%rax+%rbx*08]", "[%rax+0x8+0x10]", "[%rax+%rbx*4+0x8+0x10]", "[%rax+a*b*c]"])
+def test_fields_that_can_not_be_told_apart(operand: str) -> None:
+    assert get_deref_record(operand) is None
+
+
+def test_deref_pattern_compares_the_terms() -> None:
+    pattern = DerefPattern(
+        (DerefTerm(frozenset({"rbp", "%rbp"})), DerefTerm(frozenset({"%rbx"}), frozenset({"8", "0x8"})))
+    )
+
+    assert pattern.matches(DerefRecord("%rbp", "%rbx", 8))
+    assert not pattern.matches(DerefRecord("%rbp", "%rbx", 4))
+    assert not pattern.matches(DerefRecord("%rbp", "%rbx", 8, "0x10"))
+    # The index term is not a displacement
+    assert not pattern.matches(DerefRecord("%rbp", displacement="%rbx"))
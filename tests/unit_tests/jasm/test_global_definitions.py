@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+import pytest
+
+from jasm.global_definitions import Instruction, get_regex_generator_hash
+
+
+def test_instruction_stringify() -> None:
+    inst = Instruction(addr="1231", mnemonic="mov", operands=["%rsp", "%rbp"])
+
+    assert inst.address == 0x1231
+    assert inst.addr == "1231"
+    assert inst.operands == ("%rsp", "%rbp")
+    assert inst.stringify() == "1231::mov,%rsp,%rbp"
+
+
+@pytest.mark.parametrize("addr", ["00", "0004", "deadbeef", "DEADBEEF", "00aB"])
+def test_instruction_keeps_address_digits(addr: str) -> None:
+    inst = Instruction(addr=addr, mnemonic="ret", operands=[])
+
+    assert inst.addr == addr
+    assert inst.stringify() == f"{addr}::ret,"
+
+
+def test_instruction_keeps_uppercase_addresses() -> None:
+    inst = Instruction(addr="00AB", mnemonic="ret", operands=[])
+
+    assert inst.address == 0xAB
+    assert inst.addr_text == "00AB"
+    assert inst != Instruction(addr="00ab", mnemonic="ret", operands=[])
+    assert Instruction(addr="00ab", mnemonic="ret", operands=[]).addr_text is None
+
+
+def test_instruction_from_integer_address() -> None:
+    assert Instruction(addr=0x1000, mnemonic="nop", operands=[]).stringify() == "1000::nop,"
+
+
+def test_instruction_strings_are_interned() -> None:
+    first = Instruction(addr="1", mnemonic="".join(["p", "ush"]), operands=["".join(["%r", "bp"])])
+    second = Instruction(addr="2", mnemonic="push", operands=["%rbp"])
+
+    assert first.mnemonic is second.mnemonic
+    assert first.operands[0] is second.operands[0]
+
+
+def test_instruction_has_no_dict() -> None:
+    inst = Instruction(addr="1", mnemonic="nop", operands=[])
+
+    assert not hasattr(inst, "__dict__")
+    assert inst == Instruction(addr="1", mnemonic="nop", operands=())
+    assert inst != Instruction(addr="01", mnemonic="nop", operands=())
+
+
+def test_regex_generator_hash_depends_on_the_sources() -> None:
+    generator_hash = get_regex_generator_hash()
+    assert generator_hash == get_regex_generator_hash()
+
+    get_regex_generator_hash.cache_clear()
+    with patch("jasm.global_definitions.REGEX_GENERATOR_SOURCES", ("derefs.py",)):
+        assert get_regex_generator_hash() != generator_hash
+    get_regex_generator_hash.cache_clear()
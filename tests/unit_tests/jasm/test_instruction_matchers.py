@@ -0,0 +1,93 @@
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pytest
+from conftest import get_random_instructions, get_regex_matched_strings, get_rule
+
+from jasm.automaton_matching import AutomatonMatcher, get_matched_string
+from jasm.global_definitions import Instruction, MatchingSearchMode
+from jasm.jasm_regex.tree_generators.pattern_node_abstract import PatternNode
+
+# Rules every instruction-level matcher supports
+MATCHER_RULES = [
+    "pattern:\n  - push\n  - mov\n",
+    "pattern:\n  - mov:\n      - '%rbp'\n  - ret\n",
+    "pattern:\n  - push\n  - mov:\n      times:\n        min: 0\n        max: 3\n  - call\n",
+    "pattern:\n  - $or:\n      - push\n      - pop\n    times:\n      min: 2\n      max: 4\n  - ret\n",
+    "pattern:\n  - call\n  - $not:\n      - call\n  - $not:\n      - $or:\n          - ret\n          - nop\n",
+    "pattern:\n  - add:\n      - '%rax'\n      - 10h\n",
+    "pattern:\n  - mov:\n      - $or:\n          - '%rax'\n          - rex\n      - '%rbx'\n",
+    "pattern:\n  - nop\n  - '[^, ]{0,1000}':\n      times: 3\n  - ret\n",
+    "config:\n  mnemonics-full-match: true\n  operands-full-match: true\npattern:\n  - mov:\n      - '%rax'\n",
+    "config:\n  mnemonics-full-match: true\npattern:\n  - mov\n  - $and:\n      - pop\n      - push\n",
+    "pattern:\n  - $not:\n      - push\n  - ret\n",
+    "pattern:\n  - mov:\n      - $deref:\n          main_reg: rbp\n          constant_offset: '-0x8'\n  - push\n",
+    "pattern:\n  - mov:\n      - $deref:\n          main_reg:\n            - $or:\n                - rsp\n"
+    "                - rbp\n          register_multiplier: rbx\n          constant_multiplier: 8\n",
+]
+
+# Rules the mask matcher does not support
+AUTOMATON_RULES = [
+    "pattern:\n  - mov:\n      - 10h\n      - '%rax'\n",
+    "pattern:\n  - $not:\n      - $and:\n          - call\n          - ret\n    times: 2\n  - nop\n",
+    "pattern:\n  - $and_any_order:\n      - push\n      - ret\n      - nop\n",
+    "pattern:\n  - $and:\n      - mov\n      - $not:\n          - call\n    times: 2\n",
+    "pattern:\n  - call\n  - $and:\n      - pop\n      - $or:\n          - ret\n          - mov\n"
+    "    times:\n      min: 1\n      max: 3\n",
+    "pattern:\n  - $or:\n      - $and:\n          - push\n          - pop\n"
+    "      - $and_any_order:\n          - mov\n          - add\n",
+    "pattern:\n  - $and_any_order:\n      - push\n      - pop\n      - mov\n      - add\n      - call\n"
+    "      - $or:\n          - ret\n          - nop\n    times:\n      min: 1\n      max: 2\n",
+    # The orders of children without a fixed length are tried as every permutation
+    "pattern:\n  - $and_any_order:\n      - push\n      - mov:\n          times:\n            min: 1\n"
+    "            max: 2\n      - call\n",
+    # Register captures
+    "pattern:\n  - push:\n      - '&genreg-1'\n  - mov:\n      - '&genreg-1.64'\n",
+    "pattern:\n  - push:\n      - '&genreg-1'\n  - $or:\n      - ret\n      - nop\n"
+    "    times:\n      min: 0\n      max: 2\n  - mov:\n      - '&genreg-1.64'\n",
+]
+
+
+def get_mask_matched_strings(
+    rule_tree: PatternNode, instructions: List[Instruction], matching_mode: MatchingSearchMode
+) -> List[str]:
+    pytest.importorskip("numpy")
+    # pylint: disable=import-outside-toplevel
+    from jasm.mask_matching import MaskMatcher
+    from jasm.stringify_asm.implementations.instruction_table import InstructionTable
+
+    table = InstructionTable.from_parsed_elements(instructions)
+    spans = MaskMatcher.from_rule_tree(rule_tree).get_match_spans(table, matching_mode)
+    return ["".join(inst.stringify() + ",|" for inst in instructions[start:end]) for start, end in spans]
+
+
+def get_automaton_matched_strings(
+    rule_tree: PatternNode, instructions: List[Instruction], matching_mode: MatchingSearchMode
+) -> List[str]:
+    spans = AutomatonMatcher.from_rule_tree(rule_tree).get_match_spans(instructions, matching_mode)
+    return [get_matched_string(instructions, span) for span in spans]
+
+
+MATCHERS: Dict[str, Callable[[PatternNode, List[Instruction], MatchingSearchMode], List[str]]] = {
+    "mask": get_mask_matched_strings,
+    "automaton": get_automaton_matched_strings,
+}
+
+
+@pytest.mark.parametrize(
+    "matcher, rule",
+    [(matcher, rule) for matcher in MATCHERS for rule in MATCHER_RULES]
+    + [("automaton", rule) for rule in AUTOMATON_RULES],
+)
+@pytest.mark.parametrize("matching_mode", list(MatchingSearchMode))
+def test_matcher_finds_the_regex_matches(
+    tmp_path: Path, matcher: str, rule: str, matching_mode: MatchingSearchMode
+) -> None:
+    yaml_2_regex = get_rule(tmp_path, rule)
+    instructions = get_random_instructions()
+    expected = get_regex_matched_strings(yaml_2_regex.produce_regex(), instructions, matching_mode)
+
+    found = MATCHERS[matcher](yaml_2_regex.produce_rule_tree(), instructions, matching_mode)
+
+    assert expected
+    assert found == expected
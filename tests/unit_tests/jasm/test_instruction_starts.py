@@ -0,0 +1,77 @@
+from typing import List
+
+import pytest
+import regex
+
+from jasm.global_definitions import IGNORE_INST_ADDR
+from jasm.instruction_starts import (
+    finditer_at_instruction_starts,
+    get_next_instruction_start,
+    search_at_instruction_starts,
+)
+
+CALL_THEN_RET = rf"{IGNORE_INST_ADDR}call,[^|]*\|{IGNORE_INST_ADDR}ret,[^|]*\|"
+OPTIONAL_NOP_OR_RET = rf"(?:{IGNORE_INST_ADDR}nop,[^|]*\|)?|{IGNORE_INST_ADDR}ret,[^|]*\|"
+NOT_CALL_THEN_RET = rf"(?:(?!{IGNORE_INST_ADDR}call,)[^|]*\|){IGNORE_INST_ADDR}ret,[^|]*\|"
+
+
+def build_instructions_string(mnemonics: List[str]) -> str:
+    return "".join(f"{0x1000 + i:x}::{mnemonic},|" for i, mnemonic in enumerate(mnemonics))
+
+
+def test_same_matches_as_finditer_for_rules_starting_at_the_address() -> None:
+    text = build_instructions_string(["nop", "call", "ret", "call", "call", "ret", "ret"] * 10)
+    pattern = regex.compile(CALL_THEN_RET)
+
+    expected = [(m.start(), m.group(0)) for m in pattern.finditer(text)]
+    found = [(m.start(), m.group(0)) for m in finditer_at_instruction_starts(pattern, text)]
+
+    assert expected
+    assert found == expected
+
+
+def test_non_empty_match_after_an_empty_match() -> None:
+    text = build_instructions_string(["push", "ret", "nop", "ret"])
+    # The optional nop matches empty at every instruction start but the ones of the nops
+    pattern = regex.compile(OPTIONAL_NOP_OR_RET)
+
+    expected = [m.group(0) for m in pattern.finditer(text) if m.group(0)]
+    found = [m.group(0) for m in finditer_at_instruction_starts(pattern, text)]
+
+    assert expected == ["1001::ret,|", "1002::nop,|", "1003::ret,|"]
+    assert [match for match in found if match] == expected
+    assert found == ["", "", "1001::ret,|", "1002::nop,|", "", "1003::ret,|"]
+
+
+def test_matches_do_not_start_in_the_middle_of_an_instruction() -> None:
+    text = build_instructions_string(["nop", "call", "ret", "push", "ret"])
+    pattern = regex.compile(NOT_CALL_THEN_RET)
+
+    # The negative lookahead succeeds after the address of the call
+    assert pattern.search(text).group(0) == "::call,|1002::ret,|"
+
+    found = [m.group(0) for m in finditer_at_instruction_starts(pattern, text)]
+    assert found == ["1003::push,|1004::ret,|"]
+
+
+def test_search_from_the_middle_of_an_instruction() -> None:
+    text = build_instructions_string(["call", "ret", "call", "ret"])
+    pattern = regex.compile(CALL_THEN_RET)
+
+    assert get_next_instruction_start(text, 3, len(text)) == text.index("1001")
+    assert search_at_instruction_starts(pattern, text, 3).start() == text.index("1002")
+    assert search_at_instruction_starts(pattern, text, 3, text.index("1003")) is None
+
+
+def test_encoded_instructions() -> None:
+    text = build_instructions_string(["nop", "call", "ret"]).encode("utf-8")
+    match_result = search_at_instruction_starts(regex.compile(CALL_THEN_RET.encode("utf-8")), text)
+
+    assert match_result is not None
+    assert match_result.group(0) == b"1001::call,|1002::ret,|"
+
+
+def test_timeout() -> None:
+    text = build_instructions_string(["nop"] * 10)
+    with pytest.raises(TimeoutError):
+        list(finditer_at_instruction_starts(regex.compile(CALL_THEN_RET), text, timeout=0))
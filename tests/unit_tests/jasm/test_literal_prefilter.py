@@ -0,0 +1,92 @@
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+import regex
+
+from jasm.consumer import CompleteConsumer
+from jasm.global_definitions import IGNORE_INST_ADDR, Instruction, MatchingSearchMode
+from jasm.instruction_starts import finditer_at_instruction_starts
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+from jasm.literal_prefilter import LiteralPrefilter
+from jasm.matched_observers import MatchedObserver
+from jasm.rule_artifact import RuleArtifact
+
+CALL_THEN_RET = rf"{IGNORE_INST_ADDR}call,[^|]*\|{IGNORE_INST_ADDR}ret,[^|]*\|"
+CALL_THEN_RET_PREFILTER = LiteralPrefilter([frozenset(["call"]), frozenset(["ret"])], max_span=1)
+
+
+def build_instructions_string(mnemonics: List[str]) -> str:
+    return "".join(f"{0x1000 + i:x}::{mnemonic},|" for i, mnemonic in enumerate(mnemonics))
+
+
+def test_no_ranges_when_a_literal_is_missing() -> None:
+    text = build_instructions_string(["nop", "call", "nop"] * 20)
+    assert CALL_THEN_RET_PREFILTER.get_start_ranges(text) == []
+
+
+def test_ranges_cover_the_max_span_before_the_hits() -> None:
+    text = build_instructions_string(["nop"] * 10 + ["call", "ret"] + ["nop"] * 10 + ["call"])
+    ranges = CALL_THEN_RET_PREFILTER.get_start_ranges(text)
+
+    # `ret` is the least frequent literal, the match can start at its instruction or the one before
+    assert ranges == [(text.index("100a::"), text.index("100b::"))]
+
+    pattern = regex.compile(CALL_THEN_RET)
+    found = [m.start() for m in finditer_at_instruction_starts(pattern, text, start_ranges=ranges)]
+    assert found == [text.index("100a::")]
+
+
+def test_no_ranges_when_there_are_too_many_hits() -> None:
+    text = build_instructions_string(["call", "ret"] * 20)
+    assert CALL_THEN_RET_PREFILTER.get_start_ranges(text) is None
+
+
+@pytest.mark.parametrize(
+    "rule, has_prefilter",
+    [
+        ("pattern:\n  - call\n  - ret\n", True),
+        # The name can match across instructions, so the span is not bounded
+        ("pattern:\n  - call\n  - 'j.{0,1000}'\n", False),
+    ],
+)
+def test_no_prefilter_when_the_span_is_unbounded(tmp_path: Path, rule: str, has_prefilter: bool) -> None:
+    pattern_file = tmp_path / "rule.yaml"
+    pattern_file.write_text(rule, encoding="utf-8")
+    rule_tree = Yaml2Regex(str(pattern_file)).produce_rule_tree()
+    assert (LiteralPrefilter.from_rule_tree(rule_tree) is not None) == has_prefilter
+    assert (RuleArtifact.from_pattern_file(str(pattern_file)).get_prefilter() is not None) == has_prefilter
+
+
+def test_encoded_instructions() -> None:
+    text = build_instructions_string(["nop"] * 10 + ["call", "ret"]).encode("utf-8")
+    assert CALL_THEN_RET_PREFILTER.get_start_ranges(text) == [
+        (text.index(b"1009::"), text.index(b"100a::"))
+    ]
+
+
+def test_prefilter_needs_literals() -> None:
+    with pytest.raises(ValueError):
+        LiteralPrefilter([], max_span=1)
+
+
+@pytest.mark.parametrize("prefilter", [None, CALL_THEN_RET_PREFILTER])
+@pytest.mark.parametrize("window_size", [None, 2])
+def test_complete_consumer_with_prefilter(
+    prefilter: Optional[LiteralPrefilter], window_size: Optional[int]
+) -> None:
+    mnemonics = ["nop"] * 30 + ["call", "ret"] + ["nop"] * 40 + ["call", "nop", "ret", "call", "ret"]
+    matched_observer = MatchedObserver()
+    consumer = CompleteConsumer(
+        regex_rule=CALL_THEN_RET,
+        matched_observer=matched_observer,
+        matching_mode=MatchingSearchMode.all_finds,
+        return_only_address=True,
+        window_size=window_size,
+        prefilter=prefilter,
+    )
+    for i, mnemonic in enumerate(mnemonics):
+        consumer.consume_instruction(Instruction(addr=f"{0x1000 + i:x}", mnemonic=mnemonic, operands=[]))
+    consumer.finalize()
+
+    assert matched_observer.addr_list == ["101e", "104b"]
@@ -0,0 +1,65 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+from conftest import get_rule
+
+from jasm.global_definitions import (
+    ConsumerType,
+    InputFileType,
+    MatchConfig,
+    MatchingReturnMode,
+    MatchingSearchMode,
+    UnsupportedRuleError,
+)
+from jasm.match import MasterOfPuppets
+
+pytest.importorskip("numpy")
+
+# pylint: disable-next=wrong-import-position
+from jasm.mask_matching import MaskMatcher
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        "pattern:\n  - push:\n      times:\n        min: 0\n        max: 2\n  - ret\n",
+        "pattern:\n  - $and_any_order:\n      - push\n      - ret\n",
+        "pattern:\n  - $and:\n      - push\n      - ret\n    times: 2\n",
+        "pattern:\n  - mov:\n      - 10h\n      - '%rax'\n",
+        "pattern:\n  - 'j.*'\n",
+        "pattern:\n  - push:\n      - '&cc-2'\n  - pop:\n      - '&cc-2'\n",
+        "pattern:\n  - mov:\n      - $deref:\n          main_reg: 'r.x'\n",
+    ],
+)
+def test_unsupported_rules(tmp_path: Path, rule: str) -> None:
+    rule_tree = get_rule(tmp_path, rule).produce_rule_tree()
+    with pytest.raises(UnsupportedRuleError):
+        MaskMatcher.from_rule_tree(rule_tree)
+
+
+@pytest.mark.parametrize(
+    "pattern_file, macros",
+    [
+        ("tests/yamls/9_calls.yaml", None),
+        ("tests/yamls/moonbounce_regex_matcher.yaml", ["tests/macros/jasm_macros.yaml"]),
+        # Capture groups are matched with the regex
+        ("tests/yamls/capture_group_2_push_with_same_reg.yaml", None),
+        ("tests/yamls/logic_operators_inside_deref2.yaml", None),
+    ],
+)
+def test_mask_consumer_results_are_the_complete_ones(pattern_file: str, macros: List[str]) -> None:
+    results = []
+    for consumer_type in (ConsumerType.complete, ConsumerType.mask):
+        match_config = MatchConfig(
+            pattern_pathstr=pattern_file,
+            input_file="tests/assembly/moonbounce_malware_truncated_11518_lines.s",
+            input_file_type=InputFileType.assembly,
+            return_mode=MatchingReturnMode.matched_addrs_list,
+            matching_mode=MatchingSearchMode.all_finds,
+            macros=macros,
+            consumer_type=consumer_type,
+        )
+        results.append(MasterOfPuppets(match_config).perform_matching())
+
+    assert results[0] == results[1]
@@ -0,0 +1,76 @@
+from typing import List, Optional
+
+import pytest
+import regex
+
+from jasm.global_definitions import IGNORE_INST_ADDR
+from jasm.parallel_matching import ParallelMatcher
+
+# A match spans two instructions, so consecutive matches overlap the chunk seams
+NOP_THEN_ANY = rf"{IGNORE_INST_ADDR}nop,[^|]*\|[^|]*\|"
+
+
+def build_stringified_instructions(mnemonics: List[str]) -> List[str]:
+    return [f"{0x1000 + i:x}::{mnemonic},|" for i, mnemonic in enumerate(mnemonics)]
+
+
+def test_split_in_chunks_on_instruction_boundaries() -> None:
+    instructions = build_stringified_instructions(["nop", "ret"] * 10)
+    chunks = ParallelMatcher(
+        regex_rule=NOP_THEN_ANY, window_size=1, jobs=2, timeout=60, min_chunk_size=4
+    ).split_in_chunks(instructions)
+
+    assert len(chunks) == 5
+    for chunk in chunks:
+        assert chunk.text.endswith("|")
+        assert chunk.text[chunk.starts_limit - 1] == "|"
+
+    assert chunks[1].offset == chunks[0].starts_limit
+    assert chunks[0].text == "".join(instructions[:5])
+
+
+@pytest.mark.parametrize("jobs", [1, 2, 4])
+@pytest.mark.parametrize("chunk_size", [4, 5, 7])
+def test_find_all_same_as_serial(jobs: int, chunk_size: int) -> None:
+    instructions = build_stringified_instructions(["nop", "nop", "ret", "nop"] * 30 + ["nop"] * 7)
+    whole_text = "".join(instructions)
+    serial_matches = [
+        (m.start(), m.end(), m.group(0)) for m in regex.finditer(NOP_THEN_ANY, whole_text)
+    ]
+
+    parallel_matcher = ParallelMatcher(
+        regex_rule=NOP_THEN_ANY, window_size=2, jobs=jobs, timeout=60, min_chunk_size=chunk_size
+    )
+    parallel_matches = [
+        tuple(chunk_match) for chunk_match in parallel_matcher.find_all(instructions)
+    ]
+
+    assert parallel_matches == serial_matches
+
+
+def test_invalid_jobs() -> None:
+    with pytest.raises(ValueError):
+        ParallelMatcher(regex_rule=NOP_THEN_ANY, window_size=1, jobs=0, timeout=60)
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+@pytest.mark.parametrize("match_at", [0, 13, 57, None])
+def test_find_first_same_as_serial(jobs: int, match_at: Optional[int]) -> None:
+    mnemonics = ["ret"] * 60
+    if match_at is not None:
+        mnemonics[match_at] = "nop"
+        # A later match, that must not be returned
+        mnemonics[match_at + 2] = "nop"
+
+    instructions = build_stringified_instructions(mnemonics)
+    serial_match = regex.search(NOP_THEN_ANY, "".join(instructions))
+
+    parallel_matcher = ParallelMatcher(
+        regex_rule=NOP_THEN_ANY, window_size=2, jobs=jobs, timeout=60, min_chunk_size=8
+    )
+    first_match = parallel_matcher.find_first(instructions)
+
+    if serial_match is None:
+        assert first_match is None
+    else:
+        assert first_match == (serial_match.start(), serial_match.end(), serial_match.group(0))
@@ -0,0 +1,21 @@
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from jasm.parse_arguments import parse_args_from_console
+
+
+@pytest.mark.parametrize("consumer_flags", [["--mask", "--automaton"], ["--stream", "--mask"], ["--automaton", "--stream"]])
+def test_consumers_are_mutually_exclusive(consumer_flags: list[str]) -> None:
+    argv = ["jasm", "-p", "rule.yaml", "-s", "input.s", *consumer_flags]
+    with patch.object(sys, "argv", argv), pytest.raises(SystemExit):
+        parse_args_from_console()
+
+
+def test_single_consumer() -> None:
+    with patch.object(sys, "argv", ["jasm", "-p", "rule.yaml", "-s", "input.s", "--automaton"]):
+        args = parse_args_from_console()
+
+    assert args.automaton
+    assert not args.mask and not args.stream
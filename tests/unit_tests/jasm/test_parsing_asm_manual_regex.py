@@ -1,5 +1,15 @@
-from jasm.global_definitions import Instruction
-from jasm.stringify_asm.implementations.gnu_objdump.asm_manual_parser_w_regex import LineParser
+import pytest
+
+from jasm.derefs import DerefRecord
+from jasm.global_definitions import Instruction, RegisterCaptureSuffixs
+from jasm.registers import RegisterAccess, RegisterFamily
+from jasm.stringify_asm.implementations.gnu_objdump.asm_manual_parser_w_regex import (
+    LineParser,
+    OperandsParser,
+    get_cache_hit_rate,
+    get_operands_cache_info,
+    normalize_operand,
+)
 
 
 def test_lineparser_parse() -> None:
@@ -8,7 +18,7 @@ def test_lineparser_parse() -> None:
 
     assert isinstance(parsed_inst, Instruction)
     operands = parsed_inst.operands
-    assert operands == ["%rsp", "%rbp"]
+    assert operands == ("%rsp", "%rbp")
 
 
 def test_get_splitted_operands() -> None:
@@ -17,3 +27,80 @@ def test_get_splitted_operands() -> None:
     assert LineParser.get_splitted_operands("%rsp") == ["%rsp"]
 
     assert LineParser.get_splitted_operands("0x0(%rax,%rax,1)") == ["0x0(%rax,%rax,1)"]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "   1231:\t48 89 e5                \tmov    \t%rsp,%rbp  ",
+        "   1234:\tc3                   \tret",
+        "   1235:\t66 2e 0f 1f 84 00 00 \tdata16 cs nopw 0x0(%rax,%rax,1)",
+        "   123c:\t00 00 00 ",
+        "   123f:\t(bad)  ",
+        "   1240:\tff                   \t(bad)",
+        "0000000000001000 <main>:",
+        "Disassembly of section .text:",
+        "test:     file format elf64-x86-64",
+        "\t...",
+        "",
+    ],
+)
+def test_lineparser_parse_same_as_parse_sequentially(line: str) -> None:
+    assert LineParser(line).parse() == LineParser(line).parse_sequentially()
+
+
+def test_lineparser_parse_same_as_parse_sequentially_on_file() -> None:
+    assembly_file = "tests/assembly/moonbounce_malware_truncated_11518_lines.s"
+    with open(assembly_file, "r", encoding="utf-8") as f:
+        lines = f.read().split("\n")
+
+    assert [LineParser(line).parse() for line in lines] == [
+        LineParser(line).parse_sequentially() for line in lines
+    ]
+
+
+@pytest.mark.parametrize(
+    "operand",
+    [
+        "%rsp", "$0x8", "0x8(%rsp)", "0x0(%rax,%rax,1)", "(%rip)", "(%rax,%rbx,4)", "<main+0x10>",
+        "jmp"
+    ],
+)
+def test_normalize_operand_same_as_uncached(operand: str) -> None:
+    # pylint: disable-next=protected-access
+    expected = OperandsParser._process_operand_elem(operand)
+
+    assert normalize_operand(operand) == expected
+    assert normalize_operand(operand) == expected
+
+
+def test_operands_parser_annotates_the_registers() -> None:
+    operands_parser = OperandsParser(["%eax", "0x8(%rsp)", "%sil"], annotate_registers=True)
+
+    assert operands_parser.parse() == ["%eax", "[%rsp+0x8]", "%sil"]
+    assert operands_parser.register_accesses == [
+        RegisterAccess(RegisterFamily.A, RegisterCaptureSuffixs.SUFFIX_32),
+        None,
+        RegisterAccess(RegisterFamily.SI, RegisterCaptureSuffixs.SUFFIX_8L),
+    ]
+    assert not OperandsParser(["%eax"]).register_accesses
+
+
+def test_operands_parser_annotates_the_derefs() -> None:
+    operands_parser = OperandsParser(["%eax", "0x8(%rsp,%rbx,4)"], annotate_derefs=True)
+
+    assert operands_parser.parse() == ["%eax", "[%rsp+%rbx*4+0x8]"]
+    assert operands_parser.deref_records == [None, DerefRecord("%rsp", "%rbx", 4, "0x8")]
+    assert not OperandsParser(["0x8(%rsp)"]).deref_records
+
+
+def test_operands_cache_counts_hits() -> None:
+    line = "   1231:\t48 89 e5                \tmov    \t%rsp,%rbp  "
+    LineParser(line).parse()
+    hits_before = get_operands_cache_info()["normalize_operand"].hits
+
+    LineParser(line).parse()
+
+    cache_info = get_operands_cache_info()["normalize_operand"]
+    assert cache_info.hits == hits_before + 2
+    assert 0.0 < get_cache_hit_rate(cache_info) <= 1.0
@@ -0,0 +1,73 @@
+import pytest
+import regex
+
+from jasm.global_definitions import Instruction, RegisterCapturePrefix, RegisterCaptureSuffixs
+from jasm.registers import (
+    CAPTURED_VALUES,
+    RegisterAccess,
+    RegisterFamily,
+    RegisterIndex,
+    get_capture_prefix,
+    get_register_access,
+)
+
+# Capture group of every register capture reference, and its 32 bits register for a captured value
+CAPTURE_GROUPS = {
+    RegisterCapturePrefix.genreg: ("[a-d]", "%e{}x"),
+    RegisterCapturePrefix.indreg: ("[sd]", "%e{}i"),
+    RegisterCapturePrefix.stackreg: ("sp", "%e{}"),
+    RegisterCapturePrefix.basereg: ("bp", "%e{}"),
+}
+
+
+@pytest.mark.parametrize(
+    "operand, expected",
+    [
+        ("%rax", RegisterAccess(RegisterFamily.A, RegisterCaptureSuffixs.SUFFIX_64)),
+        ("%ah", RegisterAccess(RegisterFamily.A, RegisterCaptureSuffixs.SUFFIX_8H)),
+        ("%dl", RegisterAccess(RegisterFamily.D, RegisterCaptureSuffixs.SUFFIX_8L)),
+        ("%esi", RegisterAccess(RegisterFamily.SI, RegisterCaptureSuffixs.SUFFIX_32)),
+        ("%dil", RegisterAccess(RegisterFamily.DI, RegisterCaptureSuffixs.SUFFIX_8L)),
+        ("%sp", RegisterAccess(RegisterFamily.SP, RegisterCaptureSuffixs.SUFFIX_16)),
+        ("%bpl", RegisterAccess(RegisterFamily.BP, RegisterCaptureSuffixs.SUFFIX_8L)),
+        ("%r10d", RegisterAccess(RegisterFamily.R10, RegisterCaptureSuffixs.SUFFIX_32)),
+        ("rip", RegisterAccess(RegisterFamily.IP, RegisterCaptureSuffixs.SUFFIX_64)),
+        ("0x8", None),
+        ("[%rax+%rbx*1]", None),
+        ("%xmm0", None),
+    ],
+)
+def test_get_register_access(operand: str, expected: RegisterAccess) -> None:
+    assert get_register_access(operand) == expected
+
+
+@pytest.mark.parametrize("prefix", list(RegisterCapturePrefix))
+def test_captured_values_are_the_ones_of_the_capture_groups(prefix: RegisterCapturePrefix) -> None:
+    capture_group, register_32 = CAPTURE_GROUPS[prefix]
+    for family, value in CAPTURED_VALUES[prefix].items():
+        assert regex.fullmatch(capture_group, value)
+        assert get_register_access(register_32.format(value)) == RegisterAccess(
+            family, RegisterCaptureSuffixs.SUFFIX_32
+        )
+
+
+def test_get_capture_prefix() -> None:
+    assert get_capture_prefix("&genreg-1.32") == RegisterCapturePrefix.genreg
+    assert get_capture_prefix("&stackreg-2") == RegisterCapturePrefix.stackreg
+    with pytest.raises(ValueError):
+        get_capture_prefix("&cc-1")
+
+
+def test_register_index_ignores_the_widths() -> None:
+    instructions = [
+        Instruction(addr="1000", mnemonic="mov", operands=["%eax", "%rbx"]),
+        Instruction(addr="1004", mnemonic="test", operands=["%al", "%al"]),
+        Instruction(addr="1008", mnemonic="mov", operands=["0x8", "[%rsp+0x8]"]),
+    ]
+    register_index = RegisterIndex(instructions)
+
+    assert register_index.has_family(0, RegisterFamily.A)
+    assert register_index.has_family(0, RegisterFamily.B)
+    assert register_index.has_family(1, RegisterFamily.A)
+    assert not register_index.has_family(1, RegisterFamily.B)
+    assert register_index.family_masks[2] == 0
@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from jasm.global_definitions import DisassStyle, JASMConfig, PartialMatchingConfig
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+from jasm.rule_artifact import RuleArtifact, get_artifact_path, is_rule_artifact, main
+
+RULE = """
+config:
+  mnemonics-full-match: true
+  style: intel
+  valid_addr_range:
+    min: "0x1000"
+    max: "0x2000"
+  sections:
+    - .text
+pattern:
+  - push:
+      - '&cc-1'
+  - pop:
+      - '&cc-1'
+"""
+
+
+def write_rule(tmp_path: Path) -> str:
+    pattern_file = tmp_path / "rule.yaml"
+    pattern_file.write_text(RULE, encoding="utf-8")
+    return str(pattern_file)
+
+
+def test_artifact_round_trip(tmp_path: Path) -> None:
+    pattern_pathstr = write_rule(tmp_path)
+    artifact = RuleArtifact.from_pattern_file(pattern_pathstr)
+    artifact.save(get_artifact_path(pattern_pathstr))
+
+    loaded = RuleArtifact.load(get_artifact_path(pattern_pathstr))
+
+    assert loaded == artifact
+    assert loaded.regex_rule == Yaml2Regex(pattern_pathstr).produce_regex()
+    assert loaded.capture_groups >= 1
+    assert loaded.get_prefilter() is not None
+
+
+def test_artifact_restores_the_configuration(tmp_path: Path) -> None:
+    artifact = RuleArtifact.from_pattern_file(write_rule(tmp_path))
+    JASMConfig.get_instance().load_config({})
+
+    info = artifact.load_config()
+
+    assert info[PartialMatchingConfig.MnemonicsFullMatch] is True
+    assert info[PartialMatchingConfig.OperandsFullMatch] is False
+    assert info["assembly_style"] == DisassStyle.intel
+    assert (info["valid_addr_range"].min.hex, info["valid_addr_range"].max.hex) == (0x1000, 0x2000)
+    assert info["sections"] == [".text"]
+
+
+@pytest.mark.parametrize(
+    "field, value", [("format_version", 0), ("jasm_version", "0.0.0"), ("generator_hash", "0" * 64)]
+)
+def test_artifacts_of_other_versions_are_rejected(tmp_path: Path, field: str, value: object) -> None:
+    artifact_path = tmp_path / "rule.jasmc"
+    RuleArtifact.from_pattern_file(write_rule(tmp_path)).save(artifact_path)
+    contents = json.loads(artifact_path.read_text(encoding="utf-8"))
+    contents[field] = value
+    artifact_path.write_text(json.dumps(contents), encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        RuleArtifact.load(artifact_path)
+
+
+def test_compile_main(tmp_path: Path) -> None:
+    pattern_pathstr = write_rule(tmp_path)
+    output = tmp_path / "out.jasmc"
+
+    main([pattern_pathstr, "-o", str(output)])
+
+    assert is_rule_artifact(str(output))
+    assert RuleArtifact.load(output).regex_rule == Yaml2Regex(pattern_pathstr).produce_regex()
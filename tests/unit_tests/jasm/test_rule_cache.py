@@ -0,0 +1,103 @@
+import os
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from jasm.global_definitions import InputFileType, MatchConfig, MatchingReturnMode, MatchingSearchMode
+from jasm.jasm_regex.yaml2regex import Yaml2Regex
+from jasm.match import MasterOfPuppets
+from jasm.rule_artifact import RuleArtifact
+from jasm.rule_cache import RuleCache
+
+
+@pytest.fixture
+def pattern_file(tmp_path: Path) -> str:
+    pattern_path = tmp_path / "rule.yaml"
+    pattern_path.write_text("pattern:\n  - push:\n      - '@reg'\n  - ret\n", encoding="utf-8")
+    return str(pattern_path)
+
+
+@pytest.fixture
+def macros_file(tmp_path: Path) -> str:
+    macros_path = tmp_path / "macros.yaml"
+    macros_path.write_text("macros:\n  - name: '@reg'\n    pattern: '%rbp'\n", encoding="utf-8")
+    return str(macros_path)
+
+
+def test_cache_compiles_once(tmp_path: Path, pattern_file: str, macros_file: str) -> None:
+    cache = RuleCache(cache_dir=str(tmp_path / "cache"), max_size=1024**2)
+
+    with patch.object(RuleArtifact, "from_pattern_file", wraps=RuleArtifact.from_pattern_file) as mock_compile:
+        first = cache.get_artifact(pattern_file, macros=[macros_file])
+        second = cache.get_artifact(pattern_file, macros=[macros_file])
+
+    mock_compile.assert_called_once()
+    assert first == second
+    assert second.regex_rule == Yaml2Regex(pattern_file, macros_from_terminal=[macros_file]).produce_regex()
+
+
+def test_cache_key_depends_on_rule_macros_and_version(pattern_file: str, macros_file: str) -> None:
+    key = RuleCache.get_cache_key(pattern_file, [macros_file])
+    assert key != RuleCache.get_cache_key(pattern_file)
+
+    Path(macros_file).write_text("macros:\n  - name: '@reg'\n    pattern: '%rbx'\n", encoding="utf-8")
+    assert key != RuleCache.get_cache_key(pattern_file, [macros_file])
+
+    Path(macros_file).write_text("macros:\n  - name: '@reg'\n    pattern: '%rbp'\n", encoding="utf-8")
+    assert key == RuleCache.get_cache_key(pattern_file, [macros_file])
+
+    with patch("jasm.rule_cache.get_jasm_version", return_value="0.0.0"):
+        assert key != RuleCache.get_cache_key(pattern_file, [macros_file])
+
+    with patch("jasm.rule_cache.get_regex_generator_hash", return_value="0" * 64):
+        assert key != RuleCache.get_cache_key(pattern_file, [macros_file])
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path, pattern_file: str) -> None:
+    cache = RuleCache(cache_dir=str(tmp_path / "cache"), max_size=1024**2)
+    artifact = RuleArtifact.from_pattern_file(pattern_file)
+    cache.put("aa01", artifact)
+    cache.put("bb02", artifact)
+    entries_size = sum(size for _, size, _ in cache._get_entries())  # pylint: disable=protected-access
+
+    # Use the first entry again, so the second one is the least recently used
+    for key, last_use in [("aa01", 2000), ("bb02", 1000)]:
+        os.utime(cache._get_entry_path(key), (last_use, last_use))  # pylint: disable=protected-access
+    # Room for two entries only
+    cache.max_size = entries_size + entries_size // 4
+
+    cache.put("cc03", artifact)
+
+    assert cache.get("aa01") == artifact
+    assert cache.get("bb02") is None
+    assert cache.get("cc03") == artifact
+
+
+def test_cache_ignores_invalid_entry(tmp_path: Path) -> None:
+    cache = RuleCache(cache_dir=str(tmp_path / "cache"), max_size=1024**2)
+    entry_path = cache._get_entry_path("dd04")  # pylint: disable=protected-access
+    entry_path.parent.mkdir(parents=True)
+    entry_path.write_text("{\"format_version\": 0}", encoding="utf-8")
+
+    assert cache.get("dd04") is None
+
+
+@patch("jasm.rule_cache.RuleArtifact.from_pattern_file", wraps=RuleArtifact.from_pattern_file)
+def test_matching_with_the_rule_cache(mock_compile: MagicMock, tmp_path: Path) -> None:
+    match_config = MatchConfig(
+        pattern_pathstr="tests/yamls/capture_group_2_push_with_same_reg.yaml",
+        input_file="tests/assembly/binary_data_for_capture_groups.s",
+        input_file_type=InputFileType.assembly,
+        return_mode=MatchingReturnMode.matched_addrs_list,
+        matching_mode=MatchingSearchMode.all_finds,
+        rule_cache_dir=str(tmp_path / "cache"),
+    )
+    expected_result = MasterOfPuppets(match_config=replace(match_config, rule_cache_dir=None)).perform_matching()
+    assert expected_result
+
+    for _ in range(2):
+        assert MasterOfPuppets(match_config=match_config).perform_matching() == expected_result
+
+    mock_compile.assert_called_once()